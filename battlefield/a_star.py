@@ -1,38 +1,13 @@
+import heapq
+import math
 from collections import deque
 
-from pathfinding.core.diagonal_movement import DiagonalMovement
-from pathfinding.core.grid import Grid
-from pathfinding.finder.a_star import AStarFinder
-
-from game_constants import GRID_COLUMNS, GRID_ROWS
-
-
-def next_step_direction(goal, walkable_tiles, current):
-    grid = Grid(matrix=walkable_tiles.astype(int))
-
-    start = grid.node(current[1], current[0])  # x, y reversed in the grid node
-    end = grid.node(goal[1], goal[0])  # x, y reversed in the grid node
-
-    finder = AStarFinder(diagonal_movement=DiagonalMovement.always)
-    path, runs = finder.find_path(start, end, grid)
-
-    if len(path) > 1:
-        # Path[0] is the current position, path[1] is the next step
-        next_x, next_y = path[1]
-        dx = next_x - current[1]
-        dy = next_y - current[0]
-    else:
-        dx, dy = 0, 0  # No movement if no path or already at the goal
-
-    # Ensure dx, dy are -1, 0, or 1
-    dx = max(-1, min(1, dx))
-    dy = max(-1, min(1, dy))
-
-    return dx, dy
+SEARCH_MARGIN = 32  # Tiles around start and goal that find_path may leave their bounding box by
 
 
 def closest_open_tile_to(walkable_tiles, goal_x, goal_y):
     # BFS for closest walkable tile if immediate left/right is not available
+    rows, columns = walkable_tiles.shape
     visited = set()
     queue = deque([(goal_x, goal_y)])
     visited.add((goal_x, goal_y))
@@ -41,7 +16,7 @@ def closest_open_tile_to(walkable_tiles, goal_x, goal_y):
         x, y = queue.popleft()
         for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:  # Only 4 directions, no diagonals
             nx, ny = x + dx, y + dy
-            if 0 <= nx < GRID_COLUMNS and 0 <= ny < GRID_ROWS:
+            if 0 <= nx < columns and 0 <= ny < rows:
                 if walkable_tiles[ny, nx] and (nx, ny) not in visited:
                     return nx, ny
                 visited.add((nx, ny))
@@ -50,3 +25,131 @@ def closest_open_tile_to(walkable_tiles, goal_x, goal_y):
     return None  # In case all fails (highly unlikely unless fully surrounded by unwalkable tiles)
 
 
+def octile_distance(a, b):
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+
+def find_path(walkable_tiles, start, goal, max_expansions=None):
+    """
+    A* search with diagonal movement from start to goal, both (x, y). The start tile may be occupied.
+
+    Returns the list of tiles from start to goal, or None if there is no path within max_expansions expanded tiles.
+    The search runs on a dense copy of the tiles around start and goal, so it never looks further than
+    SEARCH_MARGIN tiles past them.
+    """
+    rows, columns = walkable_tiles.shape
+    x0, y0 = max(0, min(start[0], goal[0]) - SEARCH_MARGIN), max(0, min(start[1], goal[1]) - SEARCH_MARGIN)
+    x1 = min(columns, max(start[0], goal[0]) + SEARCH_MARGIN + 1)
+    y1 = min(rows, max(start[1], goal[1]) + SEARCH_MARGIN + 1)
+    walkable = walkable_tiles.window(x0, y0, x1, y1).tolist()
+    open_heap = [(octile_distance(start, goal), 0.0, start)]
+    came_from = {start: None}
+    cost_so_far = {start: 0.0}
+    expansions = 0
+
+    while open_heap:
+        _, cost, current = heapq.heappop(open_heap)
+        if current == goal:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = came_from[current]
+            return path[::-1]
+        if cost > cost_so_far[current]:
+            continue  # Stale heap entry
+        expansions += 1
+        if max_expansions is not None and expansions > max_expansions:
+            return None
+
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                nx, ny = current[0] + dx, current[1] + dy
+                if not (x0 <= nx < x1 and y0 <= ny < y1) or not walkable[ny - y0][nx - x0]:
+                    continue
+                new_cost = cost + (1.0 if dx == 0 or dy == 0 else math.sqrt(2))
+                if new_cost < cost_so_far.get((nx, ny), math.inf):
+                    cost_so_far[(nx, ny)] = new_cost
+                    came_from[(nx, ny)] = current
+                    heapq.heappush(open_heap, (new_cost + octile_distance((nx, ny), goal), new_cost, (nx, ny)))
+    return None
+
+
+class PathPlanner:
+    """
+    Per character A* planner that keeps its path between moves.
+
+    When tiles on the remaining path become blocked only the blocked stretch is searched again, from the last free
+    tile before it to the first free tile after it, and spliced into the old path. A small goal change is handled
+    the same way by extending the path from its old end. Everything else falls back on a fresh search, which gives
+    up after plan_expansions tiles so an unreachable goal on a large map does not search all of it.
+
+    The path is stored goal first, so walking a step pops the next tile off its end.
+    """
+    def __init__(self, repair_expansions=64, plan_expansions=256):
+        self.repair_expansions = repair_expansions
+        self.plan_expansions = plan_expansions
+        self.path = []  # Tiles (x, y) still to walk in reverse, path[0] is the goal and path[-1] the next step
+        self.goal = None
+
+    def reset(self):
+        self.path = []
+        self.goal = None
+
+    def next_step_direction(self, goal, walkable_tiles, current):
+        """ Direction (dx, dy) of the next step towards goal, goal and current are (y, x). """
+        goal = (goal[1], goal[0])
+        current = (current[1], current[0])
+
+        # Drop the tiles we already walked
+        while self.path and self.path[-1] == current:
+            self.path.pop()
+
+        if not self.path or max(abs(self.path[-1][0] - current[0]), abs(self.path[-1][1] - current[1])) > 1:
+            self.plan(walkable_tiles, current, goal)
+        elif goal != self.goal:
+            self.retarget(walkable_tiles, current, goal)
+        else:
+            self.repair(walkable_tiles, current)
+
+        if not self.path:
+            return 0, 0
+        return self.path[-1][0] - current[0], self.path[-1][1] - current[1]
+
+    def plan(self, walkable_tiles, current, goal):
+        path = find_path(walkable_tiles, current, goal, self.plan_expansions)
+        self.path = path[:0:-1] if path else []
+        self.goal = goal
+
+    def retarget(self, walkable_tiles, current, goal):
+        if octile_distance(self.goal, goal) > 2:
+            self.plan(walkable_tiles, current, goal)
+            return
+        extension = find_path(walkable_tiles, self.path[0], goal, self.repair_expansions)
+        if extension is None:
+            self.plan(walkable_tiles, current, goal)
+            return
+        self.path = extension[:0:-1] + self.path
+        self.goal = goal
+        self.repair(walkable_tiles, current)
+
+    def repair(self, walkable_tiles, current):
+        path = self.path
+        blocked_idx = next((idx for idx in range(len(path) - 1, -1, -1)
+                            if not walkable_tiles[path[idx][1], path[idx][0]]), None)
+        if blocked_idx is None:
+            return
+        rejoin_idx = next((idx for idx in range(blocked_idx - 1, -1, -1)
+                           if walkable_tiles[path[idx][1], path[idx][0]]), None)
+        if rejoin_idx is None:  # The goal itself is blocked
+            self.plan(walkable_tiles, current, self.goal)
+            return
+
+        anchor = path[blocked_idx + 1] if blocked_idx + 1 < len(path) else current
+        detour = find_path(walkable_tiles, anchor, path[rejoin_idx], self.repair_expansions)
+        if detour is None:
+            self.plan(walkable_tiles, current, self.goal)
+            return
+        self.path = path[:rejoin_idx] + detour[:0:-1] + path[blocked_idx + 1:]
@@ -1,26 +1,37 @@
 from a_star import closest_open_tile_to
-from animation import Animation
 from ai_character import AICharacter
-from game_constants import STANDARD_FRAME_TIME, GRID_COLUMNS, GRID_ROWS, MOVEMENT_DELAY
+from game_constants import STANDARD_FRAME_TIME, MOVEMENT_DELAY
+from projectiles import ProjectileSystem
 from weapon import Bow
 
 
 class AIArcher(AICharacter):
+    walk_sheet = ("resources/ai_archer/archer_walk_left.png", 48, 48, 8, 8)
+    attack_sheet = ("resources/ai_archer/archer_attack_left.png", 48, 48, 8, 16)
+
     def __init__(self, *args, **kwargs):
         AICharacter.__init__(self, *args, **kwargs)
         self.attack_range = 8
+        self.goal_reach = self.attack_range - 1
 
-        self.weapon = Bow(10, STANDARD_FRAME_TIME, STANDARD_FRAME_TIME * 8)
+    def create_weapon(self):
+        return Bow(10, STANDARD_FRAME_TIME, STANDARD_FRAME_TIME * 8)
 
-        self.animations.update({
-            'facing_left': Animation("resources/ai_archer/archer_walk_left.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'facing_right': Animation("resources/ai_archer/archer_walk_right.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-            'fighting_left': Animation("resources/ai_archer/archer_attack_left.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=-9),
-            'fighting_right': Animation("resources/ai_archer/archer_attack_right.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=9),
-        })
+    @classmethod
+    def asset_manifest(cls):
+        manifest = super().asset_manifest()
+        manifest['textures'].append(ProjectileSystem.texture_path)
+        return manifest
 
     def find_goal_location(self, game_state):
+        # Already in range of an enemy, shoot that one instead of walking to the target
+        enemy_in_reach = self.enemy_in_reach(game_state)
+        if enemy_in_reach is not None:
+            self.target = enemy_in_reach
+            return None
+
         walkable_tiles = game_state.walkable_tiles
+        rows, columns = walkable_tiles.shape
 
         # Immediate left and right locations
         open_places = []
@@ -30,7 +41,7 @@ class AIArcher(AICharacter):
             y = self.target.grid_y + dy
             if x == self.grid_x and y == self.grid_y:
                 return None
-            if 0 <= x < GRID_COLUMNS and 0 <= y < GRID_ROWS and walkable_tiles[y, x]:
+            if 0 <= x < columns and 0 <= y < rows and walkable_tiles[y, x]:
                 open_places.append((x, y))
 
         if open_places:  # Choose closest open place
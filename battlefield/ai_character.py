@@ -1,29 +1,26 @@
-import random
-
-from a_star import next_step_direction, closest_open_tile_to
-from animation import Animation
-from game_constants import STANDARD_FRAME_TIME, GRID_COLUMNS, GRID_ROWS, MOVEMENT_DELAY
+from a_star import closest_open_tile_to, PathPlanner
+from game_constants import STANDARD_FRAME_TIME, MOVEMENT_DELAY
+from state_columns import ReferenceColumn
 from walking_fighting_character import WalkingFightingCharacter
 from weapon import Weapon
 
 
 class AICharacter(WalkingFightingCharacter):
+    walk_sheet = ("resources/farmer_character/walk_left.png", 48, 48, 8, 8)
+    attack_sheet = ("resources/farmer_character/attacks_left.png", 48, 48, 8, 16)
+    death_sheet = ("resources/farmer_character/death_left.png", 48, 48, 8, 16)
+    target = ReferenceColumn()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.target = None
-
-        self.animations.update({
-            'facing_left': Animation("resources/farmer_character/walk_left.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'facing_right': Animation("resources/farmer_character/walk_right.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-            'fighting_left': Animation("resources/farmer_character/attacks_left.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=-9),
-            'fighting_right': Animation("resources/farmer_character/attack_right.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=9),
-            'death_left': Animation("resources/farmer_character/death_left.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'death_right': Animation("resources/farmer_character/death_right.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-        })
+        self.goal_reach = 1  # How many tiles left or right of an enemy this character wants to stand
+        self.path_planner = PathPlanner()
 
     def find_goal_location(self, game_state):
         walkable_tiles = game_state.walkable_tiles
+        rows, columns = walkable_tiles.shape
 
         # Immediate left and right locations
         open_places = []
@@ -33,7 +30,7 @@ class AICharacter(WalkingFightingCharacter):
             y = self.target.grid_y + dy
             if x == self.grid_x and y == self.grid_y:
                 return None
-            if 0 <= x < GRID_COLUMNS and 0 <= y < GRID_ROWS and walkable_tiles[y, x]:
+            if 0 <= x < columns and 0 <= y < rows and walkable_tiles[y, x]:
                 open_places.append((x, y))
 
         if open_places:  # Choose closest open place
@@ -50,38 +47,37 @@ class AICharacter(WalkingFightingCharacter):
         else:
             return False
 
-    def bfs_for_target(self, start, game_state):
-        from collections import deque
-
-        queue = deque([start])
-        visited = {start}
-        directions = [(-1 if self.facing_left else 1, 0), (0, -1), (0, 1)]  # Moving left, right, up, down
-
-        while queue:
-            current_x, current_y = queue.popleft()
-
-            # Check if the current position has an enemy
-            current_tile = game_state.game_grid[current_y][current_x]
-            from walking_fighting_character import WalkingFightingCharacter
-            if current_tile is not None and isinstance(current_tile, WalkingFightingCharacter):
-                if current_tile.team != self.team and not current_tile.is_dead():
-                    return current_tile
-
-            # Explore neighbors
-            for dx, dy in directions:
-                neighbor_x, neighbor_y = current_x + dx, current_y + dy
-                if 0 <= neighbor_x < GRID_COLUMNS and 0 <= neighbor_y < GRID_ROWS:
-                    if (neighbor_x, neighbor_y) not in visited:
-                        visited.add((neighbor_x, neighbor_y))
-                        queue.append((neighbor_x, neighbor_y))
-        return None
-
     def find_target(self, game_state, keys_pressed):
-        self.target = self.bfs_for_target((self.grid_x, self.grid_y), game_state)
+        # Closest enemy we can walk to without turning around
+        self.target = game_state.spatial_index.nearest_enemy(
+            self.grid_x, self.grid_y, self.team, facing=-1 if self.facing_left else 1)
+
+    def enemy_in_reach(self, game_state):
+        """ Closest living enemy in the same row that is at most goal_reach tiles away. """
+        enemies = game_state.spatial_index.enemies_in_row_span(
+            self.grid_y, self.grid_x - self.goal_reach, self.grid_x + self.goal_reach, self.team, closest_to=self.grid_x)
+        return enemies[0] if enemies else None
+
+    def face_target(self):
+        if self.target.grid_x - self.grid_x < 0:
+            self.facing_left = True
+        if self.target.grid_x - self.grid_x > 0:
+            self.facing_left = False
+
+    def step_towards_target(self, game_state):
+        """ Fall back on an A* search towards the target, used when the flow field has no free step. """
+        goal_location = self.find_goal_location(game_state)
+        if goal_location is not None:
+            walkable_tiles = game_state.walkable_tiles
+            dx, dy = self.path_planner.next_step_direction(tuple(reversed(goal_location)), walkable_tiles, (self.grid_y, self.grid_x))
+            if dx != 0 or dy != 0:
+                self.move(dx, dy, walkable_tiles)
+        else:
+            self.face_target()
 
     def switch_target_to_closeby_enemy(self, game_state):
-        dx = random.randint(-1, 1)
-        neighbouring_tile = game_state.game_grid[self.grid_y][self.grid_x + dx]
+        dx = game_state.rng.randint(-1, 1)
+        neighbouring_tile = game_state.game_grid[self.grid_y, self.grid_x + dx]
         if isinstance(neighbouring_tile, WalkingFightingCharacter) and neighbouring_tile.team != self.team and not neighbouring_tile.is_dead():
             self.target = neighbouring_tile
             return
@@ -100,41 +96,34 @@ class AICharacter(WalkingFightingCharacter):
             self.switch_target_to_closeby_enemy(game_state)
 
         # Sometimes just do nothing
-        if not self.move_delay_active and random.random() < 0.05:
+        if not self.move_delay_active and game_state.rng.random() < 0.05:
             self.set_last_move_time(MOVEMENT_DELAY)
 
         # Attack if an enemy is right in front of you
-        if not self.move_delay_active and random.random() < 0.06 and self.is_facing_enemy(game_state):
+        if not self.move_delay_active and game_state.rng.random() < 0.06 and self.is_facing_enemy(game_state):
             self.fight()
 
-        # Move towards and enemy
+        # Move towards the closest enemy using the flow field of our team
         if not self.move_delay_active and not self.is_facing_enemy(game_state):
-            goal_location = self.find_goal_location(game_state)
-            if goal_location is not None:
+            flow_field = game_state.navigation.flow_field(self.team, self.goal_reach)
+            if flow_field.is_goal(self.grid_x, self.grid_y):
+                # Within reach of an enemy, which might not be our current target
+                self.target = self.enemy_in_reach(game_state) or self.target
+                self.face_target()
+            else:
                 walkable_tiles = game_state.walkable_tiles
-                dx, dy = next_step_direction(tuple(reversed(goal_location)), walkable_tiles, (self.grid_y, self.grid_x))
+                dx, dy = flow_field.next_step(self.grid_x, self.grid_y, walkable_tiles)
                 if dx != 0 or dy != 0:
                     self.move(dx, dy, walkable_tiles)
-            else:
-                # Face towards the player
-                if self.target.grid_x - self.grid_x < 0:
-                    self.facing_left = True
-                if self.target.grid_x - self.grid_x > 0:
-                    self.facing_left = False
+                else:
+                    self.step_towards_target(game_state)
 
 
 class AIKnight(AICharacter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    walk_sheet = ("resources/ai_character/walk_left.png", 48, 48, 8, 8)
+    walk_right_sheet = ("resources/ai_character/walk_right.png", 48, 48, 8, 8)  # Not drawn as a mirror of walk_left
+    attack_sheet = ("resources/ai_character/attacks_left.png", 48, 48, 8, 16)
+    death_sheet = ("resources/ai_character/death_left.png", 48, 48, 8, 16)
 
-        self.target = None
-        self.weapon = Weapon(15, STANDARD_FRAME_TIME / 2, MOVEMENT_DELAY)
-
-        self.animations.update({
-            'facing_left': Animation("resources/ai_character/walk_left.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'facing_right': Animation("resources/ai_character/walk_right.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-            'fighting_left': Animation("resources/ai_character/attacks_left.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=-9),
-            'fighting_right': Animation("resources/ai_character/attack_right.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=9),
-            'death_left': Animation("resources/ai_character/death_left.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'death_right': Animation("resources/ai_character/death_right.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-        })
+    def create_weapon(self):
+        return Weapon(15, STANDARD_FRAME_TIME / 2, MOVEMENT_DELAY)
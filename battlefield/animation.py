@@ -1,46 +1,82 @@
-import time
 from pathlib import Path
-from typing import List, Union
+from typing import Sequence, Union
 
 import arcade
 from arcade import Texture
 
+import game_clock
+import texture_registry
+from state_columns import StoredColumn
+
 
 class Animation:
-    def __init__(self, file_path: Union[Path, List[Texture]], frame_width, frame_height, columns, frame_count, frame_duration=0.05, scale=1.0, loop=True, margin_x=0):
-        if isinstance(file_path, list):
+    # Set by StateColumns.bind, the StoredColumn attributes then live in its row
+    state_columns = None
+    state_row = None
+    current_frame = StoredColumn()
+    playing = StoredColumn()
+    last_update_time = StoredColumn()
+
+    def __init__(self, file_path: Union[Path, Sequence[Texture]], frame_width, frame_height, columns, frame_count, frame_duration=0.05, scale=1.0, loop=True, margin_x=0, mirrored=False):
+        """
+        With mirrored set the frames are drawn flipped horizontally, so a single sheet serves both facings.
+        margin_x is always given for the sheet as stored, it is mirrored along with the frames.
+        """
+        if isinstance(file_path, (list, tuple)):
             self.texture_list = file_path
         else:
-            self.texture_list = arcade.load_spritesheet(file_path, frame_width, frame_height, columns, frame_count)
+            self.texture_list = texture_registry.load_spritesheet(file_path, frame_width, frame_height, columns, frame_count)
 
         self.frame_width = frame_width
         self.frame_height = frame_height
         self.margin_x = margin_x
+        self.mirrored = mirrored
         self.frame_count = frame_count
         self.current_frame = 0
         self.scale = scale
         self.loop = loop
         self.playing = loop
         self.frame_duration = frame_duration  # Time in seconds for each frame
-        self.last_update_time = time.time()
+        self.last_update_time = game_clock.now()
         self.animation_parts = 2
 
     def update(self):
         if not self.playing:
             return
 
-        if time.time() - self.last_update_time > self.frame_duration:
+        if game_clock.now() - self.last_update_time > self.frame_duration:
             if self.loop:
                 self.current_frame = (self.current_frame + 1) % self.frame_count
             else:
                 self.current_frame = min(self.current_frame + 1, self.frame_count - 1)
                 if self.current_frame == (self.frame_count // self.animation_parts) - 1:
                     self.playing = False
-            self.last_update_time = time.time()
+            self.last_update_time = game_clock.now()
+
+    @property
+    def current_texture(self):
+        return self.texture_list[self.current_frame]
+
+    @property
+    def offset_x(self):
+        return -self.margin_x * self.scale if self.mirrored else self.margin_x * self.scale
 
     def draw(self, center_x, center_y, perspective_factor=1):
-        sprite = self.texture_list[self.current_frame]
-        arcade.draw_texture_rectangle(center_x + self.margin_x * self.scale, center_y, sprite.width * self.scale, sprite.height * self.scale, sprite)
+        sprite = self.current_texture
+        width = sprite.width * self.scale
+        # A negative width flips the texture coordinates of the quad
+        arcade.draw_texture_rectangle(center_x + self.offset_x, center_y, -width if self.mirrored else width, sprite.height * self.scale, sprite)
+
+    def sync_sprite(self, sprite, center_x, center_y):
+        """ Make a sprite look like what draw would draw, so it can be drawn in a batch. """
+        texture = self.current_texture
+        if sprite.texture is not texture:
+            sprite.texture = texture
+        sprite.scale = self.scale
+        width = texture.width * self.scale
+        sprite.width = -width if self.mirrored else width
+        sprite.center_x = center_x + self.offset_x
+        sprite.center_y = center_y
 
     def reset(self):
         if self.current_frame == self.frame_count - 1:
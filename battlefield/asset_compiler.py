@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool, cpu_count
+
+from PIL import Image, ImageOps
+
+from asset_preloader import collect_manifest
+from character_configurations import SCENARIOS, scenario_unit_classes
+from piskel import Piskel
+from player_character import PlayerCharacter
+from sprite_bundle import BUNDLE_DIRECTORY, INDEX_FILE, ATLAS_FILE, spritesheet_entry_name, loadout_entry_name, \
+    source_mtimes
+
+# Everything any scenario can spawn, fighting animations of the (chest, legs, weapon) loadouts are prebuilt
+MANIFEST = collect_manifest(scenario_unit_classes(*SCENARIOS.values()) + (PlayerCharacter,))
+ATLAS_WIDTH = 2048
+PADDING = 1  # Transparent pixels between frames, so frames do not bleed into each other when scaled
+MIRRORED_SUFFIX = ":mirrored"
+
+
+def item_attack_layers(item):
+    piskels = item.piskels
+    return piskels.large_sword_attack_piskel.file_path, piskels.piskel_layers
+
+
+def collect_jobs():
+    """
+    (entry name, kind, spec, source files) of everything that goes into the bundle.
+
+    Single piskels are not bundled, the game only draws them composited into the fighting animations of loadouts.
+    """
+    jobs = []
+    for sheet in MANIFEST['spritesheets']:
+        jobs.append((spritesheet_entry_name(*sheet), 'sheet', sheet, [sheet[0]]))
+    for chest_class, legs_class, weapon_class in MANIFEST['loadouts']:
+        items = [chest_class(), legs_class(), weapon_class(0, 0, 0)]
+        layer_sets = [item_attack_layers(item) for item in items]
+        jobs.append((loadout_entry_name(*[item.asset_key for item in items]), 'loadout', layer_sets,
+                     sorted({file_path for file_path, _ in layer_sets})))
+    return jobs
+
+
+def build_frames(kind, spec):
+    if kind == 'sheet':
+        file_path, frame_width, frame_height, columns, frame_count = spec
+        image = Image.open(file_path).convert("RGBA")
+        return [image.crop((frame_width * (frame % columns), frame_height * (frame // columns),
+                            frame_width * (frame % columns + 1), frame_height * (frame // columns + 1)))
+                for frame in range(frame_count)]
+    piskel = Piskel.combine_piskels([(Piskel.load(file_path), layers) for file_path, layers in spec])
+    return piskel.get_frames()
+
+
+def _compile_job(job):
+    """ Runs in a worker process: the frames of one bundle entry, plus its mirrored twin. """
+    name, kind, spec, sources, mirrored = job
+    frames = build_frames(kind, spec)
+    results = [(name, frames)]
+    if mirrored:
+        results.append((name + MIRRORED_SUFFIX, [ImageOps.mirror(frame) for frame in frames]))
+    return [(entry_name, frames, sources) for entry_name, frames in results]
+
+
+def load_previous(output_directory):
+    """ Entries and atlas of the last build, or nothing if there is none. """
+    try:
+        with open(os.path.join(output_directory, INDEX_FILE), 'r') as file:
+            entries = json.load(file)['entries']
+        return entries, Image.open(os.path.join(output_directory, ATLAS_FILE)).convert("RGBA")
+    except (OSError, ValueError, KeyError):
+        return {}, None
+
+
+def reuse_entry(entry, atlas):
+    width, height = entry['frame_width'], entry['frame_height']
+    return [atlas.crop((frame['x'], frame['y'], frame['x'] + width, frame['y'] + height)) for frame in entry['frames']]
+
+
+def pack(compiled):
+    """ Shelf packing of all frames, in entry order. Returns the atlas and the index entries. """
+    positions = {}
+    x = y = shelf_height = 0
+    for name, (frames, _) in compiled.items():
+        positions[name] = []
+        for frame in frames:
+            if x + frame.width > ATLAS_WIDTH:
+                x, y, shelf_height = 0, y + shelf_height + PADDING, 0
+            positions[name].append((x, y))
+            x += frame.width + PADDING
+            shelf_height = max(shelf_height, frame.height)
+
+    atlas = Image.new("RGBA", (ATLAS_WIDTH, max(1, y + shelf_height)))
+    entries = {}
+    for name, (frames, sources) in compiled.items():
+        for frame, position in zip(frames, positions[name]):
+            atlas.paste(frame, position)
+        entries[name] = {
+            'frame_width': frames[0].width,
+            'frame_height': frames[0].height,
+            'sources': sources,
+            'frames': [{'x': x, 'y': y} for x, y in positions[name]],
+        }
+    return atlas, entries
+
+
+def compile_bundle(output_directory=BUNDLE_DIRECTORY, mirrored=False, processes=None, force=False):
+    """
+    Rebuild the entries whose sources changed and write the bundle.
+
+    Returns the number of rebuilt and reused entries, or None when the bundle was already up to date.
+    """
+    previous_entries, previous_atlas = ({}, None) if force else load_previous(output_directory)
+    wanted = []  # (entry name, source mtimes)
+    stale_jobs = []
+    for name, kind, spec, sources in collect_jobs():
+        mtimes = source_mtimes(sources)
+        names = [name, name + MIRRORED_SUFFIX] if mirrored else [name]
+        wanted += [(entry_name, mtimes) for entry_name in names]
+        if any(previous_entries.get(entry_name, {}).get('sources') != mtimes for entry_name in names):
+            stale_jobs.append((name, kind, spec, mtimes, mirrored))
+
+    if not stale_jobs and set(previous_entries) == {name for name, _ in wanted}:
+        return None
+
+    rebuilt = {}
+    if stale_jobs:
+        with Pool(processes or cpu_count()) as pool:
+            for results in pool.imap_unordered(_compile_job, stale_jobs):
+                for name, frames, sources in results:
+                    rebuilt[name] = (frames, sources)
+
+    compiled = {}
+    for name, mtimes in wanted:
+        if name in rebuilt:
+            compiled[name] = rebuilt[name]
+        else:
+            compiled[name] = (reuse_entry(previous_entries[name], previous_atlas), mtimes)
+
+    atlas, entries = pack(compiled)
+    os.makedirs(output_directory, exist_ok=True)
+    atlas.save(os.path.join(output_directory, ATLAS_FILE))
+    with open(os.path.join(output_directory, INDEX_FILE), 'w') as file:
+        json.dump({'entries': entries}, file)
+    return len(rebuilt), len(compiled) - len(rebuilt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the sprite sheets and fighting animations into one sprite bundle.")
+    parser.add_argument("--output", type=str, default=BUNDLE_DIRECTORY, help="Directory to write the bundle to.")
+    parser.add_argument("--mirrored", action='store_true',
+                        help="Also pack mirrored frames, the game itself mirrors at draw time.")
+    parser.add_argument("--processes", type=int, default=cpu_count())
+    parser.add_argument("--force", action='store_true', help="Rebuild every entry, even when its sources are unchanged.")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    counts = compile_bundle(args.output, args.mirrored, args.processes, args.force)
+    if counts is None:
+        print(f"{args.output} is up to date")
+    else:
+        print(f"Rebuilt {counts[0]} and reused {counts[1]} entries of {args.output} in {time.time() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import texture_registry
+from piskel import Piskel
+from player_character import fighting_textures
+from sprite_bundle import loadout_entry_name, spritesheet_entry_name
+from stationary_sprite import brightness_levels
+from trees import Tree1, Tree2
+
+BACKGROUND_IMAGE = "resources/backgrounds/background_image.webp"
+TREE_IMAGES = [Tree1.image_file, Tree2.image_file]
+
+
+def load_spritesheet(*sheet):
+    for texture in texture_registry.load_spritesheet(*sheet):
+        texture.hit_box_points  # Computed on first use otherwise
+    return sheet
+
+
+def load_brightness_variant(file_path, flipped_horizontally, brightness):
+    texture_registry.load_brightness_variant(file_path, flipped_horizontally, brightness).hit_box_points
+    return file_path
+
+
+def load_piskel(file_path):
+    """ Parse a piskel and decode all of its layers. """
+    piskel = Piskel.load(file_path)
+    for name in piskel.layer_names:
+        piskel.layer_images[name]
+    return file_path
+
+
+def loadout_piskel_files(loadout):
+    """ Piskel files the fighting animation of a (chest, legs, weapon) loadout is composited from. """
+    return sorted({file_path for item_class in loadout for file_path in item_class.piskel_files.values()})
+
+
+def loadout_is_bundled(loadout):
+    return texture_registry.is_bundled(loadout_entry_name(*[item_class.asset_key for item_class in loadout]))
+
+
+def load_fighting_textures(loadout):
+    chest_class, legs_class, weapon_class = loadout
+    fighting_textures(chest_class(), legs_class(), weapon_class(0, 0, 0))
+
+
+def collect_manifest(unit_classes):
+    """ The asset manifests of the character classes merged, every asset listed once. """
+    manifest = {'spritesheets': [], 'textures': [], 'loadouts': []}
+    for unit_class in unit_classes:
+        for kind, assets in unit_class.asset_manifest().items():
+            manifest[kind] += [asset for asset in assets if asset not in manifest[kind]]
+    return manifest
+
+
+class AssetPreloader:
+    """
+    Decodes the images and piskels a battle needs on a thread pool, before anything is constructed.
+
+    What to load comes from the asset manifests of the character classes the scenario spawns, plus the background
+    and the trees of the field. The decoded images, textures and hit boxes end up in the texture registry and the
+    piskel cache, where the characters, trees and projectiles pick them up while the GameState is built. Creating
+    an arcade Texture does not touch OpenGL, the textures are only uploaded when they are first drawn, on the main
+    thread. Frames found in a compiled sprite bundle are left to the texture registry, which cuts them from the
+    bundle's atlas.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.duration = None
+
+    @staticmethod
+    def jobs(unit_classes):
+        """ (function, arguments) of everything to load, images shared by several jobs are only decoded once. """
+        manifest = collect_manifest(unit_classes)
+        jobs = [(texture_registry.load_texture, (file_path,)) for file_path in [BACKGROUND_IMAGE] + manifest['textures']]
+        jobs += [(load_spritesheet, sheet) for sheet in manifest['spritesheets']
+                 if not texture_registry.is_bundled(spritesheet_entry_name(*sheet))]
+        jobs += [(load_brightness_variant, (image_file, flipped, brightness))
+                 for image_file in TREE_IMAGES for flipped in (False, True) for brightness in brightness_levels()]
+        piskel_files = sorted({file_path for loadout in manifest['loadouts'] if not loadout_is_bundled(loadout)
+                               for file_path in loadout_piskel_files(loadout)})
+        jobs += [(load_piskel, (file_path,)) for file_path in piskel_files]
+        return jobs
+
+    def preload(self, unit_classes):
+        start_time = time.perf_counter()
+        jobs = self.jobs(unit_classes)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Every distinct source file is decoded by one worker before the jobs cutting it up run
+            file_paths = {arguments[0] for function, arguments in jobs if function is not load_piskel}
+            wait([executor.submit(texture_registry.load_image, file_path) for file_path in file_paths])
+
+            futures = [executor.submit(function, *arguments) for function, arguments in jobs]
+            for future in futures:
+                future.result()
+            loadouts = [loadout for loadout in collect_manifest(unit_classes)['loadouts']
+                        if not loadout_is_bundled(loadout)]
+            for future in [executor.submit(load_fighting_textures, loadout) for loadout in loadouts]:
+                future.result()
+        self.duration = time.perf_counter() - start_time
+        return self.duration
@@ -0,0 +1,27 @@
+from game_constants import GRID_ROWS, GRID_COLUMNS, CHUNK_SIZE
+
+
+class BattleMap:
+    """
+    Size of a battlefield and how it is planted with trees. A scenario brings its own as a battle_map attribute.
+
+    border_trees lines the left and right edge with the forest of the default field, random_trees are scattered
+    over free tiles. Occupancy is stored in chunks of chunk_size tiles, see ChunkedGrid.
+    """
+    def __init__(self, rows=GRID_ROWS, columns=GRID_COLUMNS, chunk_size=CHUNK_SIZE, border_trees=True, random_trees=14):
+        self.rows = rows
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.border_trees = border_trees
+        self.random_trees = random_trees
+
+    def fits_window(self):
+        """ Whether the BattlefieldWindow can show the map, it draws every tile at a fixed size without a camera. """
+        return self.rows <= GRID_ROWS and self.columns <= GRID_COLUMNS
+
+
+DEFAULT_MAP = BattleMap()
+
+
+def scenario_map(scenario):
+    return getattr(scenario, 'battle_map', DEFAULT_MAP)
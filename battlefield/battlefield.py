@@ -1,12 +1,57 @@
+import argparse
+
+from battle_map import scenario_map
 from battlefield_window import BattlefieldWindow
+from character_configurations import SCENARIOS
+from lockstep import LockstepSession
+from replay import Replay, ReplayPlayer, ReplayRecorder
 import arcade
 
 
 def main():
     """ Main method """
-    game = BattlefieldWindow()
+    parser = argparse.ArgumentParser(description="Play a battle.")
+    parser.add_argument("--record", type=str, default=None, help="Record the battle to this replay file.")
+    parser.add_argument("--replay", type=str, default=None, help="Watch a recorded battle instead of playing one.")
+    parser.add_argument("--seek", type=int, default=0, help="Tick to start watching the replay at.")
+    parser.add_argument("--scenario", default='random_10_vs_10',
+                        choices=sorted(name for name, scenario in SCENARIOS.items()
+                                       if scenario_map(scenario).fits_window()))
+    parser.add_argument("--join", type=str, default=None, metavar="HOST:PORT",
+                        help="Play a lockstep battle hosted with lockstep.py --serve.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of a recorded battle, random if not given.")
+    args = parser.parse_args()
+
+    recorder = None
+    create_simulation = None
+    scenario = SCENARIOS[args.scenario]
+    if args.join is not None:
+        host, port = args.join.rsplit(':', 1)
+        scenario = None  # Chosen by the server
+
+        def create_simulation():
+            return LockstepSession(host, int(port))
+    elif args.replay is not None:
+        replay = Replay.load(args.replay)
+        scenario = SCENARIOS[replay.scenario_name]
+
+        def create_simulation():
+            player = ReplayPlayer(replay)
+            player.seek(args.seek)
+            return player
+    elif args.record is not None:
+        def create_simulation():
+            nonlocal recorder
+            recorder = ReplayRecorder(args.scenario, args.seed)
+            return recorder
+
+    game = BattlefieldWindow(create_simulation, scenario)
     arcade.run()
 
+    if recorder is not None:
+        recorder.save(args.record)
+        print(f"Recorded {len(recorder.replay)} ticks to {args.record}")
+
 
 if __name__ == "__main__":
     main()
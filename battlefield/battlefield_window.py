@@ -1,24 +1,64 @@
 import arcade
 
-from draw_utils import calculate_perspective_factor
-from game_constants import SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, GRID_ROWS, CELL_SIZE, GRID_COLUMNS, \
-    BOTTOM_GRID_PAD, HORIZONTAL_PADDING
+import texture_registry
+from asset_preloader import AssetPreloader, BACKGROUND_IMAGE
+from character_configurations import SCENARIOS, scenario_unit_classes
+from game_constants import SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE
 from game_state import GameState
+from grid_overlay import GridOverlay
+from overlay_renderer import OverlayRenderer
+from player_character import PlayerCharacter
+from sprite_bundle import SpriteBundle
+from startup_timer import StartupTimer
+from world_renderer import WorldRenderer
+
+
+SEEK_TICKS = 600  # How far the arrow keys jump while watching a replay
 
 
 class BattlefieldWindow(arcade.Window):
-    def __init__(self):
+    def __init__(self, create_simulation=None, scenario=None):
+        """
+        create_simulation optionally builds a ReplayRecorder, ReplayPlayer or LockstepSession, the battle then runs
+        in fixed ticks through its step method instead of following the wall clock. scenario is the one played or
+        watched, the assets of all scenarios are loaded when it is not known up front.
+        """
+        self.startup_timer = StartupTimer()
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
         self.set_update_rate(1/60)
         arcade.enable_timings()
+        self.startup_timer.mark("window")
+
+        # Prebuilt frames of asset_compiler.py, if they were compiled
+        texture_registry.use_bundle(SpriteBundle.load_if_present())
+        self.startup_timer.mark("load sprite bundle")
+
+        # Decode all images and piskels in parallel, everything below takes them from the caches
+        scenarios = SCENARIOS.values() if scenario is None else [scenario]
+        AssetPreloader().preload(scenario_unit_classes(*scenarios) + (PlayerCharacter,))
+        self.startup_timer.mark("preload assets")
+
         # Background texture
         arcade.set_background_color(arcade.color.ASH_GREY)
-        self.background_texture = arcade.load_texture("resources/backgrounds/background_image.webp")  # Load the background image
+        self.background_texture = texture_registry.load_texture(BACKGROUND_IMAGE)
 
         # Player character and controls
         self.keys_pressed = {'left': 0, 'right': 0, 'up': 0, 'down': 0, 'space': 0}
 
-        self.game_state = GameState()
+        self.simulation = None if create_simulation is None else create_simulation()
+        if self.simulation is None:
+            self.game_state = GameState() if scenario is None else GameState(scenario)
+        else:
+            self.game_state = self.simulation.game_state
+        battle_map = self.game_state.battle_map
+        if not battle_map.fits_window():
+            raise ValueError(f"A {battle_map.rows} x {battle_map.columns} map does not fit in the window, "
+                             f"only headless battles can use it")
+        self.startup_timer.mark("game state")
+        self.grid_overlay = GridOverlay(self.game_state.walkable_tiles, self.game_state.projection)
+        self.world_renderer = WorldRenderer(self.game_state)
+        self.overlay_renderer = OverlayRenderer()
+        self.startup_timer.mark("renderers")
 
     def on_draw(self):
         """ Render the screen. """
@@ -29,46 +69,51 @@ class BattlefieldWindow(arcade.Window):
 
         # Draw the grid with perspective
         draw_grid = True
-        empty_tiles = self.game_state.walkable_tiles
         if draw_grid:
-            for y in range(GRID_ROWS):
-                perspective_factor = calculate_perspective_factor(y)
-                cell_width = CELL_SIZE * perspective_factor
-                cell_height = CELL_SIZE * perspective_factor
-                for x in range(GRID_COLUMNS):
-                    screen_x = x * cell_width + (SCREEN_WIDTH / 2) - (GRID_COLUMNS * cell_width / 2)
-                    screen_y = y * cell_height + BOTTOM_GRID_PAD + HORIZONTAL_PADDING * y
-                    alpha = 40
-                    color = (0, 0, 0, alpha) if empty_tiles[y, x] else (225, 0, 0, alpha + 40)
-                    arcade.draw_rectangle_outline(screen_x + cell_width / 2, screen_y + cell_height / 2,
-                                                  cell_width, cell_height, color, 3)
-
-        for drawable in sorted(self.game_state.drawables, key=lambda t: (t.screen_y, -t.screen_x), reverse=True):
-            drawable.draw()  # Draw the tree or player
+            self.grid_overlay.update(self.game_state.walkable_tiles)
+            self.grid_overlay.draw()
+
+        # Trees, characters and arrows are drawn as one batch, team indicators below and HP bars on top of it
+        self.world_renderer.update()
+        placements = [character.sprite_placement() + (character,) for character in self.game_state.characters
+                      if not character.is_dead()]
+        self.overlay_renderer.update(placements)
+        self.overlay_renderer.draw_under()
+        self.world_renderer.draw()
+        self.overlay_renderer.draw_over()
 
         # Draw FPS on the screen
         fps = f"FPS: {arcade.get_fps():.2f}"
         arcade.draw_text(fps, 10, SCREEN_HEIGHT - 20, arcade.color.WHITE, 14)
 
-    def on_update(self, delta_time):
-        """ Update game logic based on key states. """
-        self.game_state.update_game_grid()
-
-        self.game_state.player_character.update(delta_time, self.game_state, self.keys_pressed)
+        # Why a lockstep battle stopped, if it did
+        status = getattr(self.simulation, 'status', None)
+        if status is not None:
+            arcade.draw_text(status, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, arcade.color.WHITE, 20,
+                             anchor_x='center', anchor_y='center')
 
-        remove_arrows_idxs = []
-        for arrow_idx, arrow in enumerate(self.game_state.arrows):
-            if not arrow.update(delta_time, self.game_state, self.keys_pressed):
-                remove_arrows_idxs.append(arrow_idx)
-        # Remove the arrows from the list by iterating in reverse order
-        for idx in sorted(remove_arrows_idxs, reverse=True):
-            del self.game_state.arrows[idx]
+        if self.startup_timer is not None:
+            # The first frame also uploads every texture to the GPU
+            self.startup_timer.mark("first frame")
+            print(self.startup_timer.report())
+            self.startup_timer = None
 
-        for ai_character in self.game_state.ai_characters:
-            ai_character.update(delta_time, self.game_state, self.keys_pressed)
+    def on_update(self, delta_time):
+        """ Update game logic based on key states. """
+        if self.simulation is None:
+            self.game_state.update(delta_time, self.keys_pressed)
+        else:
+            self.simulation.step(self.keys_pressed)
 
     def on_key_press(self, key, modifiers):
         """ Handle key presses for player movement. """
+        if hasattr(self.simulation, 'seek'):
+            # Watching a replay, the arrow keys jump through it
+            if key == arcade.key.LEFT:
+                self.simulation.seek(self.simulation.tick - SEEK_TICKS)
+            elif key == arcade.key.RIGHT:
+                self.simulation.seek(self.simulation.tick + SEEK_TICKS)
+            return
         if key in {arcade.key.A, arcade.key.LEFT}:
             self.keys_pressed['left'] = 1
         elif key in {arcade.key.D, arcade.key.RIGHT}:
@@ -2,10 +2,11 @@ import random
 
 from ai_archer import AIArcher
 from ai_character import AICharacter, AIKnight
+from battle_map import BattleMap
 from game_constants import CELL_SIZE, MOVEMENT_DELAY
 
 
-def old_default_characters():
+def old_default_characters(rng=random):
     return [
         AIArcher(
             position_x=20,
@@ -94,7 +95,7 @@ def old_default_characters():
     ]
 
 
-def default_characters():
+def default_characters(rng=random):
     return [
         AICharacter(
             position_x=18,
@@ -190,7 +191,7 @@ def default_characters():
     ]
 
 
-def one_enemy_archer():
+def one_enemy_archer(rng=random):
     return [
         AIArcher(
             position_x=18,
@@ -202,8 +203,8 @@ def one_enemy_archer():
     ]
 
 
-def get_random_ai_character(x, y, team):
-    random_number = random.random()
+def get_random_ai_character(x, y, team, rng=random):
+    random_number = rng.random()
     number_classes = 3
     if random_number < 1 / number_classes:
         return AICharacter(
@@ -231,7 +232,7 @@ def get_random_ai_character(x, y, team):
         )
 
 
-def random_10_vs_10():
+def random_10_vs_10(rng=random):
     ai_characters = []
     friendly_positions = [
         (5, 3), (6, 3),
@@ -249,16 +250,16 @@ def random_10_vs_10():
     ]
     for x, y in friendly_positions:
         ai_characters.append(
-            get_random_ai_character(x, y, 0)
+            get_random_ai_character(x, y, 0, rng)
         )
     for x, y in enemy_positions:
         ai_characters.append(
-            get_random_ai_character(x, y, 1)
+            get_random_ai_character(x, y, 1, rng)
         )
     return ai_characters
 
 
-def archer_10_vs_10():
+def archer_10_vs_10(rng=random):
     ai_characters = []
     friendly_positions = [
         (5, 3), (6, 3),
@@ -294,4 +295,60 @@ def archer_10_vs_10():
                 team=1
             )
         )
-    return ai_characters
\ No newline at end of file
+    return ai_characters
+
+
+def large_map_100_vs_100(rng=random):
+    """ Two blocks of 100 in the middle of a 1000 x 1000 map, only the chunks around them are ever touched. """
+    ai_characters = []
+    for y in range(495, 505):
+        for x in range(480, 490):
+            ai_characters.append(get_random_ai_character(x, y, 0, rng))
+        for x in range(510, 520):
+            ai_characters.append(get_random_ai_character(x, y, 1, rng))
+    return ai_characters
+
+
+large_map_100_vs_100.battle_map = BattleMap(1000, 1000, border_trees=False, random_trees=1000)
+
+
+def far_apart_20_vs_20(rng=random):
+    """ Two blocks of 20 at the ends of a 64 x 192 map, with empty chunks between them they first have to meet. """
+    ai_characters = []
+    for y in range(30, 34):
+        for x in range(8, 13):
+            ai_characters.append(get_random_ai_character(x, y, 0, rng))
+        for x in range(179, 184):
+            ai_characters.append(get_random_ai_character(x, y, 1, rng))
+    return ai_characters
+
+
+far_apart_20_vs_20.battle_map = BattleMap(64, 192, border_trees=False, random_trees=60)
+
+# Character classes each scenario spawns, their assets are preloaded before the scenario is built
+old_default_characters.unit_classes = (AIArcher, AICharacter)
+default_characters.unit_classes = (AICharacter, AIArcher, AIKnight)
+one_enemy_archer.unit_classes = (AIArcher,)
+random_10_vs_10.unit_classes = (AICharacter, AIKnight, AIArcher)
+archer_10_vs_10.unit_classes = (AIArcher,)
+large_map_100_vs_100.unit_classes = random_10_vs_10.unit_classes
+far_apart_20_vs_20.unit_classes = random_10_vs_10.unit_classes
+
+SCENARIOS = {
+    'random_10_vs_10': random_10_vs_10,
+    'archer_10_vs_10': archer_10_vs_10,
+    'default_characters': default_characters,
+    'old_default_characters': old_default_characters,
+    'one_enemy_archer': one_enemy_archer,
+    'large_map_100_vs_100': large_map_100_vs_100,
+    'far_apart_20_vs_20': far_apart_20_vs_20,
+}
+
+
+def scenario_unit_classes(*scenarios):
+    """ Character classes the scenarios spawn, each listed once, none for scenarios that do not list them. """
+    unit_classes = []
+    for scenario in scenarios:
+        unit_classes += [unit_class for unit_class in getattr(scenario, 'unit_classes', ())
+                         if unit_class not in unit_classes]
+    return tuple(unit_classes)
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class ChunkedGrid:
+    """
+    A 2D grid of values stored as square chunks that are only allocated once something is written to them.
+
+    Index with [y, x] like a NumPy array, either with two ints or with two arrays of equal shape. Cells of chunks
+    that were never written read as fill, so a large map costs memory only where something stands. Cells outside
+    the grid read as outside, which defaults to fill, writing them raises an IndexError. chunk_size must be a power
+    of two.
+
+    Every write bumps version and records it for the chunks written, so a dense copy can be brought up to date by
+    copying only the chunks_written_since the version it was made at. Code that writes to a chunk array directly
+    must call mark_written itself.
+    """
+    def __init__(self, rows, columns, chunk_size, fill, dtype, outside=None):
+        if chunk_size & (chunk_size - 1):
+            raise ValueError(f"chunk_size must be a power of two, not {chunk_size}")
+        self.rows = rows
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.shift = chunk_size.bit_length() - 1
+        self.mask = chunk_size - 1
+        self.fill = fill
+        self.dtype = np.dtype(dtype)
+        self._fill = self.dtype.type(fill)
+        self._outside = self.dtype.type(fill if outside is None else outside)
+        self.chunks = {}  # (chunk x, chunk y) -> chunk_size x chunk_size array, indexed [y, x] within the chunk
+        self.version = 0
+        self.chunk_versions = {}  # Chunk key -> version of its last write
+
+    @property
+    def shape(self):
+        return self.rows, self.columns
+
+    def chunk_of(self, x, y):
+        return x >> self.shift, y >> self.shift
+
+    def chunk(self, chunk_key):
+        """ The array of a chunk, allocated on first use. """
+        chunk = self.chunks.get(chunk_key)
+        if chunk is None:
+            chunk = self.chunks[chunk_key] = np.full((self.chunk_size, self.chunk_size), self.fill, dtype=self.dtype)
+        return chunk
+
+    def mark_written(self, chunk_key):
+        self.version += 1
+        self.chunk_versions[chunk_key] = self.version
+
+    def chunks_written_since(self, version):
+        return [chunk_key for chunk_key, chunk_version in self.chunk_versions.items() if chunk_version > version]
+
+    def chunk_bounds(self, chunk_key):
+        """ (x0, y0, x1, y1) of the cells of a chunk that lie within the grid. """
+        chunk_x, chunk_y = chunk_key
+        x0, y0 = chunk_x << self.shift, chunk_y << self.shift
+        return x0, y0, min(x0 + self.chunk_size, self.columns), min(y0 + self.chunk_size, self.rows)
+
+    def __getitem__(self, item):
+        y, x = item
+        if isinstance(y, np.ndarray) or isinstance(x, np.ndarray):
+            return self.get_many(x, y)
+        if not (0 <= x < self.columns and 0 <= y < self.rows):
+            return self._outside
+        chunk = self.chunks.get((x >> self.shift, y >> self.shift))
+        if chunk is None:
+            return self._fill
+        return chunk[y & self.mask, x & self.mask]
+
+    def __setitem__(self, item, value):
+        y, x = item
+        if isinstance(y, np.ndarray) or isinstance(x, np.ndarray):
+            self.set_many(x, y, value)
+            return
+        if not (0 <= x < self.columns and 0 <= y < self.rows):
+            raise IndexError(f"({x}, {y}) is outside the {self.columns} x {self.rows} grid")
+        chunk_key = (x >> self.shift, y >> self.shift)
+        self.chunk(chunk_key)[y & self.mask, x & self.mask] = value
+        self.version += 1
+        self.chunk_versions[chunk_key] = self.version
+
+    def chunk_groups(self, xs, ys):
+        """ (chunk key, boolean mask of the cells in that chunk) for every chunk the cells (xs, ys) fall into. """
+        chunk_xs, chunk_ys = xs >> self.shift, ys >> self.shift
+        keys = np.stack([chunk_xs.ravel(), chunk_ys.ravel()], axis=1)
+        for chunk_x, chunk_y in np.unique(keys, axis=0).tolist():
+            yield (chunk_x, chunk_y), (chunk_xs == chunk_x) & (chunk_ys == chunk_y)
+
+    def get_many(self, xs, ys):
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64))
+        inside = (xs >= 0) & (xs < self.columns) & (ys >= 0) & (ys < self.rows)
+        values = np.where(inside, self._fill, self._outside).astype(self.dtype)
+        for chunk_key, in_chunk in self.chunk_groups(xs, ys):
+            chunk = self.chunks.get(chunk_key)
+            in_chunk &= inside
+            if chunk is not None:
+                values[in_chunk] = chunk[ys[in_chunk] & self.mask, xs[in_chunk] & self.mask]
+        return values
+
+    def set_many(self, xs, ys, values):
+        xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype), xs.shape)
+        outside = (xs < 0) | (xs >= self.columns) | (ys < 0) | (ys >= self.rows)
+        if outside.any():
+            index = np.flatnonzero(outside)[0]
+            raise IndexError(f"({xs.flat[index]}, {ys.flat[index]}) is outside the {self.columns} x {self.rows} grid")
+        for chunk_key, in_chunk in self.chunk_groups(xs, ys):
+            self.chunk(chunk_key)[ys[in_chunk] & self.mask, xs[in_chunk] & self.mask] = values[in_chunk]
+            self.mark_written(chunk_key)
+
+    def window(self, x0, y0, x1, y1):
+        """ Dense copy of the cells x0 <= x < x1 and y0 <= y < y1, the window may reach outside the grid. """
+        window = np.full((y1 - y0, x1 - x0), self._outside, dtype=self.dtype)
+        # The part of the window inside the grid
+        ix0, iy0 = max(x0, 0), max(y0, 0)
+        ix1, iy1 = min(x1, self.columns), min(y1, self.rows)
+        if ix0 >= ix1 or iy0 >= iy1:
+            return window
+        window[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = self._fill
+        for chunk_y in range(iy0 >> self.shift, ((iy1 - 1) >> self.shift) + 1):
+            for chunk_x in range(ix0 >> self.shift, ((ix1 - 1) >> self.shift) + 1):
+                chunk = self.chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    continue
+                left, bottom = chunk_x << self.shift, chunk_y << self.shift
+                wx0, wy0 = max(ix0, left), max(iy0, bottom)
+                wx1, wy1 = min(ix1, left + self.chunk_size), min(iy1, bottom + self.chunk_size)
+                window[wy0 - y0:wy1 - y0, wx0 - x0:wx1 - x0] = chunk[wy0 - bottom:wy1 - bottom, wx0 - left:wx1 - left]
+        return window
+
+    def to_array(self):
+        """ Dense copy of the whole grid, only sensible for maps that fit on a screen. """
+        return self.window(0, 0, self.columns, self.rows)
@@ -0,0 +1,76 @@
+from bisect import bisect_left
+from itertools import count
+
+
+class DepthOrder:
+    """
+    Keeps drawables in back to front drawing order, highest (screen_y, -screen_x) first.
+
+    Static and dynamic drawables share one sorted list of entries, the drawing order is kept next to it as a plain
+    list. Both are patched in place when a drawable is added, removed or moves past a neighbour, so reading the
+    order costs nothing and keeping it costs a binary search per drawable that moved.
+    """
+    def __init__(self):
+        self.sorted = []  # Sorted (key, tiebreak, drawable), the last entry is drawn first
+        self.order = []  # Drawables in drawing order, the drawables of self.sorted reversed
+        self.entries = {}  # Dynamic drawable -> its entry in self.sorted
+        self.tiebreak = count()
+
+    @staticmethod
+    def depth_key(drawable):
+        return drawable.screen_y, -drawable.screen_x
+
+    def insert(self, entry):
+        """ Returns the position of the entry's drawable in the drawing order. """
+        idx = bisect_left(self.sorted, entry[:2])
+        position = len(self.sorted) - idx
+        self.sorted.insert(idx, entry)
+        self.order.insert(position, entry[2])
+        return position
+
+    def delete(self, entry):
+        idx = bisect_left(self.sorted, entry[:2])
+        del self.sorted[idx]
+        del self.order[len(self.sorted) - idx]
+
+    def add_static(self, drawable):
+        """ Returns the position of the drawable in the drawing order. """
+        return self.insert((self.depth_key(drawable), next(self.tiebreak), drawable))
+
+    def add(self, drawable):
+        """ Returns the position of the drawable in the drawing order. """
+        entry = (self.depth_key(drawable), next(self.tiebreak), drawable)
+        self.entries[drawable] = entry
+        return self.insert(entry)
+
+    def remove(self, drawable):
+        self.delete(self.entries.pop(drawable))
+
+    def __contains__(self, drawable):
+        return drawable in self.entries
+
+    def index(self, drawable):
+        """ Position of a dynamic drawable in the drawing order. """
+        return len(self.sorted) - 1 - bisect_left(self.sorted, self.entries[drawable][:2])
+
+    def update(self, drawable):
+        """ Re-insert a dynamic drawable if it moved past another one, returns whether that happened. """
+        entry = self.entries[drawable]
+        key = self.depth_key(drawable)
+        if key == entry[0]:
+            return False
+        idx = bisect_left(self.sorted, entry[:2])
+        new_entry = (key, entry[1], drawable)
+        self.entries[drawable] = new_entry
+        # Moving within the same neighbours keeps the order, then the entry can be replaced in place
+        if (idx == 0 or self.sorted[idx - 1][:2] < new_entry[:2]) and \
+                (idx == len(self.sorted) - 1 or new_entry[:2] < self.sorted[idx + 1][:2]):
+            self.sorted[idx] = new_entry
+            return False
+        self.delete(entry)
+        self.insert(new_entry)
+        return True
+
+    def ordered(self):
+        """ All drawables, the one to draw first comes first. Kept up to date in place, do not modify. """
+        return self.order
@@ -1,5 +1,6 @@
-from game_constants import GRID_ROWS
+from projection import projection
 
 
 def calculate_perspective_factor(y):
-    return 1 - (y / GRID_ROWS) * 0.35
+    return projection.perspective_factor(y)
+
@@ -0,0 +1,36 @@
+import time
+
+
+class WallClock:
+    """ Real time clock, used when the game runs inside a window. """
+    def now(self):
+        return time.time()
+
+
+class SimulatedClock:
+    """ Clock that only moves when it is advanced, used to run battles faster than real time. """
+    def __init__(self, start_time=0.0):
+        self.current_time = start_time
+
+    def now(self):
+        return self.current_time
+
+    def advance(self, delta_time):
+        self.current_time += delta_time
+
+
+_clock = WallClock()
+
+
+def now():
+    return _clock.now()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """ Replace the process wide clock, all game objects read the time through this module. """
+    global _clock
+    _clock = clock
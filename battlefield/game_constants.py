@@ -4,9 +4,12 @@ HORIZONTAL_PADDING = 3
 SCREEN_WIDTH = 1200  #1200 #1400
 SCREEN_HEIGHT = 800 #800 #920
 SCREEN_TITLE = "Grid Battlefield"
-GRID_ROWS = 10  # Number of rows
+GRID_ROWS = 10  # Number of rows of the default map, scenarios can bring their own BattleMap
 GRID_COLUMNS = 30  # Number of columns
+CHUNK_SIZE = 32  # Tiles per side of an occupancy chunk, a power of two
 CELL_SIZE = (SCREEN_WIDTH - BOTTOM_GRID_PAD * 2) / 20  # Size of the grid cell at the front
 
 STANDARD_FRAME_TIME = 1 / 10
 MOVEMENT_DELAY = STANDARD_FRAME_TIME * 4  # Delay in seconds for full movement to complete
+
+NO_KEYS_PRESSED = {'left': 0, 'right': 0, 'up': 0, 'down': 0, 'space': 0}
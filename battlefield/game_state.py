@@ -1,95 +1,196 @@
 import random
 
-import numpy as np
-
-from character_configurations import random_10_vs_10, archer_10_vs_10
-from game_constants import GRID_ROWS, CELL_SIZE, MOVEMENT_DELAY, \
-    GRID_COLUMNS
+import state_snapshot
+from a_star import closest_open_tile_to
+from battle_map import scenario_map
+from character_configurations import random_10_vs_10, archer_10_vs_10, scenario_unit_classes
+from chunked_grid import ChunkedGrid
+from game_constants import CELL_SIZE, MOVEMENT_DELAY, NO_KEYS_PRESSED
+from navigation import Navigation
+from occupancy_grid import OccupancyGrid
 from player_character import PlayerCharacter
+from projectiles import ProjectileSystem
+from projection import Projection
+from spatial_index import SpatialIndex
+from state_columns import StateColumns
+from unit_store import UnitStore
 from trees import Tree1, Tree2
-from weapon import Arrow
 
 
 class GameState:
-    def __init__(self):
-        self.player_character = PlayerCharacter(5, GRID_ROWS // 2 - 1, CELL_SIZE, MOVEMENT_DELAY, team=0)
-
-        self.ai_characters = random_10_vs_10()
+    def __init__(self, scenario=random_10_vs_10, with_player=True, use_unit_store=False, seed=None, player_count=1):
+        # All randomness of a battle comes from here, so a seed reproduces the whole battle
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.battle_map = battle_map = scenario_map(scenario)
+        # Grid to screen mapping of this map, several battles of different sizes can live in one process
+        self.projection = Projection(battle_map.rows, battle_map.columns)
+        self.occupancy = OccupancyGrid(battle_map.rows, battle_map.columns, battle_map.chunk_size)
+        self.unit_store = UnitStore() if use_unit_store else None
+        self.navigation = Navigation(self)
+        self.spatial_index = SpatialIndex(battle_map.rows, battle_map.columns)
+        # Mirror of the simulation state of every spawned character and animation, a snapshot copies these
+        self.character_states = StateColumns(state_snapshot.CHARACTER_COLUMNS, state_snapshot.CHARACTER_DEFAULTS)
+        self.animation_states = StateColumns(state_snapshot.ANIMATION_COLUMNS)
+
+        self.ai_characters = scenario(self.rng)
         # self.ai_characters = archer_10_vs_10()
+        # The preloader only loads the assets of the classes a scenario lists
+        unit_classes = scenario_unit_classes(scenario)
+        unlisted = {type(character).__name__ for character in self.ai_characters} - \
+            {unit_class.__name__ for unit_class in unit_classes}
+        if unit_classes and unlisted:
+            raise ValueError(f"{scenario.__name__} spawns {', '.join(sorted(unlisted))}, missing from its unit_classes")
+        for ai_character in self.ai_characters:
+            self.spawn_character(ai_character)
+
+        # One player character per client of a lockstep battle, a local battle only has the first
+        self.player_characters = []
+        if with_player:
+            for player in range(player_count):
+                self.player_characters.append(PlayerCharacter(*self.player_spawn(player, battle_map), CELL_SIZE,
+                                                              MOVEMENT_DELAY, team=player % 2))
+                self.spawn_character(self.player_characters[-1])
 
         # Init some random trees
         self.trees = []
-        self.arrows = []
+        self.projectiles = ProjectileSystem(projection=self.projection)
         self.stuff = []
         self.setup_field()
-        self.grid = None
-        self.update_game_grid()
+        self.snapshot_roster = None  # Kept by state_snapshot
+
+    def snapshot(self):
+        """ Compact bytes with the simulation state of the battle, see state_snapshot for the layout. """
+        return state_snapshot.take_snapshot(self)
+
+    def checksum(self):
+        """ crc32 of the hp and positions of the characters, what lockstep clients compare. """
+        return state_snapshot.checksum(self)
+
+    def restore(self, snapshot):
+        """ Go back to a snapshot of this battle, or of another battle with the same characters. """
+        state_snapshot.restore_snapshot(self, snapshot)
+
+    @staticmethod
+    def player_spawn(player, battle_map):
+        """ Grid position of a player character, players take turns between the left and the right team. """
+        row = battle_map.rows // 2 - 1 + (player // 2 + 1) // 2 * (1 if player // 2 % 2 else -1)
+        return (5 if player % 2 == 0 else battle_map.columns - 6), row
+
+    @property
+    def player_character(self):
+        """ The first player character, the one controlled by the keyboard of a local battle. """
+        return self.player_characters[0] if self.player_characters else None
 
     @property
     def drawables(self):
-        return self.trees + self.stuff + self.characters + self.arrows
+        return self.trees + self.stuff + self.characters + self.projectiles.drawables()
 
     @property
     def characters(self):
-        return [self.player_character] + self.ai_characters
+        return self.player_characters + self.ai_characters
+
+    def living_teams(self):
+        return {character.team for character in self.characters if not character.is_dead()}
+
+    def is_finished(self):
+        """ A battle is over once at most one team has living characters left. """
+        return len(self.living_teams()) <= 1
+
+    def update(self, delta_time, keys_pressed, player_keys=None):
+        """
+        Advance the whole battle by one tick.
+
+        player_keys holds the keys of every player character, by default the first player gets keys_pressed and the
+        others stand still.
+        """
+        self.navigation.invalidate()
+        if self.unit_store is not None:
+            self.unit_store.tick_cooldowns()
+
+        if player_keys is None:
+            player_keys = [keys_pressed] + [NO_KEYS_PRESSED] * (len(self.player_characters) - 1)
+        for player_character, keys in zip(self.player_characters, player_keys):
+            player_character.update(delta_time, self, keys)
+
+        self.projectiles.update(self)
+
+        for ai_character in self.ai_characters:
+            ai_character.update(delta_time, self, keys_pressed)
+
+        if self.unit_store is not None:
+            self.unit_store.resolve_attacks(self.occupancy.entity_ids)
 
     @property
-    def walkable_tiles(self) -> np.ndarray:
-        grid = np.ones((GRID_ROWS, GRID_COLUMNS), bool)
-        for d in self.drawables:
-            from hitpoints_mixin import HitPointsMixin
-            if isinstance(d, HitPointsMixin):
-                if not d.is_dead():
-                    grid[d.grid_y, d.grid_x] = False
-            else:
-                grid[d.grid_y, d.grid_x] = False
-        return grid
+    def walkable_tiles(self) -> ChunkedGrid:
+        """ Live view of the occupancy grid, do not modify. """
+        return self.occupancy.walkable
+
+    def spawn_character(self, character):
+        """ Put a character on the field, moving it to the closest free tile if its spot is already taken. """
+        character.use_projection(self.projection)
+        if not self.occupancy.walkable[character.grid_y, character.grid_x]:
+            open_tile = closest_open_tile_to(self.occupancy.walkable, character.grid_x, character.grid_y)
+            if open_tile is None:
+                raise ValueError(f"No free tile left on the {self.battle_map.rows} x {self.battle_map.columns} map "
+                                 f"for the {type(character).__name__} at ({character.grid_x}, {character.grid_y})")
+            character.teleport(*open_tile)
+        character.game_state = self
+        self.occupancy.register(character)
+        self.character_states.bind(character, character.weapon)
+        for animation in character.animations.values():
+            self.animation_states.bind(animation)
+        if self.unit_store is not None:
+            self.unit_store.bind(character)
+        if not character.is_dead():
+            self.occupancy.place(character)
+            self.spatial_index.insert(character)
+
+    def add_tree(self, tree):
+        self.trees.append(tree)
+        self.occupancy.place(tree)
+
+    def on_character_moved(self, character, old_x, old_y):
+        self.occupancy.move(character, old_x, old_y)
+        self.spatial_index.move(character, old_x, old_y)
+        if self.unit_store is not None:
+            self.unit_store.move(character)
+
+    def on_character_died(self, character):
+        self.occupancy.remove(character)
+        self.spatial_index.remove(character)
 
     def setup_field(self):
-        # Create border trees
-        left_coords = [(4, 0), (4, 1), (3, 2), (3, 3), (2, 4), (2, 5), (1, 6), (1, 7), (0, 8), (0, 9)]
-        for x, y in left_coords:
-            for loop_x in range(0, x + 1):
-                self.trees.append(Tree1(loop_x, y))
-
-        right_coords = [(25, 0), (25, 1), (26, 2), (26, 3), (27, 4), (27, 5), (28, 6), (28, 7), (29, 8), (29, 9)]
-        for x, y in right_coords:
-            for loop_x in range(x, GRID_COLUMNS):
-                self.trees.append(Tree1(loop_x, y))
+        columns = self.battle_map.columns
+        if self.battle_map.border_trees:
+            # Create border trees, the right edge mirrors the left one
+            border_coords = [(4, 0), (4, 1), (3, 2), (3, 3), (2, 4), (2, 5), (1, 6), (1, 7), (0, 8), (0, 9)]
+            for x, y in border_coords:
+                for loop_x in range(0, x + 1):
+                    self.add_tree(Tree1(loop_x, y, self.rng, self.projection))
+
+            for x, y in border_coords:
+                for loop_x in range(columns - 1 - x, columns):
+                    self.add_tree(Tree1(loop_x, y, self.rng, self.projection))
 
         # Add random trees
-        num_random_trees = 14
+        num_random_trees = self.battle_map.random_trees
         for _ in range(num_random_trees // 3 * 2):
-            self.trees.append(Tree1(*self.random_empty_coordinates()))
+            self.add_tree(Tree1(*self.random_empty_coordinates(), self.rng, self.projection))
         for _ in range(num_random_trees // 3):
-            self.trees.append(Tree2(*self.random_empty_coordinates()))
+            self.add_tree(Tree2(*self.random_empty_coordinates(), self.rng, self.projection))
 
         self.trees = sorted(self.trees, key=lambda t: t.grid_y, reverse=True)
 
     def random_empty_coordinates(self):
         empty_spots = self.walkable_tiles
-        x, y = random.randint(0, GRID_COLUMNS - 1), random.randint(0, GRID_ROWS - 1)
+        rows, columns = empty_spots.shape
+        x, y = self.rng.randint(0, columns - 1), self.rng.randint(0, rows - 1)
         while not empty_spots[y, x]:
-            x, y = random.randint(0, GRID_COLUMNS - 1), random.randint(0, GRID_ROWS - 1)
+            x, y = self.rng.randint(0, columns - 1), self.rng.randint(0, rows - 1)
         return x, y
 
-    def update_game_grid(self):
-        """ Create a grid representing the current state of all elements on the field. Index with [y][x]"""
-        # Initialize an empty grid
-        self.grid = [[None for _ in range(GRID_COLUMNS)] for _ in range(GRID_ROWS)]
-
-        # Place trees
-        for tree in self.trees:
-            self.grid[tree.grid_y][tree.grid_x] = tree
-
-        # Place AI characters
-        for character in self.characters:
-            if not character.is_dead():
-                self.grid[character.grid_y][character.grid_x] = character
-
-        # Place the player character
-        # self.grid[self.player_character.grid_y][self.player_character.grid_x] = self.player_character
-
     @property
     def game_grid(self):
-        return self.grid
\ No newline at end of file
+        """ The entity standing on each tile, index with [y, x]. """
+        return self.occupancy.occupants
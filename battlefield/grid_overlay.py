@@ -0,0 +1,60 @@
+import arcade
+import numpy as np
+from PIL import Image, ImageDraw
+
+WALKABLE_COLOR, WALKABLE_ALPHA = (0, 0, 0), 40
+BLOCKED_COLOR, BLOCKED_ALPHA = (225, 0, 0), 80
+
+
+def make_outline_texture(size, line_width=3):
+    """ White square outline, tinted per tile by the sprite color. """
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(image).rectangle((0, 0, size - 1, size - 1), outline=(255, 255, 255, 255), width=line_width)
+    return arcade.Texture(f"grid_outline_{size}_{line_width}", image=image, hit_box_algorithm="None")
+
+
+class GridOverlay:
+    """
+    Tile outlines of the battlefield, built once as one sprite per tile in a single SpriteList.
+
+    Every frame only the tiles whose walkability changed since the last frame get a new tint, the whole overlay
+    is then drawn with one draw call. Meant for maps that fit on the screen, it keeps a dense copy of the grid and
+    only compares the chunks written since the last frame against it.
+    """
+    def __init__(self, walkable_tiles, projection):
+        self.walkable = walkable_tiles.to_array()
+        self.version = walkable_tiles.version
+        self.sprite_list = arcade.SpriteList(use_spatial_hash=False)
+        texture = make_outline_texture(int(round(projection.cell_size)))
+        self.sprites = {}
+        rows, columns = walkable_tiles.shape
+        for y in range(rows):
+            cell_width = projection.cell_width(y)
+            for x in range(columns):
+                screen_x, screen_y = projection.grid_to_screen(x, y)
+                sprite = arcade.Sprite(texture=texture, center_x=screen_x + cell_width / 2, center_y=screen_y + cell_width / 2)
+                sprite.width = sprite.height = cell_width
+                self.set_tint(sprite, self.walkable[y, x])
+                self.sprites[(x, y)] = sprite
+                self.sprite_list.append(sprite)
+
+    @staticmethod
+    def set_tint(sprite, walkable):
+        if walkable:
+            sprite.color, sprite.alpha = WALKABLE_COLOR, WALKABLE_ALPHA
+        else:
+            sprite.color, sprite.alpha = BLOCKED_COLOR, BLOCKED_ALPHA
+
+    def update(self, walkable_tiles):
+        for chunk_key in walkable_tiles.chunks_written_since(self.version):
+            x0, y0, x1, y1 = walkable_tiles.chunk_bounds(chunk_key)
+            window = walkable_tiles.window(x0, y0, x1, y1)
+            copy = self.walkable[y0:y1, x0:x1]
+            changed_y, changed_x = np.nonzero(window != copy)
+            for y, x in zip(changed_y.tolist(), changed_x.tolist()):
+                self.set_tint(self.sprites[(x0 + x, y0 + y)], window[y, x])
+            copy[changed_y, changed_x] = window[changed_y, changed_x]
+        self.version = walkable_tiles.version
+
+    def draw(self):
+        self.sprite_list.draw()
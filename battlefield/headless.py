@@ -0,0 +1,83 @@
+import argparse
+import time
+
+import game_clock
+from character_configurations import random_10_vs_10
+from game_clock import SimulatedClock
+from game_constants import NO_KEYS_PRESSED
+from game_state import GameState
+from state_snapshot import snapshot_time
+
+TICK_TIME = 1 / 60  # Same update rate as the BattlefieldWindow
+
+
+class HeadlessSimulation:
+    """
+    Advances a GameState in whole fixed ticks without a window.
+
+    The clock must be installed with game_clock.set_clock before the GameState is constructed, since characters
+    and animations store the time they were created at. Use HeadlessSimulation.create to do both in the right order.
+    """
+    def __init__(self, game_state, clock, tick_time=TICK_TIME):
+        self.game_state = game_state
+        self.clock = clock
+        self.tick_time = tick_time
+        self.tick = 0
+
+    @classmethod
+    def create(cls, scenario=random_10_vs_10, with_player=False, tick_time=TICK_TIME, **game_state_kwargs):
+        clock = SimulatedClock()
+        game_clock.set_clock(clock)
+        return cls(GameState(scenario=scenario, with_player=with_player, **game_state_kwargs), clock, tick_time)
+
+    @property
+    def simulated_time(self):
+        return self.tick * self.tick_time
+
+    def step(self, keys_pressed=None, player_keys=None):
+        # Several simulations can take turns in one process, each runs on its own clock
+        game_clock.set_clock(self.clock)
+        self.clock.advance(self.tick_time)
+        self.game_state.update(self.tick_time, keys_pressed or NO_KEYS_PRESSED, player_keys)
+        self.tick += 1
+
+    def snapshot(self):
+        game_clock.set_clock(self.clock)
+        return self.game_state.snapshot()
+
+    def restore(self, snapshot, tick):
+        """ Go back to a snapshot taken at tick, the clock is put back to when it was taken so no time shifts. """
+        game_clock.set_clock(self.clock)
+        self.clock.current_time = snapshot_time(snapshot)
+        self.game_state.restore(snapshot)
+        self.tick = tick
+
+    def run(self, max_ticks):
+        """ Run until one team is left or max_ticks have been simulated, returns the number of ticks run. """
+        start_tick = self.tick
+        while self.tick - start_tick < max_ticks and not self.game_state.is_finished():
+            self.step()
+        return self.tick - start_tick
+
+    def winner(self):
+        living_teams = self.game_state.living_teams()
+        if len(living_teams) == 1:
+            return next(iter(living_teams))
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a battle without a window as fast as possible.")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 5, help="Stop the battle after this many ticks.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the battle, random if not given.")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    simulation = HeadlessSimulation.create(seed=args.seed)
+    ticks = simulation.run(args.max_ticks)
+    print(f"Winner: {simulation.winner()}, simulated {ticks} ticks ({simulation.simulated_time:.1f}s) "
+          f"in {time.time() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,65 @@
 import arcade
 
+from state_columns import Column, StateColumnsMixin
+
+
+class HitPointsMixin(StateColumnsMixin):
+    # Set by UnitStore.bind, after that hp and hit_cooldown live in the store's arrays
+    unit_store = None
+    unit_row = None
+    # Mirrored into the battle's StateColumns once spawned
+    max_hp = Column()
+    _hp = Column('hp')
+    _hit_cooldown = Column('hit_cooldown')
 
-class HitPointsMixin:
     def __init__(self, hp):
         self.max_hp = 0
-        self.hp = 0
+        self._hp = 0
+        self._hit_cooldown = 0
         self.set_max_hp(hp)
         self.hit_cooldown_time = 4
         self.hit_cooldown = self.hit_cooldown_time
 
+    @property
+    def hp(self):
+        if self.unit_store is None:
+            return self._hp
+        return int(self.unit_store.hp[self.unit_row])
+
+    @hp.setter
+    def hp(self, value):
+        if self.unit_store is None:
+            self._hp = value
+        else:
+            self.unit_store.hp[self.unit_row] = value
+
+    @property
+    def hit_cooldown(self):
+        if self.unit_store is None:
+            return self._hit_cooldown
+        return int(self.unit_store.hit_cooldown[self.unit_row])
+
+    @hit_cooldown.setter
+    def hit_cooldown(self, value):
+        if self.unit_store is None:
+            self._hit_cooldown = value
+        else:
+            self.unit_store.hit_cooldown[self.unit_row] = value
+
     def set_max_hp(self, hp, heal_to_full=True):
         self.max_hp = hp
         if heal_to_full:
             self.hp = hp
 
     def hit(self, damage):
+        was_dead = self.is_dead()
         self.hp -= damage
         self.hit_cooldown += self.hit_cooldown_time
+        if not was_dead and self.is_dead():
+            self.on_death()
+
+    def on_death(self):
+        pass
 
     def is_dead(self):
         return self.hp <= 0
@@ -51,5 +94,7 @@ class HitPointsMixin:
         )
 
     def update(self, *args, **kwargs):
+        if self.unit_store is not None:
+            return  # Ticked for all characters at once by UnitStore.tick_cooldowns
         if self.hit_cooldown > 0:
             self.hit_cooldown -= 1
\ No newline at end of file
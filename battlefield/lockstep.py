@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import random
+import struct
+import threading
+import time
+
+from battle_map import scenario_map
+from character_configurations import SCENARIOS
+from headless import HeadlessSimulation
+from replay import INPUT_KEYS, pack_keys, unpack_keys
+
+INPUT_DELAY = 3  # Ticks between pressing a key and the tick it is applied on, hides the round trip to the server
+CHECKSUM_INTERVAL = 10  # Ticks between checksums, a desync is still caught a fraction of a second after it happened
+START, INPUT, CHECKSUM, DESYNC = 1, 2, 3, 4
+
+# Every message is a header followed by the payload of its type, all little endian
+HEADER = struct.Struct("<BI")  # Message type, tick
+PAYLOADS = {
+    START: struct.Struct("<QBBBH"),  # Seed, player count, player index, input delay, scenario name length + name
+    INPUT: struct.Struct("<BB"),  # Player, key bits of that player on the tick
+    CHECKSUM: struct.Struct("<BI"),  # Player, that player's GameState.checksum after the tick
+    DESYNC: struct.Struct("<B"),  # Player whose checksum differs from the first player's
+}
+
+
+def encode(message_type, tick, *values):
+    if message_type == START:
+        *values, scenario_name = values
+        name = scenario_name.encode('utf-8')
+        return HEADER.pack(START, tick) + PAYLOADS[START].pack(*values, len(name)) + name
+    return HEADER.pack(message_type, tick) + PAYLOADS[message_type].pack(*values)
+
+
+async def read_message(reader):
+    """ (message type, tick, payload values), raises asyncio.IncompleteReadError once the other side is gone. """
+    message_type, tick = HEADER.unpack(await reader.readexactly(HEADER.size))
+    payload = PAYLOADS[message_type]
+    values = payload.unpack(await reader.readexactly(payload.size))
+    if message_type == START:
+        values = values[:-1] + ((await reader.readexactly(values[-1])).decode('utf-8'),)
+    return message_type, tick, values
+
+
+class LockstepServer:
+    """
+    Relays the inputs of every player to all others and compares their checksums, it never simulates the battle.
+
+    The battle starts once player_count clients are connected, each then gets the seed, scenario and its player
+    index. A tick whose checksums do not all match is reported to every client as a desync. Players who left are
+    no longer waited for, so the checksums of the ticks they did not report are still compared and dropped.
+    """
+    def __init__(self, player_count=2, scenario_name='random_10_vs_10', seed=None, input_delay=INPUT_DELAY):
+        self.player_count = player_count
+        self.scenario_name = scenario_name
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.input_delay = input_delay
+        self.writers = []
+        self.handlers = []
+        self.connected = set()  # Players whose client is still there
+        self.checksums = {}  # Tick -> {player: checksum}, until all connected players reported the tick
+        self.desync_tick = None
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """ Listen for clients, returns the port, which is picked by the system when port is 0. """
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        for writer in self.writers:
+            writer.close()
+        await asyncio.gather(*self.handlers)
+
+    def broadcast(self, message, skip=None):
+        for player, writer in enumerate(self.writers):
+            if player != skip:
+                writer.write(message)
+
+    async def handle_client(self, reader, writer):
+        if len(self.writers) == self.player_count:
+            writer.close()
+            return
+        player = len(self.writers)
+        self.writers.append(writer)
+        self.connected.add(player)
+        self.handlers.append(asyncio.current_task())
+        if len(self.writers) == self.player_count:
+            for index, client in enumerate(self.writers):
+                client.write(encode(START, 0, self.seed, self.player_count, index, self.input_delay,
+                                    self.scenario_name))
+
+        try:
+            while True:
+                message_type, tick, values = await read_message(reader)
+                if message_type == INPUT:
+                    self.broadcast(encode(INPUT, tick, *values), skip=player)
+                elif message_type == CHECKSUM:
+                    self.compare_checksum(tick, *values)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # The client left, the others stall on its missing inputs
+            self.connected.discard(player)
+            for tick in sorted(self.checksums):
+                self.settle_checksums(tick)
+
+    def compare_checksum(self, tick, player, checksum):
+        self.checksums.setdefault(tick, {})[player] = checksum
+        self.settle_checksums(tick)
+
+    def settle_checksums(self, tick):
+        """ Compare the checksums of a tick once every connected player reported it. """
+        checksums = self.checksums[tick]
+        if not self.connected.issubset(checksums):
+            return
+        del self.checksums[tick]
+        players = sorted(checksums)
+        for other_player in players[1:]:
+            if checksums[other_player] != checksums[players[0]] and self.desync_tick is None:
+                self.desync_tick = tick
+                self.broadcast(encode(DESYNC, tick, other_player))
+
+
+class LockstepClient:
+    """
+    One player of a lockstep battle. Every client simulates the whole battle, only key presses cross the wire.
+
+    Keys submitted while the simulation is at tick t are applied on tick t + input_delay by every client, and a
+    tick is only simulated once the keys of all players for it arrived. Every CHECKSUM_INTERVAL ticks the client
+    sends its GameState.checksum, so the server can tell when the simulations went apart.
+    """
+    def __init__(self):
+        self.simulation = None
+        self.player_index = None
+        self.player_count = None
+        self.input_delay = None
+        self.inputs = {}  # Tick -> key bits per player, None while that player's keys did not arrive yet
+        self.next_input_tick = 0
+        self.desync_tick = None
+        self.disconnected = False
+        self.writer = None
+        self.receiver = None
+
+    async def connect(self, host='127.0.0.1', port=0):
+        """ Join a server and wait for the battle to start. """
+        reader, self.writer = await asyncio.open_connection(host, port)
+        _, _, (seed, self.player_count, self.player_index, self.input_delay, scenario_name) = await read_message(reader)
+        self.simulation = HeadlessSimulation.create(SCENARIOS[scenario_name], with_player=True, seed=seed,
+                                                    player_count=self.player_count)
+        # Nobody can have pressed anything for the first ticks
+        self.inputs = {tick: [0] * self.player_count for tick in range(self.input_delay)}
+        self.next_input_tick = self.input_delay
+        self.receiver = asyncio.ensure_future(self.receive(reader))
+
+    @property
+    def game_state(self):
+        return self.simulation.game_state
+
+    @property
+    def tick(self):
+        return self.simulation.tick
+
+    def close(self):
+        self.receiver.cancel()
+        self.writer.close()
+
+    async def receive(self, reader):
+        try:
+            while True:
+                message_type, tick, values = await read_message(reader)
+                if message_type == INPUT:
+                    self.set_input(tick, *values)
+                elif message_type == DESYNC:
+                    self.desync_tick = tick
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.disconnected = True
+
+    def set_input(self, tick, player, key_bits):
+        self.inputs.setdefault(tick, [None] * self.player_count)[player] = key_bits
+
+    def submit(self, keys_pressed):
+        """ Send the local keys for the next free tick, returns False while that is too far ahead of the others. """
+        if self.next_input_tick > self.simulation.tick + self.input_delay:
+            return False
+        key_bits = pack_keys(keys_pressed)
+        self.set_input(self.next_input_tick, self.player_index, key_bits)
+        self.writer.write(encode(INPUT, self.next_input_tick, self.player_index, key_bits))
+        self.next_input_tick += 1
+        return True
+
+    def advance(self):
+        """ Simulate every tick whose inputs are complete, returns how many ticks that were. """
+        ticks = 0
+        while None not in self.inputs.get(self.simulation.tick, [None]):
+            tick = self.simulation.tick
+            self.simulation.step(player_keys=[unpack_keys(key_bits) for key_bits in self.inputs.pop(tick)])
+            if tick % CHECKSUM_INTERVAL == 0:
+                self.writer.write(encode(CHECKSUM, tick, self.player_index, self.game_state.checksum()))
+            ticks += 1
+        return ticks
+
+    def step(self, keys_pressed):
+        """ Submit the local keys and catch up on every complete tick, what a window calls once per frame. """
+        self.submit(keys_pressed)
+        self.advance()
+
+
+class LockstepSession:
+    """
+    A LockstepClient on its own event loop thread, so the BattlefieldWindow can drive it with step like a
+    ReplayRecorder. The simulation only runs on the loop thread, step waits for it to catch up.
+
+    Once the battle went out of sync or the server is gone, status tells the player why and step does nothing.
+    """
+    def __init__(self, host, port):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.client = LockstepClient()
+        self.call(self.client.connect(host, port))
+        self.status = None
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    @property
+    def game_state(self):
+        return self.client.game_state
+
+    def step(self, keys_pressed):
+        if self.status is not None:
+            return
+
+        async def step():
+            self.client.step(keys_pressed)
+        self.call(step())
+        if self.client.desync_tick is not None:
+            self.status = f"Out of sync since tick {self.client.desync_tick}, the battle is stopped"
+        elif self.client.disconnected:
+            self.status = "Lost the connection to the server, the battle is stopped"
+        if self.status is not None:
+            self.loop.call_soon_threadsafe(self.client.close)
+
+
+async def play_bots(player_count, ticks, scenario_name, seed, input_delay):
+    """ A server and player_count clients pressing random keys, all in one process. Returns the clients. """
+    server = LockstepServer(player_count, scenario_name, seed, input_delay)
+    port = await server.start()
+    clients = [LockstepClient() for _ in range(player_count)]
+    await asyncio.gather(*[client.connect(port=port) for client in clients])
+
+    rng = random.Random(seed)
+    while any(client.tick < ticks for client in clients):
+        for client in clients:
+            if client.desync_tick is not None:
+                raise RuntimeError(f"Battle out of sync since tick {client.desync_tick}")
+            if client.tick < ticks:
+                client.step({key: rng.random() < 0.2 for key in INPUT_KEYS})
+        await asyncio.sleep(0)
+
+    for client in clients:
+        client.close()
+    await server.close()
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host a lockstep battle, or play one with bots over localhost.")
+    parser.add_argument("--serve", action='store_true', help="Only host, windows join with battlefield.py --join.")
+    parser.add_argument("--host", type=str, default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default='random_10_vs_10')
+    parser.add_argument("--ticks", type=int, default=60 * 30, help="Ticks the bots play.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--input-delay", type=int, default=INPUT_DELAY)
+    args = parser.parse_args()
+
+    if args.serve:
+        if not scenario_map(SCENARIOS[args.scenario]).fits_window():
+            parser.error(f"{args.scenario} is too large for the window, windows could not join it")
+        async def serve():
+            server = LockstepServer(args.players, args.scenario, args.seed, args.input_delay)
+            port = await server.start(args.host, args.port)
+            print(f"Waiting for {args.players} players on {args.host}:{port}")
+            await server.server.serve_forever()
+        asyncio.run(serve())
+        return
+
+    start_time = time.time()
+    clients = asyncio.run(play_bots(args.players, args.ticks, args.scenario, args.seed, args.input_delay))
+    snapshots = {client.simulation.snapshot() for client in clients}
+    print(f"{args.players} clients played {args.ticks} ticks in {time.time() - start_time:.2f}s, "
+          f"{'in sync' if len(snapshots) == 1 else 'OUT OF SYNC'}")
+
+
+if __name__ == "__main__":
+    main()
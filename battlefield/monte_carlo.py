@@ -0,0 +1,92 @@
+import argparse
+import csv
+import time
+from collections import defaultdict
+from multiprocessing import Pool, cpu_count
+
+from character_configurations import SCENARIOS
+from headless import HeadlessSimulation, TICK_TIME
+
+UNIT_CLASSES = ['AICharacter', 'AIKnight', 'AIArcher']
+
+
+def run_battle(scenario_name, seed, max_ticks, use_unit_store=False):
+    """ Play one headless battle and return a flat dictionary with its results. """
+    simulation = HeadlessSimulation.create(SCENARIOS[scenario_name], use_unit_store=use_unit_store, seed=seed)
+    ticks = simulation.run(max_ticks)
+
+    winner = simulation.winner()
+    result = {
+        'seed': seed,
+        'scenario': scenario_name,
+        'winner': '' if winner is None else winner,
+        'ticks': ticks,
+        'duration_s': round(ticks * TICK_TIME, 3),
+    }
+    for unit_class in UNIT_CLASSES:
+        result[f'survivors_{unit_class}'] = 0
+        result[f'damage_{unit_class}'] = 0
+    for team in (0, 1):
+        result[f'damage_team_{team}'] = 0
+    for character in simulation.game_state.characters:
+        unit_class = type(character).__name__
+        if unit_class in UNIT_CLASSES:
+            result[f'damage_{unit_class}'] += character.damage_dealt
+            if not character.is_dead():
+                result[f'survivors_{unit_class}'] += 1
+        result[f'damage_team_{character.team}'] += character.damage_dealt
+    return result
+
+
+def _run_battle_job(job):
+    return run_battle(*job)
+
+
+def summarize(results):
+    """ Win rates and averages over a list of battle results. """
+    summary = {'battles': len(results)}
+    if not results:
+        return summary
+    wins = defaultdict(int)
+    for result in results:
+        wins[result['winner'] if result['winner'] != '' else 'draw'] += 1
+    for winner, count in sorted(wins.items(), key=lambda item: str(item[0])):
+        summary[f'win_rate_{winner}'] = count / len(results)
+    for key in results[0]:
+        if key.startswith(('survivors_', 'damage_')) or key in ('ticks', 'duration_s'):
+            summary[f'mean_{key}'] = sum(result[key] for result in results) / len(results)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many headless battles in parallel and report win rates.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default='random_10_vs_10')
+    parser.add_argument("--battles", type=int, default=100, help="Number of battles to play.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first battle, the others count up from it.")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 5, help="Battles still going after this are draws.")
+    parser.add_argument("--processes", type=int, default=cpu_count())
+    parser.add_argument("--output", type=str, default='monte_carlo_results.csv', help="CSV file to stream results to.")
+    parser.add_argument("--unit-store", action='store_true', help="Run the battles with the array backed unit store.")
+    args = parser.parse_args()
+
+    jobs = [(args.scenario, args.seed + idx, args.max_ticks, args.unit_store) for idx in range(args.battles)]
+    chunk_size = max(1, len(jobs) // (args.processes * 8))
+    results = []
+    start_time = time.time()
+    with open(args.output, 'w', newline='') as csv_file, Pool(args.processes) as pool:
+        writer = None
+        for result in pool.imap_unordered(_run_battle_job, jobs, chunksize=chunk_size):
+            if writer is None:
+                writer = csv.DictWriter(csv_file, fieldnames=list(result))
+                writer.writeheader()
+            writer.writerow(result)
+            csv_file.flush()
+            results.append(result)
+
+    print(f"Played {len(results)} battles in {time.time() - start_time:.1f}s on {args.processes} processes")
+    for key, value in summarize(results).items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
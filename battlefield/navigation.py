@@ -0,0 +1,210 @@
+import numpy as np
+
+UNREACHABLE = np.iinfo(np.int32).max
+# Straight steps first, so they win ties with diagonal steps
+NEIGHBOURS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)]
+
+
+class FlowField:
+    """
+    Distance from every tile to the closest goal tile, walking in 8 directions.
+
+    Goal tiles are the tiles in the same row as an enemy, at most reach tiles away from it. Tiles taken by friendly
+    characters are passable when computing distances, so characters stuck behind their own team still know which
+    way to go, but next_step only ever steps onto tiles that are free right now.
+
+    The arrays may cover only a window of the map, origin is the tile of their [0, 0] and tiles outside the window
+    are unreachable. seeds are the tiles distances are measured from, the passable goal tiles unless given.
+    """
+    def __init__(self, goal_mask, passable, origin=(0, 0), seeds=None):
+        self.goal_mask = goal_mask
+        self.origin_x, self.origin_y = origin
+        self.distances = self.compute_distances((goal_mask if seeds is None else seeds) & passable, passable)
+
+    @staticmethod
+    def compute_distances(seeds, passable):
+        """ Breadth first search run one ring at a time on whole arrays, every ring grows the last by one tile. """
+        distances = np.full(passable.shape, UNREACHABLE, dtype=np.int32)
+        distances[seeds] = 0
+        unvisited = passable & ~seeds
+        frontier = seeds
+        distance = 0
+        while frontier.any():
+            distance += 1
+            grown = frontier.copy()
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            rows = grown.copy()
+            grown[1:] |= rows[:-1]
+            grown[:-1] |= rows[1:]
+            frontier = grown & unvisited
+            unvisited &= ~frontier
+            distances[frontier] = distance
+        return distances
+
+    def is_goal(self, x, y):
+        x, y = x - self.origin_x, y - self.origin_y
+        rows, columns = self.goal_mask.shape
+        return 0 <= x < columns and 0 <= y < rows and self.goal_mask[y, x]
+
+    def next_step(self, x, y, walkable_tiles):
+        """ Direction of the free neighbouring tile that is closest to a goal, (0, 0) if no free tile is closer. """
+        rows, columns = self.distances.shape
+        local_x, local_y = x - self.origin_x, y - self.origin_y
+        if not (0 <= local_x < columns and 0 <= local_y < rows):
+            return 0, 0
+        best_distance = self.distances[local_y, local_x]
+        best_step = (0, 0)
+        for dx, dy in NEIGHBOURS:
+            nx, ny = local_x + dx, local_y + dy
+            if 0 <= nx < columns and 0 <= ny < rows and walkable_tiles[y + dy, x + dx] and \
+                    self.distances[ny, nx] < best_distance:
+                best_distance = self.distances[ny, nx]
+                best_step = (dx, dy)
+        return best_step
+
+
+NO_FIELD = FlowField(np.zeros((0, 0), dtype=bool), np.zeros((0, 0), dtype=bool))
+
+
+class GroupedFlowField:
+    """
+    The flow fields of every chunk group of one (team, reach), looked up by the chunk a tile is in. Tiles outside
+    every group have no field, they are never a goal and never get a step.
+    """
+    def __init__(self, shift):
+        self.shift = shift
+        self.fields = {}  # Chunk key -> FlowField of its group
+
+    def field_at(self, x, y):
+        return self.fields.get((x >> self.shift, y >> self.shift), NO_FIELD)
+
+    def is_goal(self, x, y):
+        return self.field_at(x, y).is_goal(x, y)
+
+    def next_step(self, x, y, walkable_tiles):
+        return self.field_at(x, y).next_step(x, y, walkable_tiles)
+
+
+class Navigation:
+    """
+    Builds one flow field per (team, reach) on demand and throws them away at the start of every tick.
+
+    Flow fields only cover the occupancy chunks with living characters in them and the chunks around those. Touching
+    chunks form a group with a field of its own, so on a large map the cost follows the size of the armies and
+    not the size of the map or the distance between them. A group without enemies in it cannot see a goal, its
+    field leads towards its chunks that are closest to an enemy on a coarse map with one tile per chunk instead.
+    """
+    def __init__(self, game_state):
+        self.game_state = game_state
+        self.flow_fields = {}
+        self.routes = {}  # Team -> distance in chunks from every chunk to the closest chunk with an enemy
+
+    def invalidate(self):
+        self.flow_fields.clear()
+        self.routes.clear()
+
+    def flow_field(self, team, reach):
+        key = (team, reach)
+        if key not in self.flow_fields:
+            self.flow_fields[key] = self.build_flow_field(team, reach)
+        return self.flow_fields[key]
+
+    def build_flow_field(self, team, reach):
+        walkable_tiles = self.game_state.walkable_tiles
+        living = [character for character in self.game_state.characters if not character.is_dead()]
+        flow_field = GroupedFlowField(walkable_tiles.shift)
+        for group in self.chunk_groups(walkable_tiles, living):
+            field = self.build_group_field(walkable_tiles, group, living, team, reach)
+            flow_field.fields.update((chunk_key, field) for chunk_key in group)
+        return flow_field
+
+    def build_group_field(self, walkable_tiles, group, characters, team, reach):
+        (x0, y0, x1, y1), active = self.group_area(walkable_tiles, group)
+        columns = x1 - x0
+        goal_mask = np.zeros(active.shape, dtype=bool)
+        passable = walkable_tiles.window(x0, y0, x1, y1) & active
+        for character in characters:
+            if walkable_tiles.chunk_of(character.grid_x, character.grid_y) not in group:
+                continue
+            x, y = character.grid_x - x0, character.grid_y - y0
+            if character.team == team:
+                passable[y, x] = True
+            else:
+                goal_mask[y, max(0, x - reach):x] = True
+                goal_mask[y, x + 1:min(columns, x + reach + 1)] = True
+        goal_mask &= active
+        if goal_mask.any():
+            return FlowField(goal_mask, passable, (x0, y0))
+        seeds = self.route_seeds(walkable_tiles, group, team, (x0, y0), active.shape)
+        return FlowField(goal_mask, passable, (x0, y0), seeds)
+
+    def route_seeds(self, walkable_tiles, group, team, origin, shape):
+        """ Tiles of the chunks of a group closest to an enemy, where its field leads when it has no goal. """
+        routes = self.routes.get(team)
+        if routes is None:
+            routes = self.routes[team] = self.chunk_distances(walkable_tiles, team)
+        distance = min(routes[chunk_y, chunk_x] for chunk_x, chunk_y in group)
+        x0, y0 = origin
+        seeds = np.zeros(shape, dtype=bool)
+        if distance == UNREACHABLE:
+            return seeds
+        for chunk_key in group:
+            chunk_x, chunk_y = chunk_key
+            if routes[chunk_y, chunk_x] == distance:
+                left, bottom, right, top = walkable_tiles.chunk_bounds(chunk_key)
+                seeds[bottom - y0:top - y0, left - x0:right - x0] = True
+        return seeds
+
+    def chunk_distances(self, walkable_tiles, team):
+        """ Steps from every chunk to the closest chunk with a living enemy, over chunks with a walkable tile. """
+        chunk_columns, chunk_rows = (index + 1 for index in
+                                     walkable_tiles.chunk_of(walkable_tiles.columns - 1, walkable_tiles.rows - 1))
+        passable = np.full((chunk_rows, chunk_columns), bool(walkable_tiles.fill))
+        for chunk_key, chunk in walkable_tiles.chunks.items():
+            x0, y0, x1, y1 = walkable_tiles.chunk_bounds(chunk_key)
+            passable[chunk_key[1], chunk_key[0]] = chunk[:y1 - y0, :x1 - x0].any()
+        enemy_chunks = np.zeros(passable.shape, dtype=bool)
+        for character in self.game_state.characters:
+            if character.team != team and not character.is_dead():
+                chunk_x, chunk_y = walkable_tiles.chunk_of(character.grid_x, character.grid_y)
+                enemy_chunks[chunk_y, chunk_x] = True
+        # An enemy's own tile is never walkable, its chunk still has to be a way in
+        return FlowField.compute_distances(enemy_chunks, passable | enemy_chunks)
+
+    @staticmethod
+    def chunk_groups(walkable_tiles, characters):
+        """ Sets of touching chunk keys, the chunks of the characters and the chunks around those. """
+        rows, columns = walkable_tiles.shape
+        last_x, last_y = walkable_tiles.chunk_of(columns - 1, rows - 1)
+        active_chunks = {(chunk_x + dx, chunk_y + dy)
+                         for chunk_x, chunk_y in {walkable_tiles.chunk_of(c.grid_x, c.grid_y) for c in characters}
+                         for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                         if 0 <= chunk_x + dx <= last_x and 0 <= chunk_y + dy <= last_y}
+        groups = []
+        for start in sorted(active_chunks):
+            if start not in active_chunks:
+                continue
+            active_chunks.discard(start)
+            group, frontier = {start}, [start]
+            while frontier:
+                chunk_x, chunk_y = frontier.pop()
+                for dx, dy in NEIGHBOURS:
+                    neighbour = (chunk_x + dx, chunk_y + dy)
+                    if neighbour in active_chunks:
+                        active_chunks.discard(neighbour)
+                        group.add(neighbour)
+                        frontier.append(neighbour)
+            groups.append(group)
+        return groups
+
+    @staticmethod
+    def group_area(walkable_tiles, group):
+        """ Bounding box (x0, y0, x1, y1) of the chunks of a group and a mask of their tiles within it. """
+        bounds = [walkable_tiles.chunk_bounds(chunk_key) for chunk_key in group]
+        x0, y0 = min(bound[0] for bound in bounds), min(bound[1] for bound in bounds)
+        x1, y1 = max(bound[2] for bound in bounds), max(bound[3] for bound in bounds)
+        active = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+        for left, bottom, right, top in bounds:
+            active[bottom - y0:top - y0, left - x0:right - x0] = True
+        return (x0, y0, x1, y1), active
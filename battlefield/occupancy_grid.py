@@ -0,0 +1,83 @@
+import numpy as np
+
+from chunked_grid import ChunkedGrid
+from game_constants import CHUNK_SIZE
+
+EMPTY = -1
+NO_TEAM = -1  # Team of entities that can not be hit, like trees
+
+
+class OccupantView:
+    """ Read only view that maps grid cells to the entity standing on them. Index with [y, x]. """
+    def __init__(self, occupancy_grid):
+        self.occupancy_grid = occupancy_grid
+
+    def __getitem__(self, item):
+        y, x = item
+        return self.occupancy_grid.occupant(x, y)
+
+
+class OccupancyGrid:
+    """
+    Persistent grid of entity ids, updated in place whenever something spawns, moves or dies.
+
+    walkable is a boolean grid over the same cells that is kept in sync with the ids, callers should treat it
+    as read only. Both are ChunkedGrids, tiles outside the grid read as empty and not walkable.
+    """
+    def __init__(self, rows, columns, chunk_size=CHUNK_SIZE):
+        self.rows = rows
+        self.columns = columns
+        self.entity_ids = ChunkedGrid(rows, columns, chunk_size, EMPTY, np.int32)
+        self.walkable = ChunkedGrid(rows, columns, chunk_size, True, bool, outside=False)
+        self.entities = []  # Indexed by entity id
+        self.entity_teams = np.zeros(0, dtype=np.int32)  # Indexed by entity id
+        self.occupants = OccupantView(self)
+
+    def register(self, entity):
+        if getattr(entity, 'entity_id', None) is None:
+            entity.entity_id = len(self.entities)
+            self.entities.append(entity)
+            if entity.entity_id >= len(self.entity_teams):
+                grown = np.full(max(16, len(self.entity_teams) * 2), NO_TEAM, dtype=np.int32)
+                grown[:len(self.entity_teams)] = self.entity_teams
+                self.entity_teams = grown
+            self.entity_teams[entity.entity_id] = getattr(entity, 'team', NO_TEAM)
+        return entity.entity_id
+
+    def place(self, entity):
+        self.register(entity)
+        self.set_cell(entity.grid_x, entity.grid_y, entity.entity_id)
+
+    def remove(self, entity, x=None, y=None):
+        """ Clear the cell of an entity, x and y default to its current position. """
+        x = entity.grid_x if x is None else x
+        y = entity.grid_y if y is None else y
+        if self.entity_ids[y, x] == entity.entity_id:
+            self.set_cell(x, y, EMPTY)
+
+    def move(self, entity, old_x, old_y):
+        self.remove(entity, old_x, old_y)
+        self.set_cell(entity.grid_x, entity.grid_y, entity.entity_id)
+
+    def replace_entities(self, entity_ids, placed_ids, xs, ys):
+        """ Clear every cell held by one of entity_ids, then put placed_ids on the cells (xs, ys). """
+        listed = np.zeros(len(self.entities) + 1, dtype=bool)  # Shifted by one, so EMPTY looks up the first entry
+        listed[np.asarray(entity_ids) + 1] = True
+        for chunk_key, chunk in self.entity_ids.chunks.items():
+            cleared = listed[chunk + 1]
+            chunk[cleared] = EMPTY
+            self.entity_ids.mark_written(chunk_key)
+            self.walkable.chunk(chunk_key)[cleared] = True
+            self.walkable.mark_written(chunk_key)
+        self.entity_ids[ys, xs] = placed_ids
+        self.walkable[ys, xs] = False
+
+    def set_cell(self, x, y, entity_id):
+        self.entity_ids[y, x] = entity_id
+        self.walkable[y, x] = entity_id == EMPTY
+
+    def occupant(self, x, y):
+        entity_id = self.entity_ids[y, x]
+        if entity_id == EMPTY:
+            return None
+        return self.entities[entity_id]
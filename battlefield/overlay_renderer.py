@@ -0,0 +1,116 @@
+import arcade
+from PIL import Image, ImageDraw
+
+
+HP_BAR_HEIGHT = 3
+TEAM_INDICATOR_ALPHA = 64
+
+
+def make_ellipse_texture(size=64):
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(image).ellipse((0, 0, size - 1, size - 1), fill=(255, 255, 255, 255))
+    return arcade.Texture(f"overlay_ellipse_{size}", image=image, hit_box_algorithm="None")
+
+
+def make_solid_texture(size=8):
+    return arcade.Texture(f"overlay_solid_{size}", image=Image.new("RGBA", (size, size), (255, 255, 255, 255)),
+                          hit_box_algorithm="None")
+
+
+def make_overlay_sprite(texture, color, alpha=255):
+    sprite = arcade.Sprite(texture=texture)
+    sprite.color = color
+    sprite.alpha = alpha
+    return sprite
+
+
+class CharacterOverlay:
+    """ The team indicator and the three parts of the HP bar of one character. """
+    def __init__(self, ellipse_texture, solid_texture):
+        self.state = None
+        self.team_indicator = make_overlay_sprite(ellipse_texture, arcade.color.BLUE, TEAM_INDICATOR_ALPHA)
+        self.hp_border = make_overlay_sprite(solid_texture, arcade.color.BLACK)
+        self.hp_background = make_overlay_sprite(solid_texture, arcade.color.RED)
+        self.hp_current = make_overlay_sprite(solid_texture, arcade.color.GREEN)
+
+    @property
+    def hp_sprites(self):
+        return [self.hp_border, self.hp_background, self.hp_current]
+
+    def update(self, character, animation, center_x, center_y):
+        """ Same geometry as WalkingFightingCharacter.draw_team_indicator and draw_character_hp_bar. """
+        cell_width = character.projection.cell_width(character.grid_y)
+        perspective_factor = character.projection.perspective_factor(character.grid_y)
+        frame_height = animation.frame_height * animation.scale
+
+        self.team_indicator.color = arcade.color.RED if character.team == 1 else arcade.color.BLUE
+        self.team_indicator.alpha = TEAM_INDICATOR_ALPHA
+        self.team_indicator.center_x = center_x + (-cell_width * 0.1 if character.facing_left else cell_width * 0.1)
+        self.team_indicator.center_y = center_y - frame_height / 2
+        self.team_indicator.width = cell_width * 0.7
+        self.team_indicator.height = cell_width * 0.3
+
+        hp_bar_width = cell_width * .9 * perspective_factor
+        hp_bar_y = center_y + frame_height * 0.4
+        self.set_rectangle(self.hp_border, center_x, hp_bar_y, hp_bar_width + 2, HP_BAR_HEIGHT + 2)
+        self.set_rectangle(self.hp_background, center_x, hp_bar_y, hp_bar_width, HP_BAR_HEIGHT)
+        current_hp_width = hp_bar_width * (character.hp / character.max_hp)
+        self.set_rectangle(self.hp_current, center_x - (hp_bar_width - current_hp_width) / 2, hp_bar_y,
+                           current_hp_width, HP_BAR_HEIGHT)
+
+    @staticmethod
+    def set_rectangle(sprite, center_x, center_y, width, height):
+        sprite.center_x = center_x
+        sprite.center_y = center_y
+        sprite.width = width
+        sprite.height = height
+
+
+class OverlayRenderer:
+    """
+    HP bars and team indicators of all living characters, kept in two shared SpriteLists.
+
+    A character's sprites are only touched when its hp, position, facing or team changed, and each list is drawn
+    with one draw call: team indicators below the characters and HP bars on top of them.
+    """
+    def __init__(self):
+        self.under_list = arcade.SpriteList(use_spatial_hash=False)
+        self.over_list = arcade.SpriteList(use_spatial_hash=False)
+        self.ellipse_texture = make_ellipse_texture()
+        self.solid_texture = make_solid_texture()
+        self.overlays = {}  # Character -> CharacterOverlay
+
+    def add(self, character):
+        overlay = CharacterOverlay(self.ellipse_texture, self.solid_texture)
+        self.under_list.append(overlay.team_indicator)
+        for sprite in overlay.hp_sprites:
+            self.over_list.append(sprite)
+        self.overlays[character] = overlay
+        return overlay
+
+    def remove(self, character):
+        overlay = self.overlays.pop(character)
+        self.under_list.remove(overlay.team_indicator)
+        for sprite in overlay.hp_sprites:
+            self.over_list.remove(sprite)
+
+    def update(self, placements):
+        """ placements holds (animation, center_x, center_y, character) for every living character. """
+        living = set()
+        for animation, center_x, center_y, character in placements:
+            living.add(character)
+            overlay = self.overlays.get(character) or self.add(character)
+            state = (character.hp, character.max_hp, character.team, character.facing_left, character.grid_y,
+                     center_x, center_y, animation.scale)
+            if state != overlay.state:
+                overlay.update(character, animation, center_x, center_y)
+                overlay.state = state
+
+        for character in [character for character in self.overlays if character not in living]:
+            self.remove(character)
+
+    def draw_under(self):
+        self.under_list.draw()
+
+    def draw_over(self):
+        self.over_list.draw()
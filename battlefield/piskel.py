@@ -1,11 +1,14 @@
 import base64
 import io
 import json
+import os
 import random
 import string
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Union, Optional, List
 
+import numpy as np
 from PIL import Image
 from arcade import Texture
 
@@ -20,8 +23,78 @@ def get_random_string(length):
     return random_string
 
 
+PRECISION_BITS = 7  # Fixed point precision of Pillow's alpha compositing
+
+
+def shift_for_div255(value):
+    """ Pillow's rounding division by 255 for values that already had half of 255 added. """
+    return ((value >> 8) + value) >> 8
+
+
+def decode_png(data_url):
+    image_data = base64.b64decode(data_url.split(",")[1])
+    return Image.open(io.BytesIO(image_data)).convert("RGBA")
+
+
+def alpha_composite_layers(images):
+    """
+    Same result as chaining Image.alpha_composite over the images onto a transparent image, computed on whole
+    arrays at once.
+
+    Uses Pillow's fixed point arithmetic, so partially transparent pixels round exactly like Pillow does.
+    """
+    composite = np.zeros_like(np.asarray(images[0]), dtype=np.uint32)
+    for image in images:
+        layer = np.asarray(image, dtype=np.uint32)
+        src_alpha, dst_alpha = layer[..., 3:], composite[..., 3:]
+        blend = dst_alpha * (255 - src_alpha)
+        alpha_255 = src_alpha * 255 + blend
+        coefficient = (src_alpha * 255 * 255 << PRECISION_BITS) // np.maximum(alpha_255, 1)
+        rgb = layer[..., :3] * coefficient + composite[..., :3] * ((255 << PRECISION_BITS) - coefficient)
+        rgb = shift_for_div255(rgb + (0x80 << PRECISION_BITS)) >> PRECISION_BITS
+        blended = np.concatenate([rgb, shift_for_div255(alpha_255 + 0x80)], axis=2)
+        composite = np.where(src_alpha == 0, composite, blended)
+    return Image.fromarray(composite.astype(np.uint8), "RGBA")
+
+
+def flip_frames(strip, frame_width, frame_count):
+    """ Copy of a horizontal strip of frames with every frame mirrored, as one array operation. """
+    pixels = np.asarray(strip)[:, :frame_width * frame_count]
+    height = pixels.shape[0]
+    flipped = pixels.reshape(height, frame_count, frame_width, 4)[:, :, ::-1].reshape(height, -1, 4)
+    return Image.fromarray(np.ascontiguousarray(flipped), "RGBA")
+
+
+class LazyLayerImages(Mapping):
+    """ Layer name -> RGBA image of a piskel file, each layer's PNG is only decoded when it is first used. """
+    def __init__(self, encoded_layers):
+        self.encoded_layers = encoded_layers  # Layer name -> base64 PNG data url
+        self.decoded = {}
+
+    def __getitem__(self, name):
+        image = self.decoded.get(name)
+        if image is None:
+            image = decode_png(self.encoded_layers[name])
+            self.decoded[name] = image
+        return image
+
+    def __contains__(self, name):
+        return name in self.encoded_layers
+
+    def __iter__(self):
+        return iter(self.encoded_layers)
+
+    def __len__(self):
+        return len(self.encoded_layers)
+
+
 class Piskel:
-    def __init__(self, file_path=None, images=None, width=None, height=None, frame_count=None, layer_names=None):
+    _interned = {}  # (absolute path, mtime) -> Piskel
+
+    def __init__(self, file_path=None, images=None, width=None, height=None, frame_count=None, layer_names=None,
+                 lazy=True):
+        """ With lazy set only the layer index of a file is parsed, layers and the composite are built on use. """
+        self.read_only = False
         if images is not None:
             self.name = get_random_string(20)
             self.layer_images = images
@@ -35,38 +108,73 @@ class Piskel:
             self.width = self.data['piskel']['width']
             self.height = self.data['piskel']['height']
             self.frame_count = max(json.loads(layer)['frameCount'] for layer in self.data['piskel']['layers'])
-            self.layer_images = self.extract_images()  # Keeps a dictionary of images keyed by layer names
+            self.layer_images = LazyLayerImages(self.extract_layer_index())  # Images keyed by layer names
+            if not lazy:
+                self.layer_images = dict(self.layer_images)
 
-        self.combined_image = self.build_composite_image(layer_names)
+        self.composite_layer_names = layer_names
+        self._combined_image = None if lazy else self.build_composite_image(layer_names)
         self.left = True
 
+    @property
+    def combined_image(self):
+        if self._combined_image is None:
+            self._combined_image = self.build_composite_image(self.composite_layer_names)
+        return self._combined_image
+
+    @combined_image.setter
+    def combined_image(self, image):
+        self._combined_image = image
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Shared, read only Piskel for a file, parsed only once per file version.
+
+        The returned piskel is shared by every caller, so mutate a copy made with combine_piskels instead.
+        """
+        absolute_path = os.path.abspath(file_path)
+        key = (absolute_path, os.path.getmtime(absolute_path))
+        piskel = cls._interned.get(key)
+        if piskel is None:
+            piskel = cls(file_path)
+            piskel.read_only = True
+            # Drop older versions of the same file
+            for stale_key in [k for k in cls._interned if k[0] == absolute_path]:
+                del cls._interned[stale_key]
+            cls._interned[key] = piskel
+        return piskel
+
+    def check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"Piskel {self.name} is shared between all users of the file and can not be modified.")
+
     def load_json_file(self):
         with open(self.file_path, 'r') as file:
             return json.load(file)
 
-    def extract_images(self):
-        images = {}
+    def extract_layer_index(self):
+        """ Layer name -> base64 PNG of the layer, without decoding anything. """
+        encoded_layers = {}
         for layer_json in self.data['piskel']['layers']:
             layer_data = json.loads(layer_json)
             for chunk in layer_data['chunks']:
-                base64_png = chunk['base64PNG'].split(",")[1]
-                image_data = base64.b64decode(base64_png)
-                image = Image.open(io.BytesIO(image_data)).convert("RGBA")
-                images[layer_data['name']] = image
-        return images
+                encoded_layers[layer_data['name']] = chunk['base64PNG']
+        return encoded_layers
 
     def build_composite_image(self, layer_names=None):
-        combined_image = Image.new("RGBA", next(iter(self.layer_images.values())).size)
         if layer_names is None:
-            for image in self.layer_images.values():
-                combined_image = Image.alpha_composite(combined_image, image)
+            layer_names = self.layer_names
         else:
-            for name in layer_names:
-                if name in self.layer_images:
-                    combined_image = Image.alpha_composite(combined_image, self.layer_images[name])
-        return combined_image
+            layer_names = [name for name in layer_names if name in self.layer_images]
+        if not layer_names:
+            return Image.new("RGBA", next(iter(self.layer_images.values())).size)
+
+        return alpha_composite_layers([self.layer_images[name] for name in layer_names])
 
     def rebuild_composite_image(self, layer_names=None):
+        self.check_writable()
+        self.composite_layer_names = layer_names
         self.combined_image = self.build_composite_image(layer_names)
 
     def get_frame(self, frame_number):
@@ -156,13 +264,10 @@ class Piskel:
 
     def fliplr(self, update_image=True):
         """Flip each frame horizontally and optionally update the combined image."""
-        flipped_frames = [frame.transpose(Image.FLIP_LEFT_RIGHT) for frame in self.get_frames()]
+        flipped_image = flip_frames(self.combined_image, self.width, self.frame_count)
         if update_image:
-            # Rebuild the combined image from flipped frames, placing them side by side
-            new_combined_image = Image.new("RGBA", (self.width * self.frame_count, self.height))
-            for index, frame in enumerate(flipped_frames):
-                x_offset = index * self.width  # Calculate horizontal offset
-                new_combined_image.paste(frame, (x_offset, 0))
-            self.combined_image = new_combined_image
+            self.check_writable()
+            self.combined_image = flipped_image
             self.left = not self.left
-        return flipped_frames
+        return [flipped_image.crop((index * self.width, 0, (index + 1) * self.width, self.height))
+                for index in range(self.frame_count)]
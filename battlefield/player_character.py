@@ -1,12 +1,50 @@
-import time
+from collections import OrderedDict
 
+import game_clock
+import texture_registry
 from animation import Animation
 from game_constants import STANDARD_FRAME_TIME, MOVEMENT_DELAY
 from piskel import Piskel
+from sprite_bundle import loadout_entry_name
 from walking_fighting_character import WalkingFightingCharacter
 from weapon import Weapon
 
 
+FIGHTING_TEXTURE_CACHE_SIZE = 32
+_fighting_textures = OrderedDict()  # (chest, legs, weapon) -> (textures, frame width, frame height, margin_x)
+
+
+def fighting_textures(chest_armor, leg_armor, weapon):
+    """
+    Textures of the fighting animation of an equipment combination, least recently used combinations are dropped.
+
+    Compositing the layers of three piskels is expensive, characters with the same loadout share the result. Only
+    the left facing frames are built, the right facing animation draws them mirrored.
+    """
+    key = (chest_armor.asset_key, leg_armor.asset_key, weapon.asset_key)
+    cached = _fighting_textures.get(key)
+    if cached is not None:
+        _fighting_textures.move_to_end(key)
+        return cached
+
+    bundled = texture_registry.load_bundled(loadout_entry_name(*key))
+    if bundled is not None:
+        cached = bundled + (-9,)  # Bundled fighting frames face left, like the piskels
+    else:
+        piskels_with_layers = [
+            (chest_armor.piskels.large_sword_attack_piskel, chest_armor.piskels.piskel_layers),
+            (leg_armor.piskels.large_sword_attack_piskel, leg_armor.piskels.piskel_layers),
+            (weapon.piskels.large_sword_attack_piskel, weapon.piskels.piskel_layers),
+        ]
+        fighting_piskel = Piskel.combine_piskels(piskels_with_layers)
+        cached = (tuple(fighting_piskel.load_as_spritesheet()), fighting_piskel.width, fighting_piskel.height,
+                  -9 if fighting_piskel.left else 9)
+    _fighting_textures[key] = cached
+    if len(_fighting_textures) > FIGHTING_TEXTURE_CACHE_SIZE:
+        _fighting_textures.popitem(last=False)
+    return cached
+
+
 class ItemPiskels:
     def __init__(self, piskel_layers, walk_piskel, death_piskel, large_sword_attack_piskel=None, bow_attack_piskel=None, spear_attack_piskel=None):
         self.piskel_layers = piskel_layers
@@ -21,18 +59,17 @@ class LegArmor:
 
 
 class PlateLegs(LegArmor):
+    asset_key = 'plate_legs'
+    piskel_files = {
+        'walk_piskel': './piksel_files/farmer_character/walk.piskel',
+        'death_piskel': './piksel_files/farmer_character/death.piskel',
+        'large_sword_attack_piskel': './piksel_files/farmer_character/spear_attack.piskel',
+    }
+
     def __init__(self):
         self.piskels = ItemPiskels(
             piskel_layers=['Left leg', 'Right leg'],
-            walk_piskel=Piskel('./piksel_files/main_character/walk.piskel'),
-            death_piskel=Piskel('./piksel_files/main_character/death.piskel'),
-            large_sword_attack_piskel=Piskel('./piksel_files/main_character/large_sword_attack.piskel')
-        )
-        self.piskels = ItemPiskels(
-            piskel_layers=['Left leg', 'Right leg'],
-            walk_piskel=Piskel('./piksel_files/farmer_character/walk.piskel'),
-            death_piskel=Piskel('./piksel_files/farmer_character/death.piskel'),
-            large_sword_attack_piskel=Piskel('./piksel_files/farmer_character/spear_attack.piskel')
+            **{name: Piskel.load(file_path) for name, file_path in self.piskel_files.items()}
         )
 
 
@@ -41,48 +78,55 @@ class ChestArmor:
 
 
 class PlateChest(ChestArmor):
+    asset_key = 'plate_chest'
+    piskel_files = {
+        'walk_piskel': './piksel_files/main_character/walk.piskel',
+        'death_piskel': './piksel_files/main_character/death.piskel',
+        'large_sword_attack_piskel': './piksel_files/main_character/large_sword_attack.piskel',
+    }
+
     def __init__(self):
         self.piskels = ItemPiskels(
             piskel_layers=['Torso', 'Head', 'Left arm', 'Right arm'],
-            walk_piskel=Piskel('./piksel_files/main_character/walk.piskel'),
-            death_piskel=Piskel('./piksel_files/main_character/death.piskel'),
-            large_sword_attack_piskel=Piskel('./piksel_files/main_character/large_sword_attack.piskel')
+            **{name: Piskel.load(file_path) for name, file_path in self.piskel_files.items()}
         )
 
 
 class PlayerCharacter(WalkingFightingCharacter):
+    walk_sheet = ("resources/main_character/walk_left.png", 48, 48, 8, 8)
+    attack_sheet = None  # Composited from the piskels of the equipment, see fighting_textures
+    death_sheet = ("resources/main_character/death_left.png", 48, 48, 8, 16)
+    loadout = (PlateChest, PlateLegs, Weapon)  # Chest armor, leg armor and weapon classes
+
     def __init__(self, *args, **kwargs):
+        # The fighting animation is composited from the equipment, so it is put on before the animations are built
+        chest_class, legs_class, _ = self.loadout
+        self.chest_armor = chest_class()
+        self.leg_armor = legs_class()
         super().__init__(*args, **kwargs)
 
-        self.weapon = Weapon(15, STANDARD_FRAME_TIME / 2, MOVEMENT_DELAY)
-        self.leg_armor = PlateLegs()
-        self.chest_armor = PlateChest()
+    def create_weapon(self):
+        return self.loadout[2](15, STANDARD_FRAME_TIME / 2, MOVEMENT_DELAY)
 
-        self.animations.update({
-            'facing_left': Animation("resources/main_character/walk_left.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'facing_right': Animation("resources/main_character/walk_right.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-            'fighting_left': self.fighting_animation(left=True),
-            'fighting_right': self.fighting_animation(left=False),
-            'death_left': Animation("resources/main_character/death_left.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'death_right': Animation("resources/main_character/death_right.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-        })
+    def fighting_animations(self):
+        return {'fighting_left': self.fighting_animation(left=True), 'fighting_right': self.fighting_animation(left=False)}
+
+    @classmethod
+    def asset_manifest(cls):
+        manifest = super().asset_manifest()
+        manifest['loadouts'].append(cls.loadout)
+        return manifest
 
     def fighting_animation(self, left=True):
-        piskels_with_layers = [
-            (self.chest_armor.piskels.large_sword_attack_piskel, self.chest_armor.piskels.piskel_layers),
-            (self.leg_armor.piskels.large_sword_attack_piskel, self.leg_armor.piskels.piskel_layers),
-            (self.weapon.piskels.large_sword_attack_piskel, self.weapon.piskels.piskel_layers),
-        ]
-        fighting_piskel = Piskel.combine_piskels(piskels_with_layers)
-        if not left:
-            fighting_piskel.fliplr()
-        return fighting_piskel.get_animation(self.weapon.frame_time)
+        textures, width, height, margin_x = fighting_textures(self.chest_armor, self.leg_armor, self.weapon)
+        return Animation(textures, width, height, len(textures), len(textures), frame_duration=self.weapon.frame_time,
+                         scale=1.0, loop=False, margin_x=margin_x, mirrored=not left)
 
     def handle_player_input(self, game_state, keys_pressed):
-        if keys_pressed['space'] and (time.time() - self.last_move_time >= self.move_delay):
+        if keys_pressed['space'] and (game_clock.now() - self.last_move_time >= self.move_delay):
             self.fight()
 
         dx = keys_pressed['right'] - keys_pressed['left']
         dy = keys_pressed['up'] - keys_pressed['down']
-        if (dx != 0 or dy != 0) and (time.time() - self.last_move_time >= self.move_delay):
+        if (dx != 0 or dy != 0) and (game_clock.now() - self.last_move_time >= self.move_delay):
             self.move(dx, dy, game_state.walkable_tiles)
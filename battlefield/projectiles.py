@@ -0,0 +1,165 @@
+import arcade
+import numpy as np
+
+import texture_registry
+from occupancy_grid import EMPTY, NO_TEAM
+from projection import projection as default_projection
+
+
+class ProjectileView:
+    """ Drawable for one projectile slot, so projectiles can be depth sorted together with the other drawables. """
+    def __init__(self, projectile_system, slot):
+        self.projectile_system = projectile_system
+        self.slot = slot
+
+    @property
+    def screen_x(self):
+        return self.projectile_system.screen_x[self.slot]
+
+    @property
+    def screen_y(self):
+        return self.projectile_system.screen_y[self.slot]
+
+    def draw(self):
+        self.projectile_system.draw_projectile(self.slot)
+
+    def sync_sprite(self, sprite):
+        self.projectile_system.sync_sprite(self.slot, sprite)
+
+
+class ProjectileSystem:
+    """
+    All arrows in flight, stored as arrays with recycled slots.
+
+    update moves every live projectile, works out its tile and tests it for hits in one batched step. All
+    projectiles share a single texture that is only loaded the first time one is drawn.
+    """
+    texture_path = "resources/missiles/arrow_1.png"
+    speed = 4  # Screen pixels per tick
+
+    def __init__(self, capacity=32, projection=default_projection):
+        self.projection = projection
+        self.texture = None
+
+        self.capacity = 0
+        self.screen_x = np.zeros(0)
+        self.screen_y = np.zeros(0)
+        self.grid_x = np.zeros(0, dtype=np.int32)
+        self.grid_y = np.zeros(0, dtype=np.int32)
+        self.velocity_x = np.zeros(0)
+        self.damage = np.zeros(0, dtype=np.int32)
+        self.team = np.zeros(0, dtype=np.int32)
+        self.active = np.zeros(0, dtype=bool)
+        self.shooters = []
+        self.views = []
+        self.free_slots = []
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        for name in ['screen_x', 'screen_y', 'grid_x', 'grid_y', 'velocity_x', 'damage', 'team', 'active']:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        self.shooters.extend([None] * (capacity - self.capacity))
+        self.views.extend(ProjectileView(self, slot) for slot in range(self.capacity, capacity))
+        self.free_slots.extend(reversed(range(self.capacity, capacity)))
+        self.capacity = capacity
+
+    def set_capacity(self, capacity):
+        """ Grow or shrink to a capacity, used when restoring a captured state. Leaves free_slots to the caller. """
+        if capacity > self.capacity:
+            self.grow(capacity)
+        for name in ['screen_x', 'screen_y', 'grid_x', 'grid_y', 'velocity_x', 'damage', 'team', 'active']:
+            setattr(self, name, getattr(self, name)[:capacity])
+        del self.shooters[capacity:]
+        del self.views[capacity:]
+        self.capacity = capacity
+
+    def spawn(self, grid_x, grid_y, direction, damage, team, shooter=None):
+        """ Fire a projectile from a tile, direction is -1 for left and 1 for right. """
+        if not self.free_slots:
+            self.grow(self.capacity * 2)
+        slot = self.free_slots.pop()
+        self.grid_x[slot] = grid_x
+        self.grid_y[slot] = grid_y
+        screen_x, self.screen_y[slot] = self.projection.grid_to_screen(grid_x, grid_y)
+        self.screen_x[slot] = screen_x + .5 * self.projection.cell_width(grid_y)
+        self.velocity_x[slot] = self.speed * direction
+        self.damage[slot] = damage
+        self.team[slot] = team
+        self.shooters[slot] = shooter
+        self.active[slot] = True
+        return slot
+
+    def release(self, slot):
+        self.active[slot] = False
+        self.shooters[slot] = None
+        self.free_slots.append(slot)
+
+    def __len__(self):
+        return self.capacity - len(self.free_slots)
+
+    def update(self, game_state):
+        slots = np.nonzero(self.active)[0]
+        if len(slots) == 0:
+            return
+
+        self.screen_x[slots] += self.velocity_x[slots]
+        grid_y = self.grid_y[slots]
+        # Arrows flying left count as being in a tile until their tip leaves it
+        offset = np.where(self.velocity_x[slots] > 0, 0, self.projection.cell_widths[grid_y] / 2)
+        new_grid_x = self.projection.screen_to_grid_x_many(self.screen_x[slots] + offset, grid_y)
+        columns = game_state.occupancy.columns
+        new_grid_x = np.clip(new_grid_x.astype(np.int32), 0, columns - 1)
+        previous_grid_x = self.grid_x[slots]
+        self.grid_x[slots] = new_grid_x
+
+        # Test every tile passed this tick, the first enemy met is hit
+        occupancy = game_state.occupancy
+        entity_teams = occupancy.entity_teams
+        step = np.sign(new_grid_x - previous_grid_x)
+        span = np.abs(new_grid_x - previous_grid_x)
+        hit_ids = np.full(len(slots), EMPTY, dtype=np.int32)
+        for distance in range(int(span.max()) + 1):
+            tile_x = previous_grid_x + step * np.minimum(distance, span)
+            ids = occupancy.entity_ids[self.grid_y[slots], tile_x]
+            teams = np.where(ids != EMPTY, entity_teams[np.maximum(ids, 0)], NO_TEAM)
+            new_hits = (hit_ids == EMPTY) & (teams != NO_TEAM) & (teams != self.team[slots])
+            hit_ids[new_hits] = ids[new_hits]
+
+        hit = hit_ids != EMPTY
+        for idx in np.nonzero(hit)[0]:
+            slot, target = slots[idx], occupancy.entities[hit_ids[idx]]
+            if target.is_dead():  # Killed by an earlier arrow this tick, fly on
+                hit[idx] = False
+                continue
+            target.hit(int(self.damage[slot]))
+            if self.shooters[slot] is not None:
+                self.shooters[slot].damage_dealt += int(self.damage[slot])
+            self.release(slot)
+
+        # Remove the arrows that left the grid
+        out_of_grid = (new_grid_x <= 0) | (new_grid_x >= columns - 1)
+        for slot in slots[out_of_grid & ~hit]:
+            self.release(slot)
+
+    def drawables(self):
+        return [self.views[slot] for slot in np.nonzero(self.active)[0]]
+
+    def get_texture(self):
+        if self.texture is None:
+            self.texture = texture_registry.load_texture(self.texture_path)
+        return self.texture
+
+    def draw_projectile(self, slot):
+        texture = self.get_texture()
+        center_y = self.screen_y[slot] + self.projection.cell_width(self.grid_y[slot]) * .85
+        arcade.draw_texture_rectangle(self.screen_x[slot], center_y, texture.width, texture.height, texture)
+
+    def sync_sprite(self, slot, sprite):
+        texture = self.get_texture()
+        if sprite.texture is not texture:
+            sprite.texture = texture
+        sprite.center_x = float(self.screen_x[slot])
+        sprite.center_y = float(self.screen_y[slot] + self.projection.cell_width(self.grid_y[slot]) * .85)
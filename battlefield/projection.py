@@ -0,0 +1,71 @@
+import numpy as np
+
+from game_constants import GRID_ROWS, GRID_COLUMNS, CELL_SIZE, SCREEN_WIDTH, BOTTOM_GRID_PAD, HORIZONTAL_PADDING
+
+
+class Projection:
+    """
+    Maps grid tiles to screen positions and back, for one camera.
+
+    Everything that depends only on the row (perspective factor, cell size, screen origin of the row) is computed
+    once up front. The scalar methods are meant for single characters, the *_many methods take and return arrays.
+    Screen positions are the bottom left corner of a tile.
+    """
+    def __init__(self, rows=GRID_ROWS, columns=GRID_COLUMNS, cell_size=CELL_SIZE, screen_width=SCREEN_WIDTH,
+                 bottom_pad=BOTTOM_GRID_PAD, horizontal_padding=HORIZONTAL_PADDING, perspective_strength=0.35):
+        self.cell_size = cell_size
+        self.screen_width = screen_width
+        self.bottom_pad = bottom_pad
+        self.horizontal_padding = horizontal_padding
+        self.perspective_strength = perspective_strength
+        self.resize(rows, columns)
+
+    def resize(self, rows, columns):
+        """ Recompute the tables for a map of another size. """
+        self.rows = rows
+        self.columns = columns
+        row_indices = np.arange(rows)
+        self.perspective_factors = 1 - (row_indices / rows) * self.perspective_strength
+        self.cell_widths = self.cell_size * self.perspective_factors
+        self.cell_heights = self.cell_widths
+        self.origins_x = (self.screen_width / 2) - (columns * self.cell_widths / 2)
+        self.origins_y = row_indices * self.cell_heights + self.bottom_pad + self.horizontal_padding * row_indices
+
+        # Plain lists are faster than NumPy for looking up a single value
+        self._perspective_factors = self.perspective_factors.tolist()
+        self._cell_widths = self.cell_widths.tolist()
+        self._origins_x = self.origins_x.tolist()
+        self._origins_y = self.origins_y.tolist()
+
+    def perspective_factor(self, grid_y):
+        return self._perspective_factors[grid_y]
+
+    def cell_width(self, grid_y):
+        return self._cell_widths[grid_y]
+
+    def grid_to_screen(self, grid_x, grid_y):
+        return self._origins_x[grid_y] + grid_x * self._cell_widths[grid_y], self._origins_y[grid_y]
+
+    def screen_to_grid_x(self, screen_x, grid_y):
+        """ Fractional column of a screen x coordinate within a known row. """
+        return (screen_x - self._origins_x[grid_y]) / self._cell_widths[grid_y]
+
+    def screen_to_grid(self, screen_x, screen_y):
+        """ Tile under a screen position, clamped to the grid. """
+        grid_y = int(np.clip(np.searchsorted(self.origins_y, screen_y, side='right') - 1, 0, self.rows - 1))
+        grid_x = int(np.clip(np.floor(self.screen_to_grid_x(screen_x, grid_y)), 0, self.columns - 1))
+        return grid_x, grid_y
+
+    def grid_to_screen_many(self, grid_x, grid_y):
+        return self.origins_x[grid_y] + grid_x * self.cell_widths[grid_y], self.origins_y[grid_y]
+
+    def screen_to_grid_x_many(self, screen_x, grid_y):
+        return (screen_x - self.origins_x[grid_y]) / self.cell_widths[grid_y]
+
+    def screen_to_grid_many(self, screen_x, screen_y):
+        grid_y = np.clip(np.searchsorted(self.origins_y, screen_y, side='right') - 1, 0, self.rows - 1)
+        grid_x = np.clip(np.floor(self.screen_to_grid_x_many(screen_x, grid_y)), 0, self.columns - 1).astype(np.int32)
+        return grid_x, grid_y
+
+
+projection = Projection()  # Of the default map, every GameState has a projection for its own map
@@ -0,0 +1,176 @@
+import argparse
+import random
+import struct
+import time
+import zlib
+
+from character_configurations import SCENARIOS
+from headless import HeadlessSimulation, TICK_TIME
+
+MAGIC = b"BFRP"
+VERSION = 4
+HEADER_FORMAT = "<4sHBQdI"  # magic, version, flags, seed, tick time, keyframe interval
+WITH_PLAYER, USE_UNIT_STORE = 1, 2  # Header flags
+KEYFRAME_INTERVAL = 600  # Ticks between keyframes, 10 seconds of battle
+INPUT_KEYS = ['left', 'right', 'up', 'down', 'space']
+
+
+def pack_keys(keys_pressed):
+    return sum(1 << bit for bit, key in enumerate(INPUT_KEYS) if keys_pressed[key])
+
+
+def unpack_keys(bits):
+    return {key: (bits >> bit) & 1 for bit, key in enumerate(INPUT_KEYS)}
+
+
+class Replay:
+    """
+    A recorded battle: the seed and scenario it started from, the keys pressed on every tick and keyframes.
+
+    File layout, little endian: a header (HEADER_FORMAT, then the scenario name prefixed with its length), the
+    inputs as one byte of key bits per tick prefixed with the tick count, and the keyframes, each stored as its
+    tick, its length and a zlib compressed GameState.snapshot.
+    """
+    def __init__(self, scenario_name, seed, with_player=True, use_unit_store=False, tick_time=TICK_TIME,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        self.scenario_name = scenario_name
+        self.seed = seed
+        self.with_player = with_player
+        self.use_unit_store = use_unit_store
+        self.tick_time = tick_time
+        self.keyframe_interval = keyframe_interval
+        self.inputs = bytearray()
+        self.keyframes = {}  # Tick -> compressed state at the start of that tick
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def create_simulation(self):
+        return HeadlessSimulation.create(SCENARIOS[self.scenario_name], with_player=self.with_player,
+                                         tick_time=self.tick_time, use_unit_store=self.use_unit_store, seed=self.seed)
+
+    def add_keyframe(self, simulation):
+        self.keyframes[simulation.tick] = zlib.compress(simulation.snapshot())
+
+    def keyframe(self, tick):
+        return zlib.decompress(self.keyframes[tick])
+
+    def save(self, file_path):
+        flags = (WITH_PLAYER if self.with_player else 0) | (USE_UNIT_STORE if self.use_unit_store else 0)
+        scenario_name = self.scenario_name.encode('utf-8')
+        with open(file_path, 'wb') as file:
+            file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, flags, self.seed, self.tick_time,
+                                   self.keyframe_interval))
+            file.write(struct.pack("<H", len(scenario_name)) + scenario_name)
+            file.write(struct.pack("<I", len(self.inputs)) + bytes(self.inputs))
+            file.write(struct.pack("<I", len(self.keyframes)))
+            for tick, data in sorted(self.keyframes.items()):
+                file.write(struct.pack("<II", tick, len(data)) + data)
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        magic, version, flags, seed, tick_time, keyframe_interval = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{file_path} is not a version {VERSION} battle replay")
+        offset = struct.calcsize(HEADER_FORMAT)
+        (name_length,) = struct.unpack_from("<H", data, offset)
+        scenario_name = data[offset + 2:offset + 2 + name_length].decode('utf-8')
+        offset += 2 + name_length
+
+        replay = cls(scenario_name, seed, bool(flags & WITH_PLAYER), bool(flags & USE_UNIT_STORE), tick_time,
+                     keyframe_interval)
+        (tick_count,) = struct.unpack_from("<I", data, offset)
+        replay.inputs = bytearray(data[offset + 4:offset + 4 + tick_count])
+        offset += 4 + tick_count
+        (keyframe_count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        for _ in range(keyframe_count):
+            tick, length = struct.unpack_from("<II", data, offset)
+            replay.keyframes[tick] = data[offset + 8:offset + 8 + length]
+            offset += 8 + length
+        return replay
+
+
+class ReplayRecorder:
+    """ Runs a battle in fixed ticks and records it into a Replay, drive it with step instead of GameState.update. """
+    def __init__(self, scenario_name='random_10_vs_10', seed=None, with_player=True, use_unit_store=False,
+                 tick_time=TICK_TIME, keyframe_interval=KEYFRAME_INTERVAL):
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        self.replay = Replay(scenario_name, seed, with_player, use_unit_store, tick_time, keyframe_interval)
+        self.simulation = self.replay.create_simulation()
+
+    @property
+    def game_state(self):
+        return self.simulation.game_state
+
+    def step(self, keys_pressed):
+        if self.simulation.tick % self.replay.keyframe_interval == 0:
+            self.replay.add_keyframe(self.simulation)
+        self.replay.inputs.append(pack_keys(keys_pressed))
+        self.simulation.step(keys_pressed)
+
+    def save(self, file_path):
+        self.replay.save(file_path)
+
+
+class ReplayPlayer:
+    """ Plays a Replay back, seek jumps to any tick from the closest keyframe before it. """
+    def __init__(self, replay):
+        self.replay = replay
+        self.simulation = replay.create_simulation()
+
+    @property
+    def game_state(self):
+        return self.simulation.game_state
+
+    @property
+    def tick(self):
+        return self.simulation.tick
+
+    def is_finished(self):
+        return self.simulation.tick >= len(self.replay)
+
+    def step(self, keys_pressed=None):
+        """ Advance one recorded tick, keys_pressed is ignored so the player can stand in for a recorder. """
+        if not self.is_finished():
+            self.simulation.step(unpack_keys(self.replay.inputs[self.simulation.tick]))
+
+    def seek(self, tick):
+        tick = min(max(tick, 0), len(self.replay))
+        keyframe_ticks = [keyframe_tick for keyframe_tick in self.replay.keyframes if keyframe_tick <= tick]
+        if keyframe_ticks:
+            keyframe_tick = max(keyframe_ticks)
+            # Only restore when simulating on from where we are would take longer
+            if not keyframe_tick <= self.simulation.tick <= tick:
+                self.simulation.restore(self.replay.keyframe(keyframe_tick), keyframe_tick)
+        elif self.simulation.tick > tick:
+            self.simulation = self.replay.create_simulation()
+        while self.simulation.tick < tick:
+            self.step()
+
+    def fast_forward(self, ticks):
+        self.seek(self.simulation.tick + ticks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a recorded battle without a window.")
+    parser.add_argument("replay", type=str, help="Replay file written by the window with --record.")
+    parser.add_argument("--seek", type=int, default=None, help="Tick to jump to, the end of the replay by default.")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    print(f"Scenario {replay.scenario_name}, seed {replay.seed}, {len(replay)} ticks "
+          f"({len(replay) * replay.tick_time:.1f}s), {len(replay.keyframes)} keyframes")
+    start_time = time.time()
+    player = ReplayPlayer(replay)
+    player.seek(len(replay) if args.seek is None else args.seek)
+    living = [character for character in player.game_state.characters if not character.is_dead()]
+    teams = {team: sum(character.team == team for character in living) for team in sorted(player.game_state.living_teams())}
+    print(f"Tick {player.tick} reached in {time.time() - start_time:.2f}s, living characters per team: {teams}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+class SpatialIndex:
+    """
+    Spatial hash of the living characters on the field, bucketed per team.
+
+    Queries only visit the buckets around the queried tiles, so their cost depends on how crowded that part of the
+    field is and not on its size. Ties are broken on entity_id so results do not depend on insertion order.
+    """
+    def __init__(self, rows, columns, bucket_size=4):
+        self.rows = rows
+        self.columns = columns
+        self.bucket_size = bucket_size
+        self.buckets = {}  # team -> {(bucket_x, bucket_y): {entity_id: character}}
+
+    def bucket_of(self, x, y):
+        return x // self.bucket_size, y // self.bucket_size
+
+    def insert(self, character):
+        team_buckets = self.buckets.setdefault(character.team, {})
+        team_buckets.setdefault(self.bucket_of(character.grid_x, character.grid_y), {})[character.entity_id] = character
+
+    def remove(self, character, x=None, y=None):
+        """ Remove a character, x and y default to its current position. """
+        x = character.grid_x if x is None else x
+        y = character.grid_y if y is None else y
+        bucket_key = self.bucket_of(x, y)
+        bucket = self.buckets.get(character.team, {}).get(bucket_key)
+        if bucket is not None:
+            bucket.pop(character.entity_id, None)
+            if not bucket:
+                del self.buckets[character.team][bucket_key]
+
+    def move(self, character, old_x, old_y):
+        if self.bucket_of(old_x, old_y) != self.bucket_of(character.grid_x, character.grid_y):
+            self.remove(character, old_x, old_y)
+            self.insert(character)
+
+    def team_buckets(self, team=None, enemy_of=None):
+        for bucket_team, team_buckets in self.buckets.items():
+            if team is not None and bucket_team != team:
+                continue
+            if enemy_of is not None and bucket_team == enemy_of:
+                continue
+            yield team_buckets
+
+    def characters_in_rect(self, x0, y0, x1, y1, team=None, enemy_of=None):
+        """ Characters on tiles x0 <= x <= x1 and y0 <= y <= y1, optionally only of team or only enemies of a team. """
+        bucket_x0, bucket_y0 = self.bucket_of(max(0, x0), max(0, y0))
+        bucket_x1, bucket_y1 = self.bucket_of(min(self.columns - 1, x1), min(self.rows - 1, y1))
+        found = []
+        for team_buckets in self.team_buckets(team, enemy_of):
+            for bucket_x in range(bucket_x0, bucket_x1 + 1):
+                for bucket_y in range(bucket_y0, bucket_y1 + 1):
+                    for character in team_buckets.get((bucket_x, bucket_y), {}).values():
+                        if x0 <= character.grid_x <= x1 and y0 <= character.grid_y <= y1:
+                            found.append(character)
+        return found
+
+    def enemies_within_radius(self, x, y, radius, team):
+        """ Enemies of team at most radius tiles away, counting diagonal steps as one. Closest first. """
+        enemies = self.characters_in_rect(x - radius, y - radius, x + radius, y + radius, enemy_of=team)
+        return sorted(enemies, key=lambda c: (max(abs(c.grid_x - x), abs(c.grid_y - y)), c.entity_id))
+
+    def enemies_in_row_span(self, y, x0, x1, team, closest_to=None):
+        """ Enemies of team in row y between x0 and x1 inclusive, sorted on distance to closest_to if given. """
+        enemies = self.characters_in_rect(min(x0, x1), y, max(x0, x1), y, enemy_of=team)
+        if closest_to is not None:
+            enemies.sort(key=lambda c: (abs(c.grid_x - closest_to), c.entity_id))
+        return enemies
+
+    def first_hit_along_row(self, y, x_from, x_to, team):
+        """ First enemy of team met when travelling through row y from x_from to x_to, both inclusive. """
+        enemies = self.enemies_in_row_span(y, x_from, x_to, team, closest_to=x_from)
+        return enemies[0] if enemies else None
+
+    def nearest_enemy(self, x, y, team, facing=0, max_distance=None):
+        """
+        Closest enemy of team in walking distance without diagonals.
+
+        With facing -1 or 1 only enemies on that side or in the same column are considered.
+        """
+        best, best_key = None, None
+        center_x, center_y = self.bucket_of(x, y)
+        enemy_buckets = list(self.team_buckets(enemy_of=team))
+        # Rings past the farthest occupied bucket are empty, on a large map they would be most of it
+        max_ring = max((max(abs(bucket_x - center_x), abs(bucket_y - center_y))
+                        for team_buckets in enemy_buckets for bucket_x, bucket_y in team_buckets), default=-1)
+        for ring in range(max_ring + 1):
+            for bucket_key in self.ring_buckets(center_x, center_y, ring, facing):
+                for team_buckets in enemy_buckets:
+                    for character in team_buckets.get(bucket_key, {}).values():
+                        if facing * (character.grid_x - x) < 0:
+                            continue
+                        distance = abs(character.grid_x - x) + abs(character.grid_y - y)
+                        if max_distance is not None and distance > max_distance:
+                            continue
+                        key = (distance, character.entity_id)
+                        if best_key is None or key < best_key:
+                            best, best_key = character, key
+            # Everything in the next ring is at least this far away
+            if best_key is not None and best_key[0] <= ring * self.bucket_size:
+                break
+        return best
+
+    @staticmethod
+    def ring_buckets(center_x, center_y, ring, facing=0):
+        if ring == 0:
+            return [(center_x, center_y)]
+        keys = []
+        for bucket_x in range(center_x - ring, center_x + ring + 1):
+            if facing * (bucket_x - center_x) < 0:
+                continue
+            if abs(bucket_x - center_x) == ring:
+                keys.extend((bucket_x, bucket_y) for bucket_y in range(center_y - ring, center_y + ring + 1))
+            else:
+                keys.extend([(bucket_x, center_y - ring), (bucket_x, center_y + ring)])
+        return keys
@@ -0,0 +1,75 @@
+import json
+import os
+
+import arcade
+from PIL import Image
+
+BUNDLE_DIRECTORY = "compiled_assets"
+INDEX_FILE = "index.json"
+ATLAS_FILE = "atlas.png"
+
+
+def spritesheet_entry_name(file_path, frame_width, frame_height, columns, frame_count):
+    return f"sheet:{file_path}:{frame_width}x{frame_height}:{columns}:{frame_count}"
+
+
+def loadout_entry_name(chest_key, legs_key, weapon_key):
+    return f"fighting:{chest_key}:{legs_key}:{weapon_key}"
+
+
+def source_mtimes(file_paths):
+    return {file_path: os.path.getmtime(file_path) for file_path in file_paths}
+
+
+class SpriteBundle:
+    """
+    Prebuilt frames made by asset_compiler.py: one atlas image and an index of named frame sequences.
+
+    The atlas is decoded once, after that every entry is cut from it without touching its source files. Entries
+    whose source files changed since the bundle was compiled are treated as missing, so callers fall back to
+    building those frames themselves.
+    """
+    def __init__(self, directory=BUNDLE_DIRECTORY):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE), 'r') as file:
+            self.entries = json.load(file)['entries']
+        self.atlas = Image.open(os.path.join(directory, ATLAS_FILE)).convert("RGBA")
+        self.fresh = {}  # Entry name -> whether its sources are unchanged
+
+    @classmethod
+    def load_if_present(cls, directory=BUNDLE_DIRECTORY):
+        if not os.path.exists(os.path.join(directory, INDEX_FILE)):
+            return None
+        return cls(directory)
+
+    def is_fresh(self, name):
+        if name not in self.fresh:
+            entry = self.entries.get(name)
+            try:
+                self.fresh[name] = entry is not None and source_mtimes(entry['sources']) == entry['sources']
+            except OSError:
+                self.fresh[name] = False
+        return self.fresh[name]
+
+    def __contains__(self, name):
+        return self.is_fresh(name)
+
+    def frame_size(self, name):
+        entry = self.entries[name]
+        return entry['frame_width'], entry['frame_height']
+
+    def textures(self, name):
+        """
+        Textures of an entry, or None when it is missing or outdated.
+
+        Their hit boxes are the frame rectangles, the outline of every frame is not worth tracing at startup.
+        """
+        if not self.is_fresh(name):
+            return None
+        entry = self.entries[name]
+        width, height = entry['frame_width'], entry['frame_height']
+        textures = []
+        for index, frame in enumerate(entry['frames']):
+            image = self.atlas.crop((frame['x'], frame['y'], frame['x'] + width, frame['y'] + height))
+            textures.append(arcade.Texture(f"{name}-{index}", image=image, hit_box_algorithm="None"))
+        return tuple(textures)
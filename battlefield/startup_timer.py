@@ -0,0 +1,24 @@
+import time
+
+
+class StartupTimer:
+    """ Wall clock duration of each startup phase, up to the first drawn frame. """
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.phases = []  # (name, seconds)
+
+    def mark(self, name):
+        """ Ends the phase that started at the previous mark. """
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last_time))
+        self.last_time = now
+
+    @property
+    def total(self):
+        return self.last_time - self.start_time
+
+    def report(self):
+        lines = [f"{name:<20}{seconds * 1000:9.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'time to first frame':<20}{self.total * 1000:9.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,161 @@
+from array import array
+
+NO_INDEX = -1  # Stored for a reference to nothing
+
+
+class Column:
+    """
+    Declares an attribute of a StateColumnsMixin class that is mirrored into a column once its object is bound.
+
+    Not a descriptor, so reads stay plain instance attribute reads that the interpreter can specialise, only writes
+    pay for the columns. name is the column, it defaults to the attribute name.
+    """
+    mirrored = True  # Also kept in the instance, StateColumns.load has to update it there
+
+    def __init__(self, name=None):
+        self.name = name
+
+    def __set_name__(self, owner, attribute):
+        self.attribute = attribute
+        self.name = self.name or attribute
+
+    def stored(self, value):
+        return value
+
+    def loaded(self, values, store):
+        """ Column values as attribute values. """
+        return values
+
+
+class StoredColumn(Column):
+    """
+    An attribute that only lives in its column once the object is bound, reads go through the descriptor.
+
+    Slower to read than a mirrored Column, but StateColumns.load does not have to touch the object at all. Meant for
+    objects with many instances and few reads per tick, like animations.
+    """
+    mirrored = False
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        row = instance.state_row
+        if row is None:
+            return instance.__dict__[self.attribute]
+        return instance.state_columns[self.name][row]
+
+    def __set__(self, instance, value):
+        row = instance.state_row
+        if row is None:
+            instance.__dict__[self.attribute] = value
+        else:
+            instance.state_columns[self.name][row] = self.stored(value)
+
+
+class StateColumnsMixin:
+    """ Mirrors writes of the Column attributes of a class into the row StateColumns.bind gave the object. """
+    state_columns = None
+    state_row = None
+    mirrored_columns = {}  # Attribute name -> Column, of the class and its bases
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.mirrored_columns = {column.attribute: column for column in columns_of(cls) if column.mirrored}
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        column = self.mirrored_columns.get(name)
+        if column is not None and self.state_row is not None:
+            self.state_columns[column.name][self.state_row] = column.stored(value)
+
+
+class BoolColumn(Column):
+    def loaded(self, values, store):
+        return [value != 0 for value in values]
+
+
+class NullableColumn(Column):
+    """ A float attribute that may be None, stored as NaN. """
+    def stored(self, value):
+        return float('nan') if value is None else value
+
+    def loaded(self, values, store):
+        return [None if value != value else value for value in values]
+
+
+class ReferenceColumn(Column):
+    """ An attribute holding another object bound to the same store, stored as its row. """
+    def stored(self, value):
+        return NO_INDEX if value is None else value.state_row
+
+    def loaded(self, values, store):
+        objects = store.objects
+        return [None if value == NO_INDEX else objects[value] for value in values]
+
+
+def columns_of(cls):
+    """ The Column attributes of a class, including inherited ones. """
+    if '_state_columns_of' not in cls.__dict__:
+        found = {}
+        for base in reversed(cls.__mro__):
+            found.update((name, value) for name, value in vars(base).items() if isinstance(value, Column))
+        cls._state_columns_of = list(found.values())
+    return cls._state_columns_of
+
+
+class StateColumns:
+    """
+    Struct-of-arrays copy of the simulation state of bound objects, one row per character or animation.
+
+    Every column is an array.array kept up to date by the Column attributes, so the whole state is a tobytes() per
+    column and goes back in with one frombytes() per column, plus a dict update per object with mirrored columns.
+    Objects that share a row, like a character and its weapon, each fill their own columns of it.
+    """
+    def __init__(self, typecodes, defaults=None):
+        self.typecodes = typecodes  # Column name -> array typecode, in snapshot order
+        self.defaults = defaults or {}  # Value of columns none of the objects of a row have
+        self.columns = {name: array(typecode) for name, typecode in typecodes.items()}
+        self.objects = []  # Row -> the first object bound to it
+        self.members = {}  # Column attributes of a class -> (object, row) of everything bound with them
+
+    def __len__(self):
+        return len(self.objects)
+
+    def bind(self, *objects):
+        """ Give the objects a new row, filled from their current attributes, and keep it updated from now on. """
+        row = len(self.objects)
+        values = dict(self.defaults)
+        for obj in objects:
+            columns = columns_of(type(obj))
+            for column in columns:
+                values[column.name] = column.stored(obj.__dict__[column.attribute])
+            obj.state_columns, obj.state_row = self.columns, row
+            self.members.setdefault(tuple(columns), []).append((obj, row))
+        for name, column in self.columns.items():
+            column.append(values.get(name, 0))
+        self.objects.append(objects[0])
+        return row
+
+    def tobytes(self, name):
+        return self.columns[name].tobytes()
+
+    def load(self, arrays):
+        """ Replace the columns by arrays with one value per row and update the attributes of every bound object. """
+        for name, column in self.columns.items():
+            values = arrays[name]
+            if len(values) != len(self.objects):
+                raise ValueError(f"{len(values)} values of {name} do not fit {len(self.objects)} rows")
+            column[:] = array(column.typecode, values.tobytes())
+
+        loaded = {}  # Column name -> attribute values
+        for columns, members in self.members.items():
+            columns = [column for column in columns if column.mirrored]
+            if not columns:
+                continue
+            for column in columns:
+                if column.name not in loaded:
+                    loaded[column.name] = column.loaded(self.columns[column.name].tolist(), self)
+            attributes = [column.attribute for column in columns]
+            rows = list(zip(*[loaded[column.name] for column in columns]))
+            for obj, row in members:
+                obj.__dict__.update(zip(attributes, rows[row]))
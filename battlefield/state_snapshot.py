@@ -0,0 +1,272 @@
+import struct
+import zlib
+from array import array
+from itertools import chain
+
+import numpy as np
+
+import game_clock
+from state_columns import NO_INDEX
+from trees import Tree1, Tree2
+
+MAGIC = b"BFSS"
+VERSION = 3
+# magic, version, characters, animations, planning characters, path tiles, trees, projectile capacity, free projectile
+# slots, clock time
+HEADER_FORMAT = "<4sHIIIIIIId"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TREE_KINDS = [Tree1, Tree2]
+TILE_SIZE = 8  # Bytes of an (x, y) path tile
+NO_GOAL = (NO_INDEX, NO_INDEX)
+
+# Columns of GameState.character_states and animation_states with their array typecodes, in snapshot order
+CHARACTER_COLUMNS = {
+    'grid_x': 'i', 'grid_y': 'i', 'max_hp': 'i', 'hp': 'i', 'hit_cooldown': 'i', 'damage_dealt': 'i',
+    'weapon_cooldown': 'i', 'target': 'i',
+    'screen_x': 'd', 'screen_y': 'd', 'target_x': 'd', 'target_y': 'd', 'last_move_time': 'd', 'move_delay': 'd',
+    'x_screen_distance': 'd', 'y_screen_distance': 'd', 'screen_x_prev': 'd', 'screen_y_prev': 'd',  # NaN for None
+    'facing_left': 'b', 'fighting': 'b',
+}
+CHARACTER_DEFAULTS = {'target': NO_INDEX}  # Player characters have no target
+ANIMATION_COLUMNS = {'current_frame': 'i', 'playing': 'b', 'last_update_time': 'd'}
+UNIT_STORE_COLUMNS = ['hp', 'hit_cooldown', 'weapon_cooldown', 'damage_dealt']  # Kept by the UnitStore if there is one
+CHECKSUM_COLUMNS = ['hp', 'grid_x', 'grid_y', 'screen_x', 'screen_y']  # Where a desync shows up within a few ticks
+PROJECTILE_COLUMNS = ['screen_x', 'screen_y', 'grid_x', 'grid_y', 'velocity_x', 'damage', 'team', 'active']
+
+
+def sections(characters, animations, planning, path_tiles, trees, projectile_capacity, free_slots):
+    """ (name, dtype, shape) of every array in a snapshot, in the order they are stored after the header. """
+    return [
+        ('character_' + name, np.dtype(typecode), (characters,)) for name, typecode in CHARACTER_COLUMNS.items()
+    ] + [
+        ('planning', np.int32, (planning,)),  # Rows of the characters whose path planner has a goal or path
+        ('goals', np.int32, (planning, 2)),
+        ('path_lengths', np.int32, (planning,)),
+        ('path_tiles', np.int32, (path_tiles, 2)),
+    ] + [
+        ('animation_' + name, np.dtype(typecode), (animations,)) for name, typecode in ANIMATION_COLUMNS.items()
+    ] + [
+        ('trees', np.int32, (trees, 3)),  # Kind, x, y
+    ] + [
+        ('projectile_' + name, projectile_dtype(name), (projectile_capacity,)) for name in PROJECTILE_COLUMNS
+    ] + [
+        ('projectile_shooters', np.int32, (projectile_capacity,)),
+        ('projectile_free_slots', np.int32, (free_slots,)),
+        ('rng_state', np.uint32, (625,)),
+        ('rng_gauss', np.float64, (1,)),  # NaN when there is no cached gauss value
+    ]
+
+
+def projectile_dtype(name):
+    return np.bool_ if name == 'active' else np.int32 if name in ('grid_x', 'grid_y', 'damage', 'team') else np.float64
+
+
+class Roster:
+    """
+    What a snapshot needs besides the state columns, gathered once: the characters in row order, their path planners
+    and entity ids, and the tree layout.
+    """
+    def __init__(self, game_state):
+        self.characters = list(game_state.character_states.objects)
+        self.planners = {row: character.path_planner for row, character in enumerate(self.characters)
+                         if hasattr(character, 'path_planner')}
+        self.encoded_paths = {}  # Row -> (path, its tiles as bytes)
+        self.entity_ids = np.array([character.entity_id for character in self.characters], dtype=np.int32)
+        self.trees = game_state.trees  # Holding on to the list keeps the identity check in of() meaningful
+        self.tree_count = len(self.trees)
+        self.tree_layout = tree_layout(self.trees)
+
+    def planning(self):
+        """
+        How many characters have a planner with a goal or a path, and their rows, goals, path lengths and path tiles
+        as bytes.
+
+        Most characters follow the flow field, so only few have either. A PathPlanner only ever shortens its path in
+        place, by popping walked tiles off its end, and assigns a new list otherwise, so the encoding of a list stays
+        valid from its start.
+        """
+        rows, goals, lengths, tiles = [], [], [], []
+        for row, planner in self.planners.items():
+            path, goal = planner.path, planner.goal
+            if goal is None and not path:
+                continue
+            rows.append(row)
+            goals += goal or NO_GOAL
+            lengths.append(len(path))
+            if path:
+                encoded = self.encoded_paths.get(row)
+                if encoded is None or encoded[0] is not path:
+                    encoded = self.encoded_paths[row] = (path, array('i', chain.from_iterable(path)).tobytes())
+                tiles.append(encoded[1][:TILE_SIZE * len(path)])
+        packed = [struct.pack(f"{len(values)}i", *values) for values in (rows, goals, lengths)]
+        return len(rows), packed + [b"".join(tiles)]
+
+    @classmethod
+    def of(cls, game_state):
+        """ Cached on the game state until another character is spawned or the trees change. """
+        roster = game_state.snapshot_roster
+        if roster is None or len(roster.characters) != len(game_state.character_states) or \
+                roster.trees is not game_state.trees or roster.tree_count != len(game_state.trees):
+            roster = game_state.snapshot_roster = cls(game_state)
+        return roster
+
+
+def tree_layout(trees):
+    return np.array([(TREE_KINDS.index(type(tree)), tree.grid_x, tree.grid_y) for tree in trees],
+                    dtype=np.int32).reshape(-1, 3)
+
+
+def take_snapshot(game_state):
+    """ Pack the simulation state of a battle into bytes. Drawing state like textures and sprites is left out. """
+    roster = Roster.of(game_state)
+    character_states = game_state.character_states
+    animation_states = game_state.animation_states
+    projectiles = game_state.projectiles
+    _, rng_state, rng_gauss = game_state.rng.getstate()
+
+    parts = {'character_' + name: character_states.tobytes(name) for name in CHARACTER_COLUMNS}
+    unit_store = game_state.unit_store
+    if unit_store is not None:
+        for name in UNIT_STORE_COLUMNS:
+            parts['character_' + name] = getattr(unit_store, name)[:len(character_states)].tobytes()
+    planning, (parts['planning'], parts['goals'], parts['path_lengths'], parts['path_tiles']) = roster.planning()
+    parts.update(('animation_' + name, animation_states.tobytes(name)) for name in ANIMATION_COLUMNS)
+    parts['trees'] = roster.tree_layout.tobytes()
+    for name in PROJECTILE_COLUMNS:
+        parts['projectile_' + name] = getattr(projectiles, name).tobytes()
+    parts['projectile_shooters'] = array('i', [NO_INDEX if shooter is None else shooter.state_row
+                                               for shooter in projectiles.shooters]).tobytes()
+    parts['projectile_free_slots'] = array('i', projectiles.free_slots).tobytes()
+    parts['rng_state'] = array('I', rng_state).tobytes()
+    parts['rng_gauss'] = struct.pack("<d", float('nan') if rng_gauss is None else rng_gauss)
+
+    counts = (len(character_states), len(animation_states), planning, len(parts['path_tiles']) // TILE_SIZE,
+              len(game_state.trees), projectiles.capacity, len(projectiles.free_slots))
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, *counts, game_clock.now())
+    return header + b"".join(parts[name] for name, _, _ in sections(*counts))
+
+
+def checksum(game_state):
+    """ crc32 of the hp and positions of every character, far cheaper than one of a whole snapshot. """
+    character_states = game_state.character_states
+    unit_store = game_state.unit_store
+    crc = 0
+    for name in CHECKSUM_COLUMNS:
+        if unit_store is not None and name in UNIT_STORE_COLUMNS:
+            data = getattr(unit_store, name)[:len(character_states)].tobytes()
+        else:
+            data = character_states.tobytes(name)
+        crc = zlib.crc32(data, crc)
+    return crc
+
+
+def snapshot_time(data):
+    """ Clock time a snapshot was taken at. """
+    return struct.unpack_from(HEADER_FORMAT, data)[-1]
+
+
+def read_snapshot(data):
+    """ The clock time and arrays of a snapshot, as read only views into data. """
+    magic, version, *counts, time = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} battle snapshot")
+    arrays = {}
+    offset = HEADER_SIZE
+    for name, dtype, shape in sections(*counts):
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += count * np.dtype(dtype).itemsize
+    return time, arrays
+
+
+def restore_snapshot(game_state, data):
+    """
+    Put a battle back into the state of a snapshot taken from it, or from a battle with the same characters.
+
+    The state columns are replaced as a whole and the attributes of characters, weapons and animations updated from
+    them, so no texture is loaded. Times are shifted by however far the clock moved since the snapshot was taken,
+    restoring at the same clock time is exact.
+    """
+    time, arrays = read_snapshot(data)
+    roster = Roster.of(game_state)
+    character_states = game_state.character_states
+    animation_states = game_state.animation_states
+    characters = len(arrays['character_hp'])
+    if characters != len(character_states) or len(arrays['animation_playing']) != len(animation_states):
+        raise ValueError(f"A snapshot of {characters} characters does not fit a battle of {len(character_states)}")
+    time_offset = game_clock.now() - time
+
+    restore_trees(game_state, roster, arrays['trees'])
+
+    character_columns = {name: arrays['character_' + name] for name in CHARACTER_COLUMNS}
+    character_columns['last_move_time'] = character_columns['last_move_time'] + time_offset
+    character_states.load(character_columns)
+
+    for planner in roster.planners.values():
+        planner.reset()
+    coordinates = arrays['path_tiles'].ravel().tolist()
+    path_tiles = list(zip(coordinates[0::2], coordinates[1::2]))
+    path_start = 0
+    for row, goal, path_length in zip(arrays['planning'].tolist(), arrays['goals'].tolist(),
+                                      arrays['path_lengths'].tolist()):
+        planner = roster.planners[row]
+        planner.path = path_tiles[path_start:path_start + path_length]
+        planner.goal = None if goal[0] == NO_INDEX else tuple(goal)
+        path_start += path_length
+
+    animation_columns = {name: arrays['animation_' + name] for name in ANIMATION_COLUMNS}
+    animation_columns['last_update_time'] = animation_columns['last_update_time'] + time_offset
+    animation_states.load(animation_columns)
+
+    restore_positions(game_state, roster, character_columns)
+    restore_projectiles(game_state, roster, arrays)
+
+    rng_gauss = float(arrays['rng_gauss'][0])
+    game_state.rng.setstate((3, tuple(arrays['rng_state'].tolist()), None if np.isnan(rng_gauss) else rng_gauss))
+    game_state.navigation.invalidate()
+
+
+def restore_trees(game_state, roster, layout):
+    """
+    Trees only change when restoring into another battle, they are then planted again from cached textures. A
+    WorldRenderer keeps its trees, so it has to be built again after that.
+    """
+    if np.array_equal(roster.tree_layout, layout):
+        return
+    for tree in game_state.trees:
+        game_state.occupancy.remove(tree)
+    game_state.trees = []
+    for kind, x, y in layout.tolist():
+        game_state.add_tree(TREE_KINDS[kind](x, y, game_state.rng, game_state.projection))
+
+
+def restore_positions(game_state, roster, columns):
+    """ Rebuild the occupancy grid, spatial index and unit store from the restored character columns. """
+    living = columns['hp'] > 0
+    game_state.occupancy.replace_entities(roster.entity_ids, roster.entity_ids[living], columns['grid_x'][living],
+                                          columns['grid_y'][living])
+
+    spatial_index = game_state.spatial_index
+    spatial_index.buckets.clear()
+    for character, alive in zip(roster.characters, living.tolist()):
+        if alive:
+            spatial_index.insert(character)
+
+    # Characters are bound to the unit store in the same order as to the state columns, so their rows are equal
+    unit_store = game_state.unit_store
+    if unit_store is not None:
+        characters = len(roster.characters)
+        for name in UNIT_STORE_COLUMNS + ['grid_x', 'grid_y']:
+            getattr(unit_store, name)[:characters] = columns[name]
+        unit_store.attack_requested[:characters] = False
+
+
+def restore_projectiles(game_state, roster, arrays):
+    projectiles = game_state.projectiles
+    projectiles.set_capacity(len(arrays['projectile_active']))
+    for name in PROJECTILE_COLUMNS:
+        getattr(projectiles, name)[:] = arrays['projectile_' + name]
+    projectiles.shooters = [None if shooter == NO_INDEX else roster.characters[shooter]
+                            for shooter in arrays['projectile_shooters'].tolist()]
+    # Slots are handed out in free_slots order, which decides the order arrows hit in, so restore it exactly
+    projectiles.free_slots = arrays['projectile_free_slots'].tolist()
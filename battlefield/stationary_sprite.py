@@ -1,51 +1,46 @@
 import random
-from copy import deepcopy
 import arcade
-from PIL import ImageEnhance
 
-from draw_utils import calculate_perspective_factor
-from game_constants import BOTTOM_GRID_PAD, HORIZONTAL_PADDING, SCREEN_WIDTH, GRID_COLUMNS
+import texture_registry
+from projection import projection as default_projection
+
+RANDOM_BRIGHTNESS_RANGE = 0.4
+BRIGHTNESS_LEVELS = 8  # Distinct brightness variants per image and orientation
+
+
+def brightness_levels():
+    """ BRIGHTNESS_LEVELS evenly spaced factors within the random brightness range. """
+    lowest = 1 - RANDOM_BRIGHTNESS_RANGE / 2
+    step = RANDOM_BRIGHTNESS_RANGE / (BRIGHTNESS_LEVELS - 1)
+    return [lowest + level * step for level in range(BRIGHTNESS_LEVELS)]
+
+
+def quantize_brightness(factor):
+    """ Closest of the brightness levels. """
+    return min(brightness_levels(), key=lambda level: abs(level - factor))
 
 
 class StationarySprite:
-    def __init__(self, position_x, position_y, cell_size, image_file, bottom_padding=1, cell_size_factor=1.3, random_placement_pixels=2, margin_x=0, random_horizontal_flip=False):
+    def __init__(self, position_x, position_y, cell_size, image_file, bottom_padding=1, cell_size_factor=1.3, random_placement_pixels=2, margin_x=0, random_horizontal_flip=False, rng=random, projection=default_projection):
         self.grid_x = position_x
         self.grid_y = position_y
         self.cell_size = cell_size
         self.image_file = image_file
         self.margin_x = margin_x
 
-        self.texture = arcade.load_texture(
-                image_file,
-                0,
-                0,
-                0,
-                0,
-                flipped_horizontally=random_horizontal_flip and random.random() > .5,
-                flipped_vertically=False,
-                flipped_diagonally=False,
-                hit_box_algorithm="Simple",
-                hit_box_detail=4.5,
-                can_cache=False
-            )
-
-        # Brightness change only works for mirrored textures (all textures with same orientation have same brightness)
-        enhancer = ImageEnhance.Brightness(deepcopy(self.texture.image))
-        random_brightness_range = 0.4
-        factor = random.random() * random_brightness_range + (1 - (random_brightness_range / 2))  # Darkens the image; 0.5 means 50% brightness.
-        brightness_randomized_image = enhancer.enhance(factor)
-        self.texture.image = brightness_randomized_image
+        flipped_horizontally = random_horizontal_flip and rng.random() > .5
+        factor = rng.random() * RANDOM_BRIGHTNESS_RANGE + (1 - (RANDOM_BRIGHTNESS_RANGE / 2))  # Darkens the image; 0.5 means 50% brightness.
+        # Trees with the same image, orientation and brightness level share one texture
+        self.texture = texture_registry.load_brightness_variant(image_file, flipped_horizontally,
+                                                                quantize_brightness(factor))
 
         self.sprite = arcade.Sprite(texture=self.texture, scale=1.0)
 
-        perspective_factor = calculate_perspective_factor(self.grid_y)
-        cell_width = self.cell_size * perspective_factor
-        cell_height = self.cell_size * perspective_factor
-        self.screen_x = self.grid_x * cell_width + (SCREEN_WIDTH / 2) - (GRID_COLUMNS * cell_width / 2)
-        self.screen_y = self.grid_y * cell_height + BOTTOM_GRID_PAD + HORIZONTAL_PADDING * self.grid_y
+        perspective_factor = projection.perspective_factor(self.grid_y)
+        self.screen_x, self.screen_y = projection.grid_to_screen(self.grid_x, self.grid_y)
 
-        self.screen_x += random.randrange(-random_placement_pixels, random_placement_pixels) * perspective_factor
-        self.screen_y += random.randrange(-random_placement_pixels, random_placement_pixels) * perspective_factor
+        self.screen_x += rng.randrange(-random_placement_pixels, random_placement_pixels) * perspective_factor
+        self.screen_y += rng.randrange(-random_placement_pixels, random_placement_pixels) * perspective_factor
 
         self.sprite.scale = perspective_factor * (self.cell_size * cell_size_factor / self.sprite.width)
         self.sprite.center_x = self.screen_x + self.margin_x * self.sprite.scale + self.sprite.width / 2 - (self.cell_size * (cell_size_factor - 1) / 2)
@@ -54,3 +49,6 @@ class StationarySprite:
     def draw(self):
         """ Draw the tree sprite on the grid. """
         self.sprite.draw()
+
+    def sync_sprite(self, sprite):
+        pass  # Trees never change, the renderer draws self.sprite directly
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The game imports its modules flat and loads its resources relative to the battlefield directory
+BATTLEFIELD_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BATTLEFIELD_DIRECTORY)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def battlefield_directory():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(BATTLEFIELD_DIRECTORY)
+        yield
@@ -0,0 +1,52 @@
+import numpy as np
+
+from a_star import PathPlanner
+from chunked_grid import ChunkedGrid
+
+
+def open_grid(rows=12, columns=20):
+    return ChunkedGrid(rows, columns, 8, True, bool, outside=False)
+
+
+def walk(planner, walkable_tiles, start, goal, max_steps=100, on_step=None):
+    """ Follow the planner from start, (x, y), to goal, returns the tiles walked through. """
+    x, y = start
+    walked = [start]
+    for step in range(max_steps):
+        if (x, y) == goal:
+            return walked
+        if on_step is not None:
+            on_step(step, (x, y))
+        dx, dy = planner.next_step_direction((goal[1], goal[0]), walkable_tiles, (y, x))
+        assert max(abs(dx), abs(dy)) == 1 and walkable_tiles[y + dy, x + dx]
+        x, y = x + dx, y + dy
+        walked.append((x, y))
+    raise AssertionError(f"{goal} not reached from {start}")
+
+
+def test_walks_around_a_wall():
+    walkable_tiles = open_grid()
+    walkable_tiles[np.arange(0, 10), np.full(10, 8)] = False
+    walked = walk(PathPlanner(), walkable_tiles, (2, 2), (15, 2))
+    assert all(walkable_tiles[y, x] for x, y in walked)
+
+
+def test_repairs_a_path_blocked_while_walking():
+    walkable_tiles = open_grid()
+    planner = PathPlanner()
+
+    def block_ahead(step, position):
+        if step == 2:
+            # Wall off the straight line to the goal in front of the walker
+            walkable_tiles[np.arange(2, 7), np.full(5, position[0] + 3)] = False
+
+    walked = walk(planner, walkable_tiles, (1, 4), (18, 4), on_step=block_ahead)
+    assert any(y != 4 for _, y in walked)  # Went around the wall
+
+
+def test_follows_a_goal_that_moves_a_little():
+    walkable_tiles = open_grid()
+    planner = PathPlanner()
+    assert planner.next_step_direction((5, 15), walkable_tiles, (5, 2)) == (1, 0)
+    assert planner.path[0] == (15, 5)
+    walk(planner, walkable_tiles, (3, 5), (16, 6))
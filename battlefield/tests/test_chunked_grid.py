@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from chunked_grid import ChunkedGrid
+
+ROWS, COLUMNS, CHUNK_SIZE = 20, 37, 8  # The last chunk row and column are only partly inside the grid
+FILL, OUTSIDE = -1, -2
+
+
+@pytest.fixture
+def grid():
+    return ChunkedGrid(ROWS, COLUMNS, CHUNK_SIZE, FILL, np.int32, outside=OUTSIDE)
+
+
+def test_set_many_and_get_many_across_chunk_boundaries(grid):
+    xs = np.array([6, 7, 8, 9, 15, 16, 36, 0, 31, 32])
+    ys = np.array([7, 8, 8, 7, 0, 19, 19, 15, 16, 15])
+    grid.set_many(xs, ys, np.arange(len(xs)))
+
+    assert grid.get_many(xs, ys).tolist() == list(range(len(xs)))
+    assert [grid[y, x] for x, y in zip(xs.tolist(), ys.tolist())] == list(range(len(xs)))
+    assert sorted(grid.chunks) == sorted({(x // CHUNK_SIZE, y // CHUNK_SIZE) for x, y in zip(xs, ys)})
+
+
+def test_get_many_reads_fill_in_unwritten_chunks_and_outside_beyond_the_grid(grid):
+    grid[3, 3] = 5
+    xs = np.array([3, 20, -1, COLUMNS, 3, 3, COLUMNS - 1])
+    ys = np.array([3, 12, 3, 3, -1, ROWS, ROWS - 1])
+    assert grid.get_many(xs, ys).tolist() == [5, FILL, OUTSIDE, OUTSIDE, OUTSIDE, OUTSIDE, FILL]
+    assert grid[ROWS, 3] == OUTSIDE and grid[3, -1] == OUTSIDE
+
+
+def test_get_many_keeps_the_shape_of_its_arguments(grid):
+    grid[9, 9] = 1
+    ys, xs = np.mgrid[8:11, 8:11]
+    values = grid.get_many(xs, ys)
+    assert values.shape == (3, 3)
+    assert values[1, 1] == 1 and (values.sum() - 1) == 8 * FILL
+
+
+def test_window_across_chunks_matches_a_dense_grid(grid):
+    rng = np.random.default_rng(0)
+    dense = np.full((ROWS, COLUMNS), FILL, dtype=np.int32)
+    xs, ys = rng.integers(0, COLUMNS, 60), rng.integers(0, ROWS, 60)
+    values = rng.integers(0, 100, 60)
+    grid[ys, xs] = values
+    dense[ys, xs] = values
+
+    for x0, y0, x1, y1 in [(0, 0, COLUMNS, ROWS), (5, 3, 30, 17), (7, 7, 9, 9), (8, 8, 16, 16), (33, 17, 37, 20)]:
+        assert (grid.window(x0, y0, x1, y1) == dense[y0:y1, x0:x1]).all()
+    assert (grid.to_array() == dense).all()
+    assert grid.window(4, 4, 4, 9).shape == (5, 0)
+
+
+def test_window_reads_outside_beyond_the_grid(grid):
+    grid[0, 0] = 1
+    grid[ROWS - 1, COLUMNS - 1] = 2
+    corner = grid.window(-2, -1, 2, 2)
+    assert corner.tolist() == [[OUTSIDE] * 4, [OUTSIDE, OUTSIDE, 1, FILL], [OUTSIDE, OUTSIDE, FILL, FILL]]
+    assert grid.window(COLUMNS - 1, ROWS - 1, COLUMNS + 1, ROWS + 1).tolist() == [[2, OUTSIDE], [OUTSIDE, OUTSIDE]]
+    assert (grid.window(-5, -5, -1, -1) == OUTSIDE).all()
+
+
+def test_chunks_written_since_a_version(grid):
+    grid[1, 1] = 1
+    version = grid.version
+    grid[1, 9] = 2
+    grid.set_many(np.array([30]), np.array([18]), 3)
+    assert sorted(grid.chunks_written_since(version)) == [(1, 0), (3, 2)]
+    assert grid.chunks_written_since(grid.version) == []
+
+
+def test_chunk_bounds_are_clipped_to_the_grid(grid):
+    assert grid.chunk_bounds((0, 0)) == (0, 0, 8, 8)
+    assert grid.chunk_bounds((4, 2)) == (32, 16, COLUMNS, ROWS)
+
+
+def test_writes_outside_the_grid_raise(grid):
+    for x, y in [(-1, 0), (0, -1), (COLUMNS, 0), (0, ROWS)]:
+        with pytest.raises(IndexError):
+            grid[y, x] = 1
+    with pytest.raises(IndexError):
+        grid.set_many(np.array([0, COLUMNS + 8]), np.array([0, 0]), 1)
+    assert grid.chunks == {}
+
+
+def test_chunk_size_must_be_a_power_of_two():
+    with pytest.raises(ValueError):
+        ChunkedGrid(ROWS, COLUMNS, 12, FILL, np.int32)
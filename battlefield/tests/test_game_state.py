@@ -0,0 +1,33 @@
+import pytest
+
+from ai_character import AICharacter
+from battle_map import BattleMap
+from character_configurations import SCENARIOS
+from game_constants import CELL_SIZE, MOVEMENT_DELAY
+from headless import HeadlessSimulation
+
+
+def crowded_2_by_2(rng):
+    return [AICharacter(position_x=0, position_y=0, cell_size=CELL_SIZE, move_delay=MOVEMENT_DELAY, team=index % 2)
+            for index in range(5)]
+
+
+crowded_2_by_2.battle_map = BattleMap(2, 2, border_trees=False, random_trees=0)
+
+
+def test_spawning_on_a_full_map_raises_a_clear_error():
+    with pytest.raises(ValueError, match="No free tile left"):
+        HeadlessSimulation.create(crowded_2_by_2, seed=1)
+
+
+def test_battles_of_different_map_sizes_keep_their_own_projection():
+    small = HeadlessSimulation.create(SCENARIOS['random_10_vs_10'], seed=1).game_state
+    small_positions = [(character.screen_x, character.screen_y) for character in small.characters]
+    large = HeadlessSimulation.create(SCENARIOS['far_apart_20_vs_20'], seed=1).game_state
+
+    assert (small.projection.rows, small.projection.columns) == (10, 30)
+    assert (large.projection.rows, large.projection.columns) == (64, 192)
+    assert [character.projection for character in small.characters] == [small.projection] * len(small.characters)
+    assert small.projectiles.projection is small.projection
+    for character, position in zip(small.characters, small_positions):
+        assert small.projection.grid_to_screen(character.grid_x, character.grid_y) == position
@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from character_configurations import SCENARIOS, scenario_unit_classes
+from player_character import PlayerCharacter
+
+UNIT_CLASSES = scenario_unit_classes(*SCENARIOS.values()) + (PlayerCharacter,)
+
+
+def right_facing_file(left_file):
+    """ The right facing sheet shipped next to a left facing one, None if there is none. """
+    for candidate in (left_file.replace('_left', '_right'), left_file.replace('attacks_left', 'attack_right')):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def frames(file_path, frame_width, frame_height, columns, frame_count):
+    image = np.asarray(Image.open(file_path).convert('RGBA'))
+    return [image[index // columns * frame_height:(index // columns + 1) * frame_height,
+                  index % columns * frame_width:(index % columns + 1) * frame_width] for index in range(frame_count)]
+
+
+@pytest.mark.parametrize('unit_class', UNIT_CLASSES, ids=lambda unit_class: unit_class.__name__)
+def test_sheets_drawn_mirrored_are_exact_mirrors_of_the_right_facing_art(unit_class):
+    sheets = [unit_class.attack_sheet, unit_class.death_sheet]
+    if unit_class.walk_right_sheet is None:
+        sheets.append(unit_class.walk_sheet)
+    for sheet in sheets:
+        if sheet is None or right_facing_file(sheet[0]) is None:
+            continue
+        right_frames = frames(right_facing_file(sheet[0]), *sheet[1:])
+        for index, left_frame in enumerate(frames(*sheet)):
+            assert (left_frame[:, ::-1] == right_frames[index]).all(), f"frame {index} of {sheet[0]}"
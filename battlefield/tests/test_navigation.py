@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from character_configurations import SCENARIOS
+from chunked_grid import ChunkedGrid
+from headless import HeadlessSimulation
+from navigation import Navigation
+
+
+def test_chunk_groups_split_armies_with_empty_chunks_between_them():
+    walkable_tiles = ChunkedGrid(64, 192, 32, True, bool, outside=False)
+    characters = [SimpleNamespace(grid_x=x, grid_y=30) for x in (10, 40, 180)]
+    groups = Navigation.chunk_groups(walkable_tiles, characters)
+    assert sorted(sorted(group) for group in groups) == [
+        [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1)],
+        [(4, 0), (4, 1), (5, 0), (5, 1)],
+    ]
+
+
+def test_far_apart_armies_meet():
+    simulation = HeadlessSimulation.create(SCENARIOS['far_apart_20_vs_20'], seed=1)
+    game_state = simulation.game_state
+    walkable_tiles = game_state.walkable_tiles
+    chunks = {walkable_tiles.chunk_of(character.grid_x, character.grid_y)[0] for character in game_state.characters}
+    assert max(chunks) - min(chunks) > 2  # Empty chunks between the armies, even with the chunks around them
+
+    for _ in range(3000):
+        simulation.step()
+        if any(character.hp < character.max_hp for character in game_state.characters):
+            break
+    assert any(character.hp < character.max_hp for character in game_state.characters), "the armies never fought"
@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+import player_character
+import texture_registry
+from player_character import FIGHTING_TEXTURE_CACHE_SIZE, fighting_textures
+
+
+def test_bundled_fighting_textures_are_evicted_like_composited_ones(monkeypatch):
+    monkeypatch.setattr(player_character, '_fighting_textures', type(player_character._fighting_textures)())
+    monkeypatch.setattr(texture_registry, 'load_bundled', lambda name: ((name,), 48, 48))
+    equipment = [SimpleNamespace(asset_key=f'item_{index}') for index in range(FIGHTING_TEXTURE_CACHE_SIZE + 5)]
+    legs, weapon = SimpleNamespace(asset_key='legs'), SimpleNamespace(asset_key='weapon')
+
+    for chest in equipment:
+        fighting_textures(chest, legs, weapon)
+    assert len(player_character._fighting_textures) == FIGHTING_TEXTURE_CACHE_SIZE
+    assert ('item_0', 'legs', 'weapon') not in player_character._fighting_textures
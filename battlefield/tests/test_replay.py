@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from replay import Replay, ReplayPlayer, ReplayRecorder, unpack_keys
+
+TICKS = 1200
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['objects', 'unit_store'])
+def recorded(request, tmp_path_factory):
+    """ A saved and loaded replay of a battle with random keys, and the snapshot at its last tick. """
+    recorder = ReplayRecorder(seed=42, use_unit_store=request.param, keyframe_interval=300)
+    inputs = random.Random(1)
+    keys = unpack_keys(0)
+    for tick in range(TICKS):
+        if tick % 20 == 0:
+            keys = unpack_keys(inputs.randrange(32))
+        recorder.step(keys)
+    file_path = tmp_path_factory.mktemp('replays') / 'battle.bfr'
+    recorder.save(file_path)
+    return Replay.load(file_path), recorder.simulation.snapshot()
+
+
+def test_straight_replay_matches_recording(recorded):
+    replay, final_snapshot = recorded
+    player = ReplayPlayer(replay)
+    player.seek(TICKS)
+    assert player.simulation.snapshot() == final_snapshot
+
+
+def test_seeking_back_and_forth_matches_straight_replay(recorded):
+    replay, final_snapshot = recorded
+    player = ReplayPlayer(replay)
+    for tick in [TICKS, 700, 0, 950, 301, TICKS]:
+        player.seek(tick)
+        assert player.tick == tick
+    assert player.simulation.snapshot() == final_snapshot
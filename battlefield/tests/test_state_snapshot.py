@@ -0,0 +1,32 @@
+import pytest
+
+from character_configurations import SCENARIOS
+from headless import HeadlessSimulation
+
+
+@pytest.mark.parametrize('use_unit_store', [False, True], ids=['objects', 'unit_store'])
+@pytest.mark.parametrize('scenario_name', ['random_10_vs_10', 'archer_10_vs_10'])
+def test_restored_battle_runs_on_identically(scenario_name, use_unit_store):
+    simulation = HeadlessSimulation.create(SCENARIOS[scenario_name], with_player=True, seed=7,
+                                           use_unit_store=use_unit_store)
+    simulation.run(400)
+    snapshot, tick = simulation.snapshot(), simulation.tick
+
+    simulation.run(300)
+    after_first_run = simulation.snapshot()
+    simulation.restore(snapshot, tick)
+    assert simulation.snapshot() == snapshot
+    simulation.run(300)
+    assert simulation.snapshot() == after_first_run
+
+
+def test_snapshot_restores_into_a_fresh_battle():
+    simulation = HeadlessSimulation.create(SCENARIOS['random_10_vs_10'], seed=3)
+    simulation.run(500)
+    snapshot, tick = simulation.snapshot(), simulation.tick
+    simulation.run(200)
+
+    fresh = HeadlessSimulation.create(SCENARIOS['random_10_vs_10'], seed=3)
+    fresh.restore(snapshot, tick)
+    fresh.run(200)
+    assert fresh.snapshot() == simulation.snapshot()
@@ -0,0 +1,106 @@
+import arcade
+from PIL import Image, ImageEnhance, ImageOps
+
+from sprite_bundle import spritesheet_entry_name
+
+_bundle = None  # SpriteBundle with prebuilt frames, if one was compiled
+_images = {}
+_textures = {}
+_spritesheets = {}
+_brightness_variants = {}
+
+
+def use_bundle(bundle):
+    """ Take frames from a SpriteBundle where it has them, None goes back to decoding every source file. """
+    global _bundle
+    _bundle = bundle
+    _spritesheets.clear()
+
+
+def is_bundled(name):
+    return _bundle is not None and name in _bundle
+
+
+def load_bundled(name):
+    """ (textures, frame width, frame height) of a bundle entry, None if there is no up to date entry. """
+    if _bundle is None:
+        return None
+    textures = _bundle.textures(name)
+    if textures is None:
+        return None
+    return (textures,) + _bundle.frame_size(name)
+
+
+def load_image(file_path):
+    """ Decoded RGBA image of a file, shared by every texture cut from it. """
+    key = str(file_path)
+    image = _images.get(key)
+    if image is None:
+        image = Image.open(file_path).convert("RGBA")
+        _images[key] = image
+    return image
+
+
+def load_texture(file_path, hit_box_algorithm="Simple"):
+    """ Process wide cache of whole image textures. """
+    key = (str(file_path), hit_box_algorithm)
+    texture = _textures.get(key)
+    if texture is None:
+        texture = arcade.Texture(str(file_path), image=load_image(file_path), hit_box_algorithm=hit_box_algorithm)
+        _textures[key] = texture
+    return texture
+
+
+def load_spritesheet(file_path, frame_width, frame_height, columns, frame_count):
+    """
+    Process wide replacement of arcade.load_spritesheet.
+
+    Each sheet is loaded once per (path, frame geometry) and handed out as a shared tuple of textures, so every
+    Animation playing it only adds its own playback state.
+    """
+    key = (str(file_path), frame_width, frame_height, columns, frame_count)
+    textures = _spritesheets.get(key)
+    if textures is None and _bundle is not None:
+        textures = _bundle.textures(spritesheet_entry_name(*key))
+        if textures is not None:
+            _spritesheets[key] = textures
+    if textures is None:
+        source_image = load_image(file_path)
+        texture_list = []
+        for frame in range(frame_count):
+            start_x = frame_width * (frame % columns)
+            start_y = frame_height * (frame // columns)
+            image = source_image.crop((start_x, start_y, start_x + frame_width, start_y + frame_height))
+            texture_list.append(arcade.Texture(f"{file_path}-{frame}", image=image))
+        textures = tuple(texture_list)
+        _spritesheets[key] = textures
+    return textures
+
+
+def load_brightness_variant(file_path, flipped_horizontally, brightness):
+    """
+    Shared texture of an image with its brightness changed, created once per (path, flip, brightness).
+
+    Every variant gets its own texture name, textures with equal names would share one image in the atlas.
+    """
+    key = (str(file_path), flipped_horizontally, brightness)
+    texture = _brightness_variants.get(key)
+    if texture is None:
+        image = load_image(file_path)
+        if flipped_horizontally:
+            image = ImageOps.mirror(image)
+        texture = arcade.Texture(
+            f"{file_path}-{'flipped' if flipped_horizontally else 'unflipped'}-{brightness:.3f}",
+            image=ImageEnhance.Brightness(image).enhance(brightness),
+            hit_box_algorithm="Simple",
+            hit_box_detail=4.5,
+        )
+        _brightness_variants[key] = texture
+    return texture
+
+
+def clear():
+    _images.clear()
+    _textures.clear()
+    _spritesheets.clear()
+    _brightness_variants.clear()
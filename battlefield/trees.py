@@ -1,28 +1,39 @@
+import random
+
 from game_constants import CELL_SIZE
+from projection import projection as default_projection
 from stationary_sprite import StationarySprite
 
 
 class Tree1(StationarySprite):
-    def __init__(self, position_x, position_y):
+    image_file = "resources/props/cutout_tree1.webp"
+
+    def __init__(self, position_x, position_y, rng=random, projection=default_projection):
         super().__init__(
             position_x=position_x,
             position_y=position_y,
             cell_size=CELL_SIZE,
-            image_file="resources/props/cutout_tree1.webp",
+            image_file=self.image_file,
             bottom_padding=2,
             cell_size_factor=2,
-            random_horizontal_flip=True
+            random_horizontal_flip=True,
+            rng=rng,
+            projection=projection
         )
 
 
 class Tree2(StationarySprite):
-    def __init__(self, position_x, position_y):
+    image_file = "resources/props/cutout_tree2.webp"
+
+    def __init__(self, position_x, position_y, rng=random, projection=default_projection):
         super().__init__(
             position_x=position_x,
             position_y=position_y,
             cell_size=CELL_SIZE,
-            image_file="resources/props/cutout_tree2.webp",
+            image_file=self.image_file,
             bottom_padding=3,
             cell_size_factor=2,
-            random_horizontal_flip=True
+            random_horizontal_flip=True,
+            rng=rng,
+            projection=projection
         )
@@ -0,0 +1,120 @@
+import numpy as np
+
+from occupancy_grid import EMPTY
+
+
+class UnitStore:
+    """
+    Optional struct-of-arrays store for the combat state of every character.
+
+    Bound characters and their weapons read and write hp and cooldowns through these columns, which lets a tick
+    decrement all cooldowns, resolve all melee hits and find all new deaths with a handful of NumPy operations.
+    Ranged weapons still attack one by one, since they spawn projectiles.
+    """
+    INT_COLUMNS = ['grid_x', 'grid_y', 'hp', 'max_hp', 'team', 'facing', 'hit_cooldown', 'hit_cooldown_time',
+                   'weapon_cooldown', 'weapon_cooldown_time', 'damage', 'damage_dealt']
+    BOOL_COLUMNS = ['attack_requested']
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.size = 0
+        self.units = []  # Row -> character
+        self.row_of_entity = np.full(capacity, -1, dtype=np.int32)
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.int32))
+        for name in self.BOOL_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=bool))
+
+    def grow(self, capacity):
+        for name in self.INT_COLUMNS + self.BOOL_COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def map_entity(self, entity_id, row):
+        if entity_id >= len(self.row_of_entity):
+            grown = np.full(max(entity_id + 1, len(self.row_of_entity) * 2), -1, dtype=np.int32)
+            grown[:len(self.row_of_entity)] = self.row_of_entity
+            self.row_of_entity = grown
+        self.row_of_entity[entity_id] = row
+
+    def bind(self, character):
+        """ Copy the combat state of a spawned character into a new row and make it read from there. """
+        if self.size == self.capacity:
+            self.grow(self.capacity * 2)
+        row = self.size
+        self.size += 1
+        self.units.append(character)
+        self.map_entity(character.entity_id, row)
+
+        self.grid_x[row] = character.grid_x
+        self.grid_y[row] = character.grid_y
+        self.hp[row] = character.hp
+        self.max_hp[row] = character.max_hp
+        self.team[row] = character.team
+        self.facing[row] = -1 if character.facing_left else 1
+        self.hit_cooldown[row] = character.hit_cooldown
+        self.hit_cooldown_time[row] = character.hit_cooldown_time
+        self.weapon_cooldown[row] = character.weapon.hit_cooldown
+        self.weapon_cooldown_time[row] = character.weapon.hit_cooldown_time
+        self.damage[row] = character.weapon.damage
+        self.damage_dealt[row] = character.damage_dealt
+        self.attack_requested[row] = False
+
+        character.unit_store, character.unit_row = self, row
+        character.weapon.unit_store, character.weapon.unit_row = self, row
+        return row
+
+    def move(self, character):
+        self.grid_x[character.unit_row] = character.grid_x
+        self.grid_y[character.unit_row] = character.grid_y
+
+    def request_attack(self, row, facing_left):
+        """ Queue a melee attack, it is resolved together with all others in resolve_attacks. """
+        self.facing[row] = -1 if facing_left else 1
+        self.attack_requested[row] = True
+
+    def alive(self):
+        return self.hp[:self.size] > 0
+
+    def tick_cooldowns(self):
+        """ Same as calling HitPointsMixin.update and Weapon.update on every living character. """
+        alive = self.alive()
+        hit_cooldown = self.hit_cooldown[:self.size]
+        hit_cooldown[alive & (hit_cooldown > 0)] -= 1
+        weapon_cooldown = self.weapon_cooldown[:self.size]
+        weapon_cooldown[alive & (weapon_cooldown > 0)] -= 1
+
+    def resolve_attacks(self, entity_ids):
+        """ Apply all queued melee attacks against the occupancy grid ids, then report every new death. """
+        n = self.size
+        alive_before = self.alive()
+        attackers = np.nonzero(self.attack_requested[:n] & (self.weapon_cooldown[:n] == 0) & alive_before)[0]
+        self.attack_requested[:n] = False
+        if len(attackers) == 0:
+            return
+
+        self.weapon_cooldown[attackers] = self.weapon_cooldown_time[attackers]
+        rows, columns = entity_ids.shape
+        target_x = self.grid_x[attackers] + self.facing[attackers]
+        in_bounds = (target_x >= 0) & (target_x < columns)
+        attackers, target_x = attackers[in_bounds], target_x[in_bounds]
+
+        target_ids = entity_ids[self.grid_y[attackers], target_x]
+        occupied = target_ids != EMPTY
+        attackers, target_ids = attackers[occupied], target_ids[occupied]
+        target_rows = np.where(target_ids < len(self.row_of_entity),
+                               self.row_of_entity[np.minimum(target_ids, len(self.row_of_entity) - 1)], -1)
+        hits = target_rows >= 0  # Trees have no row
+        attackers, target_rows = attackers[hits], target_rows[hits]
+        hits = self.team[target_rows] != self.team[attackers]
+        attackers, target_rows = attackers[hits], target_rows[hits]
+
+        np.subtract.at(self.hp, target_rows, self.damage[attackers])
+        np.add.at(self.hit_cooldown, target_rows, self.hit_cooldown_time[target_rows])
+        self.damage_dealt[attackers] += self.damage[attackers]
+
+        for row in np.nonzero(alive_before & ~self.alive())[0]:
+            self.units[row].on_death()
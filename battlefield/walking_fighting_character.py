@@ -1,24 +1,47 @@
-import time
 import arcade
 
 from animation import Animation
-from draw_utils import calculate_perspective_factor
-from game_constants import BOTTOM_GRID_PAD, HORIZONTAL_PADDING, SCREEN_WIDTH, GRID_ROWS, GRID_COLUMNS, \
-    STANDARD_FRAME_TIME, MOVEMENT_DELAY
+import game_clock
+from game_constants import STANDARD_FRAME_TIME, MOVEMENT_DELAY
 from hitpoints_mixin import HitPointsMixin
+from state_columns import BoolColumn, Column, NullableColumn
 from weapon import Weapon
 
 
 class WalkingFightingCharacter(HitPointsMixin):
+    # (path, frame width, frame height, columns, frame count) of the sheets the animations are cut from, facing left
+    walk_sheet = ("resources/main_character/walk_left.png", 48, 48, 8, 8)
+    attack_sheet = ("resources/main_character/attacks_left.png", 48, 48, 8, 16)
+    death_sheet = ("resources/farmer_character/death_left.png", 48, 48, 8, 16)
+    projection = None  # Set by use_projection when the character is spawned in a battle
+    # The right facing walk sheet, only for art that is not an exact mirror of walk_sheet
+    walk_right_sheet = None
+    # Simulation state, mirrored into the battle's StateColumns once the character is spawned
+    grid_x = Column()
+    grid_y = Column()
+    screen_x = Column()
+    screen_y = Column()
+    target_x = Column()
+    target_y = Column()
+    x_screen_distance = NullableColumn()
+    y_screen_distance = NullableColumn()
+    screen_x_prev = NullableColumn()
+    screen_y_prev = NullableColumn()
+    last_move_time = Column()
+    move_delay = Column()
+    facing_left = BoolColumn()
+    fighting = BoolColumn()
+    _damage_dealt = Column('damage_dealt')
+
     def __init__(self, position_x, position_y, cell_size, move_delay, team=0):
         HitPointsMixin.__init__(self, hp=100)
         self.cell_size = cell_size
         self.move_delay = move_delay
         self.grid_x: int = position_x
         self.grid_y: int = position_y
-        self.screen_x, self.screen_y = self.calculate_screen_position(position_x, position_y)
-        self.target_x = self.screen_x
-        self.target_y = self.screen_y
+        # Placed on the screen by use_projection once spawned, the projection depends on the size of the map
+        self.screen_x, self.screen_y = 0.0, 0.0
+        self.target_x, self.target_y = 0.0, 0.0
         self.x_screen_distance = None
         self.y_screen_distance = None
         self.screen_x_prev = None
@@ -26,67 +49,137 @@ class WalkingFightingCharacter(HitPointsMixin):
         self.cell_size_factor = 1.7
         self.bottom_padding = 10
 
-        self.last_move_time = time.time()
+        self.last_move_time = game_clock.now()
         self.facing_left = True
         self.fighting = False
         self.team = team
+        self.game_state = None  # Set when the character is spawned on the field
+        self._damage_dealt = 0
 
-        self.weapon = Weapon(10, STANDARD_FRAME_TIME / 2, MOVEMENT_DELAY)
-
+        self.weapon = self.create_weapon()
         self.animations = {
-            'facing_left': Animation("resources/main_character/walk_left.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'facing_right': Animation("resources/main_character/walk_right.png", 48, 48, 8, 8, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
-            'fighting_left': Animation("resources/main_character/attacks_left.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=-9),
-            'fighting_right': Animation("resources/main_character/attack_right.png", 48, 48, 8, 16, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=9),
-            'death_left': Animation("resources/farmer_character/death_left.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
-            'death_right': Animation("resources/farmer_character/death_right.png", 48, 48, 8, 16, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=9),
+            'facing_left': Animation(*self.walk_sheet, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
+            'facing_right': self.right_facing_animation(self.walk_sheet, self.walk_right_sheet, frame_duration=STANDARD_FRAME_TIME),
+            **self.fighting_animations(),
+            'death_left': Animation(*self.death_sheet, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9),
+            'death_right': Animation(*self.death_sheet, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False, margin_x=-9, mirrored=True),
         }
 
-    def calculate_screen_position(self, grid_x, grid_y):
-        """ Calculate the on-screen position of the character based on grid coordinates. """
-        perspective_factor = calculate_perspective_factor(self.grid_y)
-        cell_width = self.cell_size * perspective_factor
-        cell_height = self.cell_size * perspective_factor
+    @staticmethod
+    def right_facing_animation(sheet, right_sheet, frame_duration):
+        """ The right facing sheet if there is one, otherwise the left facing sheet drawn mirrored. """
+        if right_sheet is None:
+            return Animation(*sheet, frame_duration=frame_duration, scale=1.0, loop=False, margin_x=-9, mirrored=True)
+        return Animation(*right_sheet, frame_duration=frame_duration, scale=1.0, loop=False, margin_x=9)
 
-        screen_x = grid_x * cell_width + (SCREEN_WIDTH / 2) - (GRID_COLUMNS * cell_width / 2)
-        screen_y = grid_y * cell_height + BOTTOM_GRID_PAD + HORIZONTAL_PADDING * grid_y
+    def create_weapon(self):
+        return Weapon(10, STANDARD_FRAME_TIME / 2, MOVEMENT_DELAY)
 
-        return screen_x, screen_y
+    def fighting_animations(self):
+        return {
+            'fighting_left': Animation(*self.attack_sheet, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=-9),
+            'fighting_right': Animation(*self.attack_sheet, frame_duration=self.weapon.frame_time, scale=1.0, loop=False, margin_x=-9, mirrored=True),
+        }
 
-    def draw(self):
-        """ Draw the player character and their HP bar on the grid. """
-        perspective_factor = calculate_perspective_factor(self.grid_y)
-        cell_width = self.cell_size * perspective_factor
+    @classmethod
+    def asset_manifest(cls):
+        """
+        What a character of this class loads: spritesheets, whole image textures and the (chest, legs, weapon) classes
+        of loadouts whose fighting animation is composited from piskels.
+        """
+        sheets = [sheet for sheet in (cls.walk_sheet, cls.walk_right_sheet, cls.attack_sheet, cls.death_sheet)
+                  if sheet is not None]
+        return {'spritesheets': sheets, 'textures': [], 'loadouts': []}
+
+    @property
+    def damage_dealt(self):
+        if self.unit_store is None:
+            return self._damage_dealt
+        return int(self.unit_store.damage_dealt[self.unit_row])
+
+    @damage_dealt.setter
+    def damage_dealt(self, value):
+        if self.unit_store is None:
+            self._damage_dealt = value
+        else:
+            self.unit_store.damage_dealt[self.unit_row] = value
+
+    def calculate_screen_position(self, grid_x, grid_y):
+        """ Calculate the on-screen position of the character based on grid coordinates. """
+        return self.projection.grid_to_screen(grid_x, grid_y)
+
+    def use_projection(self, projection):
+        """ Place the character on the screen of a battle, which may have a projection for another map size. """
+        self.projection = projection
+        self.screen_x, self.screen_y = self.calculate_screen_position(self.grid_x, self.grid_y)
+        self.target_x, self.target_y = self.screen_x, self.screen_y
+
+    def teleport(self, grid_x, grid_y):
+        """ Place the character on a tile without walking there. """
+        old_x, old_y = self.grid_x, self.grid_y
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.screen_x, self.screen_y = self.calculate_screen_position(grid_x, grid_y)
+        self.target_x, self.target_y = self.screen_x, self.screen_y
+        if self.game_state is not None:
+            self.game_state.on_character_moved(self, old_x, old_y)
+
+    def on_death(self):
+        if self.game_state is not None:
+            self.game_state.on_character_died(self)
+
+    def sprite_placement(self):
+        """ The animation to show and where to center it, shared by immediate drawing and the sprite renderer. """
+        perspective_factor = self.projection.perspective_factor(self.grid_y)
+        cell_width = self.projection.cell_width(self.grid_y)
         animation = self.get_current_animation()
         animation.scale = (cell_width * self.cell_size_factor / animation.frame_width) + 0.015 * self.hit_cooldown
         center_x = self.screen_x + (animation.frame_width * animation.scale) / 2 - (
                     self.cell_size * (self.cell_size_factor - 1) / 2)
         center_y = self.screen_y + (
                     animation.frame_height * animation.scale) / 2 + self.bottom_padding * perspective_factor
+        return animation, center_x, center_y
+
+    def draw_team_indicator(self, animation, center_x, center_y):
+        cell_width = self.projection.cell_width(self.grid_y)
+        ellipse_width = cell_width * 0.7
+        ellipse_height = cell_width * 0.3
+        team_color = arcade.color.RED if self.team == 1 else arcade.color.BLUE  # Change colors based on team
+        arcade.draw_ellipse_filled(
+            center_x + (-cell_width*0.1 if self.facing_left else cell_width*0.1),
+            center_y - animation.frame_height * animation.scale / 2,
+            ellipse_width,
+            ellipse_height,
+            (*team_color, 64)
+        )  # Half transparency
+
+    def draw_character_hp_bar(self, animation, center_x, center_y):
+        perspective_factor = self.projection.perspective_factor(self.grid_y)
+        self.draw_hp_bar(
+            center_x=center_x,
+            center_y=center_y + (animation.frame_height * animation.scale * 0.4),
+            hp_bar_width=(self.projection.cell_width(self.grid_y) * .9) * perspective_factor
+        )
+
+    def draw(self):
+        """ Draw the player character and their HP bar on the grid. """
+        animation, center_x, center_y = self.sprite_placement()
 
         # Draw team indication
         if not self.is_dead():
-            ellipse_width = cell_width * 0.7
-            ellipse_height = cell_width * 0.3
-            team_color = arcade.color.RED if self.team == 1 else arcade.color.BLUE  # Change colors based on team
-            arcade.draw_ellipse_filled(
-                center_x + (-cell_width*0.1 if self.facing_left else cell_width*0.1),
-                center_y - animation.frame_height * animation.scale / 2,
-                ellipse_width,
-                ellipse_height,
-                (*team_color, 64)
-            )  # Half transparency
+            self.draw_team_indicator(animation, center_x, center_y)
 
         # Drawing the character
-        animation.draw(center_x=center_x, center_y=center_y, perspective_factor=perspective_factor)
+        animation.draw(center_x=center_x, center_y=center_y, perspective_factor=self.projection.perspective_factor(self.grid_y))
 
         # Constants for the HP bar
         if not self.is_dead():
-            self.draw_hp_bar(
-                center_x=center_x,
-                center_y=center_y + (animation.frame_height * animation.scale * 0.4),
-                hp_bar_width=(cell_width * .9) * perspective_factor
-            )
+            self.draw_character_hp_bar(animation, center_x, center_y)
+
+    def sync_sprite(self, sprite):
+        """ Update a sprite of the WorldRenderer to show the current animation frame. """
+        animation, center_x, center_y = self.sprite_placement()
+        animation.sync_sprite(sprite, center_x, center_y)
 
     def get_current_animation(self):
         if self.is_dead():
@@ -100,7 +193,7 @@ class WalkingFightingCharacter(HitPointsMixin):
         # Update the animation based on movement
         self.get_current_animation().update()
 
-        if not self.is_dead() and (time.time() - self.last_move_time) >= self.move_delay:
+        if not self.is_dead() and (game_clock.now() - self.last_move_time) >= self.move_delay:
             if self.fighting:
                 self.animations['facing_left'].set_animation_phase(self.animations['fighting_left'].get_animation_phase())
                 self.animations['facing_left'].playing = False
@@ -123,10 +216,10 @@ class WalkingFightingCharacter(HitPointsMixin):
     def get_potential_hit_target(self, game_state):
         if self.facing_left:
             if self.grid_x - 1 > 0:
-                return game_state.game_grid[self.grid_y][self.grid_x - 1]
+                return game_state.game_grid[self.grid_y, self.grid_x - 1]
         else:
-            if self.grid_x + 1 < GRID_COLUMNS:
-                return game_state.game_grid[self.grid_y][self.grid_x + 1]
+            if self.grid_x + 1 < game_state.occupancy.columns:
+                return game_state.game_grid[self.grid_y, self.grid_x + 1]
         return None
 
     def update(self, delta_time, game_state, keys_pressed):
@@ -144,7 +237,7 @@ class WalkingFightingCharacter(HitPointsMixin):
             self.weapon.attack(self, game_state)
         self.update_animation()
 
-        if (time.time() - self.last_move_time) >= self.move_delay:
+        if (game_clock.now() - self.last_move_time) >= self.move_delay:
             self.fighting = False
             self.screen_x = self.target_x
             self.screen_y = self.target_y
@@ -155,7 +248,7 @@ class WalkingFightingCharacter(HitPointsMixin):
 
         # Linear interpolation
         if self.screen_x != self.target_x or self.screen_y != self.target_y:
-            elapsed_time = time.time() - self.last_move_time
+            elapsed_time = game_clock.now() - self.last_move_time
             total_time = self.move_delay
             factor = min(1, elapsed_time / total_time)
             self.screen_x = self.screen_x_prev + self.x_screen_distance * factor
@@ -170,13 +263,13 @@ class WalkingFightingCharacter(HitPointsMixin):
         self.set_last_move_time(self.weapon.move_delay_time)
 
     def set_last_move_time(self, new_move_delay_time=None):
-        self.last_move_time = time.time()
+        self.last_move_time = game_clock.now()
         if new_move_delay_time is not None:
             self.move_delay = new_move_delay_time
 
     @property
     def move_delay_active(self):
-        return (time.time() - self.last_move_time) < self.move_delay
+        return (game_clock.now() - self.last_move_time) < self.move_delay
 
     def move(self, delta_x, delta_y, walkable_tiles):
         """ Initiate movement to a new grid position. """
@@ -189,9 +282,10 @@ class WalkingFightingCharacter(HitPointsMixin):
         new_y = self.grid_y + delta_y
 
         # Figure out if we can move there
-        if new_x < 0 or new_x > GRID_COLUMNS - 1:
+        rows, columns = walkable_tiles.shape
+        if new_x < 0 or new_x > columns - 1:
             return False
-        if new_y < 0 or new_y > GRID_ROWS - 1:
+        if new_y < 0 or new_y > rows - 1:
             return False
         if not walkable_tiles[new_y, new_x]:
             if delta_x != 0 and delta_y != 0:  # If both deltas are non-zero move in try to move in either direction
@@ -205,8 +299,11 @@ class WalkingFightingCharacter(HitPointsMixin):
         else:
             self.animations['facing_right'].reset()
 
+        old_x, old_y = self.grid_x, self.grid_y
         self.grid_x = new_x
         self.grid_y = new_y
+        if self.game_state is not None:
+            self.game_state.on_character_moved(self, old_x, old_y)
 
         self.target_x, self.target_y = self.calculate_screen_position(self.grid_x, self.grid_y)
 
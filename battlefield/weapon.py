@@ -1,32 +1,54 @@
-import time
-
-import arcade
-
-from animation import Animation
-from draw_utils import calculate_perspective_factor
-from game_constants import GRID_ROWS, GRID_COLUMNS, MOVEMENT_DELAY, SCREEN_WIDTH, BOTTOM_GRID_PAD, HORIZONTAL_PADDING, \
-    CELL_SIZE, STANDARD_FRAME_TIME
-from hitpoints_mixin import HitPointsMixin
 from piskel import Piskel
+from state_columns import Column, StateColumnsMixin
 
 
-class Weapon:
-    def __init__(self, damage, frame_time, move_delay_time):
-        from player_character import ItemPiskels
-        self.piskels = ItemPiskels(
-            piskel_layers=['Sword'],
-            walk_piskel=Piskel('./piksel_files/main_character/walk.piskel'),
-            death_piskel=Piskel('./piksel_files/main_character/death.piskel'),
-            large_sword_attack_piskel=Piskel('./piksel_files/main_character/large_sword_attack.piskel')
-        )
+class Weapon(StateColumnsMixin):
+    asset_key = 'sword'  # Identifies the piskels, equal keys must mean equal looks
+    piskel_files = {
+        'walk_piskel': './piksel_files/main_character/walk.piskel',
+        'death_piskel': './piksel_files/main_character/death.piskel',
+        'large_sword_attack_piskel': './piksel_files/main_character/large_sword_attack.piskel',
+    }
+    # Set by UnitStore.bind together with the user of the weapon
+    unit_store = None
+    unit_row = None
+    _hit_cooldown = Column('weapon_cooldown')  # Mirrored into the row of the weapon's user
 
+    def __init__(self, damage, frame_time, move_delay_time):
+        self._piskels = None
         self.damage = damage
         self.frame_time = frame_time
         self.move_delay_time = move_delay_time
         self.hit_cooldown_time = 10
-        self.hit_cooldown = self.hit_cooldown_time
+        self._hit_cooldown = self.hit_cooldown_time
+
+    @property
+    def piskels(self):
+        """ Loaded on first use, only weapons that are drawn from piskels (the player's) ever need them. """
+        if self._piskels is None:
+            from player_character import ItemPiskels
+            self._piskels = ItemPiskels(
+                piskel_layers=['Sword'],
+                **{name: Piskel.load(file_path) for name, file_path in self.piskel_files.items()}
+            )
+        return self._piskels
+
+    @property
+    def hit_cooldown(self):
+        if self.unit_store is None:
+            return self._hit_cooldown
+        return int(self.unit_store.weapon_cooldown[self.unit_row])
+
+    @hit_cooldown.setter
+    def hit_cooldown(self, value):
+        if self.unit_store is None:
+            self._hit_cooldown = value
+        else:
+            self.unit_store.weapon_cooldown[self.unit_row] = value
 
     def update(self):
+        if self.unit_store is not None:
+            return  # Ticked for all characters at once by UnitStore.tick_cooldowns
         if self.hit_cooldown > 0:
             self.hit_cooldown -= 1
 
@@ -34,15 +56,13 @@ class Weapon:
         self.hit_cooldown = self.hit_cooldown_time
 
     def get_targets_in_range(self, user, game_state):
-        if user.facing_left:
-            if user.grid_x - 1 > 0:
-                return [game_state.game_grid[user.grid_y][user.grid_x - 1]]
-        else:
-            if user.grid_x + 1 < GRID_COLUMNS:
-                return [game_state.game_grid[user.grid_y][user.grid_x + 1]]
-        return []
+        target_x = user.grid_x - 1 if user.facing_left else user.grid_x + 1
+        return game_state.spatial_index.enemies_in_row_span(user.grid_y, target_x, target_x, user.team)
 
     def attack(self, user, game_state):
+        if self.unit_store is not None:
+            self.unit_store.request_attack(self.unit_row, user.facing_left)
+            return
         if self.hit_cooldown == 0:
             self.reset_hit_cooldown()
             targets = self.get_targets_in_range(user, game_state)
@@ -50,98 +70,19 @@ class Weapon:
             for target in targets:
                 if isinstance(target, WalkingFightingCharacter) and target.team != user.team:
                     target.hit(self.damage)
+                    user.damage_dealt += self.damage
 
 
 class Bow(Weapon):
     def attack(self, user, game_state):
         if self.hit_cooldown == 0:
             self.reset_hit_cooldown()
-            arrow_velocity = 4 * (-1 if user.facing_left else 1)
-            game_state.arrows.append(
-                Arrow(
-                    position_x=user.grid_x,
-                    position_y=user.grid_y,
-                    velocity_x=arrow_velocity,
-                    velocity_y=0,
-                    cell_size=CELL_SIZE,
-                    damage=self.damage,
-                    team=user.team,
-                )
+            game_state.projectiles.spawn(
+                grid_x=user.grid_x,
+                grid_y=user.grid_y,
+                direction=-1 if user.facing_left else 1,
+                damage=self.damage,
+                team=user.team,
+                shooter=user,
             )
 
-
-class Arrow:
-    def __init__(self, position_x, position_y, velocity_x, velocity_y, cell_size, damage, team):
-        # Initialize grid and screen positions
-        self.grid_x = position_x
-        self.grid_y = position_y
-        self.velocity_x = velocity_x
-        self.velocity_y = velocity_y
-        self.cell_size = cell_size
-        self.damage = damage
-        self.team = team
-        self.screen_x, self.screen_y = self.calculate_screen_position(self.grid_x, self.grid_y)
-
-        self.animation = Animation("resources/missiles/arrow_1.png", 27, 6, 1, 1, frame_duration=STANDARD_FRAME_TIME, scale=1.0, loop=False)
-
-        self.last_move_time = time.time()
-
-    def calculate_screen_position(self, grid_x, grid_y):
-        """ Calculate the on-screen position of the character based on grid coordinates. """
-        perspective_factor = calculate_perspective_factor(self.grid_y)
-        cell_width = self.cell_size * perspective_factor
-        cell_height = self.cell_size * perspective_factor
-
-        screen_x = grid_x * cell_width + (SCREEN_WIDTH / 2) - (GRID_COLUMNS * cell_width / 2) + .5 * cell_width
-        screen_y = grid_y * cell_height + BOTTOM_GRID_PAD + HORIZONTAL_PADDING * grid_y
-
-        if self.velocity_x > 0:
-            pass
-        else:
-            pass
-        return screen_x, screen_y
-
-    def calculate_grid_position(self):
-        """ Calculate the grid position of the character based on screen coordinates. """
-        perspective_factor = calculate_perspective_factor(self.grid_y)  # Use self.grid_y for the perspective factor
-        cell_width = self.cell_size * perspective_factor
-        cell_height = self.cell_size * perspective_factor
-
-        # Reverse the screen_x and screen_y calculations
-        if self.velocity_x > 0:
-            grid_x = ((self.screen_x) - (SCREEN_WIDTH / 2) + (GRID_COLUMNS * cell_width / 2)) / cell_width
-        else:
-            grid_x = ((self.screen_x + cell_width / 2) - (SCREEN_WIDTH / 2) + (GRID_COLUMNS * cell_width / 2)) / cell_width
-        grid_y = (self.screen_y - BOTTOM_GRID_PAD) / (cell_height + HORIZONTAL_PADDING)
-
-        return max(0, min(int(grid_x), GRID_COLUMNS - 1)), max(0, min(int(grid_y), GRID_ROWS -1))
-
-    def draw(self):
-        """ Draw the arrow on the screen. """
-        perspective_factor = calculate_perspective_factor(self.grid_y)  # Use self.grid_y for the perspective factor
-        cell_width = self.cell_size * perspective_factor
-        cell_height = self.cell_size * perspective_factor
-
-        y = self.screen_y + cell_height * .85
-        # arcade.draw_line(self.screen_x, y, self.screen_x + (10 * calculate_perspective_factor(self.grid_y)), y, arcade.color.BROWN, 2)
-
-        self.animation.draw(center_x=self.screen_x, center_y=y, perspective_factor=perspective_factor)
-
-    def update(self, delta_time, game_state, keys_pressed):
-        """ Update the arrow's screen position based on velocity and update grid position accordingly. """
-        # Move the arrow based on its velocity
-        self.screen_x += self.velocity_x
-        self.screen_y += self.velocity_y
-
-        # Update the grid position based on the new screen position
-        self.grid_x, _ = self.calculate_grid_position()  # There is a bug in the grid_y calculation
-
-        possible_hit = game_state.game_grid[self.grid_y][self.grid_x]
-        if isinstance(possible_hit, HitPointsMixin) and (not hasattr(possible_hit, 'team') or possible_hit.team != self.team):
-            game_state.game_grid[self.grid_y][self.grid_x].hit(self.damage)
-            return False
-
-        # Check if arrow goes outside the grid
-        if self.grid_x <= 0 or self.grid_x >= GRID_COLUMNS - 1 or self.grid_y < 0 or self.grid_y >= GRID_ROWS:
-            return False  # Arrow is outside the grid
-        return True  # Arrow is still within the grid
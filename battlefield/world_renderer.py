@@ -0,0 +1,58 @@
+import arcade
+
+from depth_order import DepthOrder
+
+
+class WorldRenderer:
+    """
+    Draws the trees, characters and projectiles of a GameState as one depth sorted SpriteList.
+
+    Every drawable gets a persistent sprite, drawables that already own a sprite (trees) bring their own. Each
+    frame the drawables update their sprite's texture and position through sync_sprite, after which the whole
+    layer is drawn with a single draw call. Trees are added once as static drawables of the DepthOrder, so only
+    characters and projectiles that moved are re-sorted. The SpriteList mirrors the drawing order, a drawable that
+    moved past another one only has its own sprite moved to its new position.
+    """
+    def __init__(self, game_state):
+        self.game_state = game_state
+        self.sprite_list = arcade.SpriteList(use_spatial_hash=False)
+        self.sprites = {}  # Drawable -> sprite
+        self.depth_order = DepthOrder()
+        for drawable in self.game_state.trees + self.game_state.stuff:
+            self.add(drawable, self.depth_order.add_static(drawable))
+
+    def dynamic_drawables(self):
+        return self.game_state.characters + self.game_state.projectiles.drawables()
+
+    def add(self, drawable, position):
+        sprite = getattr(drawable, 'sprite', None)
+        if sprite is None:
+            sprite = arcade.Sprite()
+            drawable.sync_sprite(sprite)
+        self.sprites[drawable] = sprite
+        self.sprite_list.insert(position, sprite)
+        return sprite
+
+    def remove(self, drawable):
+        self.sprite_list.remove(self.sprites.pop(drawable))
+        self.depth_order.remove(drawable)
+
+    def update(self):
+        dynamic_drawables = self.dynamic_drawables()
+        for drawable in dynamic_drawables:
+            if drawable in self.depth_order:
+                sprite = self.sprites[drawable]
+                drawable.sync_sprite(sprite)
+                if self.depth_order.update(drawable):
+                    self.sprite_list.remove(sprite)
+                    self.sprite_list.insert(self.depth_order.index(drawable), sprite)
+            else:
+                self.add(drawable, self.depth_order.add(drawable))
+
+        if len(dynamic_drawables) != len(self.depth_order.entries):
+            current = set(dynamic_drawables)
+            for drawable in [drawable for drawable in self.depth_order.entries if drawable not in current]:
+                self.remove(drawable)
+
+    def draw(self):
+        self.sprite_list.draw()